@@ -0,0 +1,131 @@
+"""
+Bulk-ingest a directory or archive into the SmartDoc vector store.
+
+Usage:
+    python bulk_ingest.py ./corpus
+    python bulk_ingest.py ./manuals.zip --workers 6
+
+Re-running the same command after a crash resumes from the checkpoint
+manifest stored next to the vector DB.
+
+Writes go through the same single-owner write queue as the backend: if a
+backend is running, the job is handed to its ingest owner and followed
+until it finishes; otherwise this process takes the owner lock itself.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+# Ensure local imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.bulk_ingest import BulkIngestJob
+from utils.index_manager import IndexManager
+from utils.index_state import IndexVersion, WriteQueue
+from utils.hierarchy import rebuild as rebuild_sections
+from utils.upload_store import HashRegistry
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SmartDoc bulk ingestion")
+    parser.add_argument("source", help="Directory, .zip/.tar archive, or single file")
+    parser.add_argument("--db-root", default=os.getenv("VECTOR_DB_PATH", "./vectorstore"))
+    parser.add_argument("--staging-dir", default=os.path.join("uploaded_docs", ".bulk"))
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        print(f"❌ Not found: {args.source}")
+        sys.exit(1)
+
+    source = os.path.abspath(args.source)
+    write_queue = WriteQueue(args.db_root)
+
+    if write_queue.try_become_owner():
+        result = run_locally(source, args)
+    else:
+        print("📨 A backend owns the index → handing the job to it.")
+        result = run_on_owner(write_queue, source)
+
+    for failed in result["files_failed"]:
+        print(f"   ✗ {failed['path']}: {failed['error']}")
+
+    sys.exit(0 if result["status"] == "completed" else 1)
+
+
+def run_locally(source: str, args) -> dict:
+    """
+    This process holds owner.lock: write into the live index generation,
+    record documents the way the backend does (so /documents and
+    per-document delete work) and bump VERSION so running readers reload.
+    """
+    index_manager = IndexManager(args.db_root)
+    index_version = IndexVersion(args.db_root)
+    persist_dir = index_manager.current_path()
+    documents = index_manager.documents
+    registry = HashRegistry("uploaded_docs")
+
+    done = {}
+
+    def on_file_done(entry):
+        documents.add(entry["sha256"][:16], entry)
+        registry.add(entry["dedup_key"], entry["source"])
+        done[entry["sha256"][:16]] = entry
+
+    def mark_index_changed(_status=None):
+        index_version.bump(os.path.basename(persist_dir))
+
+    job = BulkIngestJob(
+        source,
+        persist_dir=persist_dir,
+        staging_dir=args.staging_dir,
+        workers=args.workers,
+        on_file_done=on_file_done,
+        on_progress=mark_index_changed,
+    )
+    vectordb = job.run()
+
+    # Coarse index for the new documents (section + document centroids)
+    if vectordb is not None and done:
+        rebuild_sections(vectordb, done)
+
+    mark_index_changed()
+    return job.to_dict()
+
+
+def run_on_owner(write_queue: WriteQueue, source: str, poll_interval: float = 2.0) -> dict:
+    """
+    Submits a "bulk" job to the running backend's owner and follows the
+    status file it keeps in the spool until the job finishes.
+    """
+    job_id = uuid.uuid4().hex
+    status = asyncio.run(write_queue.submit("bulk", source=source, job_id=job_id))
+    status_path = os.path.join(write_queue.spool, f"bulk-{job_id}.json")
+    last = None
+
+    while status["status"] not in ("completed", "failed", "cancelled"):
+        time.sleep(poll_interval)
+        try:
+            with open(status_path, "r", encoding="utf-8") as f:
+                status = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        progress = (status["files_done"], status["files_skipped"], len(status["files_failed"]))
+        if progress != last:
+            print(f"⏳ [BULK] {progress[0]} done, {progress[1]} skipped, {progress[2]} failed")
+            last = progress
+
+    return status
+
+
+if __name__ == "__main__":
+    main()
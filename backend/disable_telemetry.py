@@ -1,17 +1,28 @@
 """
 Disable Google generative AI telemetry where possible to avoid weird
 telemetry errors from some versions of google-generativeai / telemetry hooks.
+
+Call disable() right before the first google import. Importing this module
+alone no longer imports google.generativeai, so it costs nothing at startup.
 """
 
-import os
-try:
-    import google.generativeai as genai
-    # set_options/telemetry may not exist in older/newer versions; guard it.
+_done = False
+
+
+def disable():
+    global _done
+    if _done:
+        return
+    _done = True
+
     try:
-        genai.set_options(telemetry_enabled=False)
+        import google.generativeai as genai
+        # set_options/telemetry may not exist in older/newer versions; guard it.
+        try:
+            genai.set_options(telemetry_enabled=False)
+        except Exception:
+            # some versions have genai.configure/other ways; just ignore if not available
+            pass
     except Exception:
-        # some versions have genai.configure/other ways; just ignore if not available
+        # If the package is not installed yet, ignore.
         pass
-except Exception:
-    # If the package is not installed yet when this module is imported, ignore.
-    pass
@@ -0,0 +1,123 @@
+"""
+Chunking throughput + chunk-size distribution.
+
+Usage (from backend/):
+    python eval/bench_chunking.py                      # synthetic 5 MB document
+    python eval/bench_chunking.py uploaded_docs/x.pdf  # any PDF / TXT / CSV
+    python eval/bench_chunking.py --collection manuals --repeat 5
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.text_chunker import get_chunker, chunk_stats, LegacyChunker
+
+
+# ==========================================================
+# INPUT
+# ==========================================================
+WORDS = (
+    "pump valve pressure motor sensor filter flow manual install check "
+    "replace system unit power safety warning operate maintain clean"
+).split()
+
+
+def synthetic_document(target_bytes: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    section = 0
+
+    while size < target_bytes:
+        section += 1
+        block = [f"{section}. SECTION {section}"]
+        for _ in range(rng.randint(3, 8)):
+            sentences = []
+            for _ in range(rng.randint(2, 6)):
+                words = [rng.choice(WORDS) for _ in range(rng.randint(6, 24))]
+                sentences.append(" ".join(words).capitalize() + ".")
+            block.append(" ".join(sentences))
+        text = "\n".join(block)
+        parts.append(text)
+        size += len(text) + 2
+
+    return "\n\n".join(parts)
+
+
+def load_text(path: str) -> str:
+    from utils.document_loader import load_document
+    return load_document(path)
+
+
+# ==========================================================
+# BENCHMARK
+# ==========================================================
+def bench(name, fn, text, repeat):
+    best = float("inf")
+    chunks = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = fn(text)
+        best = min(best, time.perf_counter() - start)
+
+    mb = len(text.encode("utf-8")) / (1024 * 1024)
+    print(f"{name:<28} {best * 1000:9.1f} ms   {mb / best:8.2f} MB/s   {len(chunks):7d} chunks")
+    return chunks
+
+
+def legacy_splitter(chunk_size: int, overlap: int, length_function=len):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    def run(text):
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=overlap,
+            length_function=length_function,
+            separators=LegacyChunker.SEPARATORS,
+        )
+        return splitter.split_text(text)
+
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SmartDoc chunking benchmark")
+    parser.add_argument("path", nargs="?", help="Document to chunk (default: synthetic)")
+    parser.add_argument("--size-mb", type=float, default=5.0)
+    parser.add_argument("--collection", default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = load_text(args.path) if args.path else synthetic_document(int(args.size_mb * 1024 * 1024))
+    unified = get_chunker(args.collection, engine="unified")
+    legacy = get_chunker(args.collection, engine="legacy")
+
+    print(f"\n📏 Input: {len(text):,} chars   config: {unified.config}\n")
+
+    results = {
+        "unified": bench("unified chunker", unified.split, text, args.repeat),
+        "legacy": bench("legacy chunker", legacy.split, text, args.repeat),
+    }
+
+    # Same recursive splitter, token-measured like the unified chunker
+    # (with tiktoken installed every length call is a real encode)
+    legacy_tokens = legacy_splitter(
+        unified.config.chunk_size,
+        unified.config.chunk_overlap,
+        length_function=unified.counter.count,
+    )
+    bench("legacy recursive (tokens)", legacy_tokens, text, args.repeat)
+
+    for engine, chunks in results.items():
+        print(f"\n📊 Chunk-size distribution ({engine}):")
+        print(json.dumps(chunk_stats(chunks, args.collection), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Filtered retrieval: Chroma `where` prefiltering vs. post-filtering a global
+top-N, across filter selectivities (latency + recall@k against exact
+filtered top-k).
+
+Uses the same synthetic clustered corpus as bench_hierarchical.py.
+
+Usage (from backend/):
+    python eval/bench_filters.py
+    python eval/bench_filters.py --chunks 200000 --dim 1024 --oversample 20
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import argparse
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(HERE))
+sys.path.append(HERE)
+
+from bench_hierarchical import NoEmbeddings, synthetic_corpus, unit, timed, percentile
+from utils.vector_store import open_vectordb, add_embedded_batch
+from utils.filters import RetrievalFilter
+from utils.hierarchy import flat_search_by_vector
+
+CHUNKS_PER_PAGE = 4
+FILE_TYPES = ["pdf", "txt", "csv"]
+
+
+# ==========================================================
+# CORPUS
+# ==========================================================
+def load_corpus(vectordb, vectors, n_docs: int, chunks_per_doc: int):
+    """
+    Stores chunks with the metadata real ingest writes (doc_id, source,
+    chunk, page) and returns the matching document manifest.
+    """
+    documents = {}
+    ids, metas = [], []
+    t0 = 1_700_000_000.0
+
+    for d in range(n_docs):
+        doc_id = f"{d:016x}"
+        source = f"doc-{d}.{FILE_TYPES[d % len(FILE_TYPES)]}"
+        documents[doc_id] = {"source": source, "chunks": chunks_per_doc, "added_at": t0 + d * 3600}
+        for n in range(chunks_per_doc):
+            ids.append(f"{doc_id}-{n}")
+            metas.append({"doc_id": doc_id, "source": source, "chunk": n, "page": n // CHUNKS_PER_PAGE + 1})
+
+    for start in range(0, len(ids), 4096):
+        end = start + 4096
+        add_embedded_batch(
+            vectordb, ids[start:end], vectors[start:end].tolist(),
+            ["" for _ in ids[start:end]], metas[start:end],
+        )
+    return ids, metas, documents
+
+
+def filter_cases(documents: dict):
+    """
+    (label, RetrievalFilter) from one document up to half the corpus.
+    """
+    doc_ids = sorted(documents)
+    times = sorted(e["added_at"] for e in documents.values())
+    n = len(doc_ids)
+    return [
+        ("1 document", RetrievalFilter(doc_ids=doc_ids[:1])),
+        ("1 document, pages 1-3", RetrievalFilter(doc_ids=doc_ids[:1], page_from=1, page_to=3)),
+        ("1% of documents", RetrievalFilter(doc_ids=doc_ids[:max(1, n // 100)])),
+        ("uploaded in last 10%", RetrievalFilter(uploaded_after=times[int(n * 0.9)])),
+        ("file type = pdf (~33%)", RetrievalFilter(file_types=["pdf"])),
+        ("pages 1-2 everywhere", RetrievalFilter(page_from=1, page_to=2)),
+    ]
+
+
+def chunk_matches(flt: RetrievalFilter, meta: dict, eligible: set) -> bool:
+    if eligible is not None and meta["doc_id"] not in eligible:
+        return False
+    if flt.page_from is not None and meta["page"] < flt.page_from:
+        return False
+    if flt.page_to is not None and meta["page"] > flt.page_to:
+        return False
+    return True
+
+
+# ==========================================================
+# BENCHMARK
+# ==========================================================
+def hit_ids(hits):
+    return {f"{d.metadata['doc_id']}-{d.metadata['chunk']}" for d, _ in hits}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SmartDoc filtered retrieval benchmark")
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--chunks-per-doc", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--oversample", type=int, default=10, help="Post-filter fetches k × this many")
+    args = parser.parse_args()
+
+    vectors, n_docs = synthetic_corpus(args.chunks, args.dim, args.chunks_per_doc)
+    workdir = tempfile.mkdtemp(prefix="smartdoc-filters-")
+    try:
+        vectordb = open_vectordb(workdir, embedding_model=NoEmbeddings())
+        ids, metas, documents = load_corpus(vectordb, vectors, n_docs, args.chunks_per_doc)
+
+        rng = np.random.default_rng(11)
+        queries = unit(vectors[rng.integers(0, len(ids), size=args.queries)]
+                       + 0.7 * unit(rng.standard_normal((args.queries, args.dim)))).astype("float32")
+        sims = queries @ vectors.T
+
+        print(f"⚙️ {len(ids):,} chunks / {n_docs:,} docs  dim={args.dim}  k={args.k}  "
+              f"post-filter fetch={args.k * args.oversample}")
+
+        for label, flt in filter_cases(documents):
+            scope, resolve_ms = timed(lambda: flt.resolve(documents))
+            eligible = set(scope.doc_ids) if scope.doc_ids is not None else None
+            mask = np.array([chunk_matches(flt, m, eligible) for m in metas])
+            candidates = int(mask.sum())
+
+            pre_ms, pre_recall, post_ms, post_recall = [], [], [], []
+            for qi, q in enumerate(queries):
+                masked = np.where(mask, sims[qi], -np.inf)
+                exact = {ids[i] for i in np.argsort(-masked)[:min(args.k, candidates)]}
+                want = max(1, len(exact))
+
+                hits, ms = timed(lambda: flat_search_by_vector(vectordb, q.tolist(), args.k, where=scope.where))
+                pre_ms.append(ms)
+                pre_recall.append(len(hit_ids(hits) & exact) / want)
+
+                def post_filter():
+                    wide = flat_search_by_vector(vectordb, q.tolist(), args.k * args.oversample)
+                    return [(d, s) for d, s in wide if chunk_matches(flt, d.metadata, eligible)][:args.k]
+
+                hits, ms = timed(post_filter)
+                post_ms.append(ms)
+                post_recall.append(len(hit_ids(hits) & exact) / want)
+
+            print(f"\n🔎 {label}: {candidates:,} candidate chunks ({candidates / len(ids):.2%}), "
+                  f"manifest resolve {resolve_ms:.2f} ms")
+            print(f"   prefilter (where)   p50 {percentile(pre_ms, 0.5):7.2f} ms   p95 {percentile(pre_ms, 0.95):7.2f} ms   "
+                  f"recall@{args.k} {sum(pre_recall) / len(pre_recall):.3f}")
+            print(f"   post-filter top-N   p50 {percentile(post_ms, 0.5):7.2f} ms   p95 {percentile(post_ms, 0.95):7.2f} ms   "
+                  f"recall@{args.k} {sum(post_recall) / len(post_recall):.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
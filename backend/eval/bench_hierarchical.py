@@ -0,0 +1,161 @@
+"""
+Flat vs. coarse-to-fine retrieval: latency and recall@k as the corpus grows.
+
+Builds throwaway indexes of synthetic, clustered unit vectors (documents →
+sections → chunks), builds the section index with utils.hierarchy, and
+compares both searches against exact (brute-force) top-k.
+
+Usage (from backend/):
+    python eval/bench_hierarchical.py
+    python eval/bench_hierarchical.py --sizes 20000 100000 400000 --dim 1024 --top-groups 4 8 16
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.vector_store import open_vectordb, add_embedded_batch, section_id, SECTION_CHUNKS
+from utils.hierarchy import open_sections, rebuild, flat_search_by_vector, coarse_to_fine_by_vector
+
+
+class NoEmbeddings:
+    """Everything here searches by vector; text embedding is never needed."""
+
+    def embed_documents(self, texts):
+        raise RuntimeError("benchmark uses pre-computed vectors")
+
+    def embed_query(self, text):
+        raise RuntimeError("benchmark uses pre-computed vectors")
+
+
+# ==========================================================
+# CORPUS
+# ==========================================================
+def unit(x):
+    return x / np.linalg.norm(x, axis=-1, keepdims=True)
+
+
+def synthetic_corpus(n_chunks: int, dim: int, chunks_per_doc: int, seed: int = 7):
+    """
+    Chunk vectors clustered by section, sections clustered by document —
+    roughly the geometry real document embeddings have.
+    """
+    rng = np.random.default_rng(seed)
+    n_docs = max(1, n_chunks // chunks_per_doc)
+    vectors = np.empty((n_docs * chunks_per_doc, dim), dtype="float32")
+
+    for d in range(n_docs):
+        doc_center = unit(rng.standard_normal(dim))
+        for start in range(0, chunks_per_doc, SECTION_CHUNKS):
+            size = min(SECTION_CHUNKS, chunks_per_doc - start)
+            sec_center = unit(doc_center + 0.6 * unit(rng.standard_normal(dim)))
+            rows = unit(sec_center + 0.5 * unit(rng.standard_normal((size, dim))))
+            base = d * chunks_per_doc + start
+            vectors[base:base + size] = rows
+
+    return vectors, n_docs
+
+
+def load_corpus(vectordb, vectors, n_docs: int, chunks_per_doc: int):
+    documents = {}
+    batch = 4096
+    ids, metas = [], []
+
+    for d in range(n_docs):
+        doc_id = f"{d:016x}"
+        documents[doc_id] = {"chunks": chunks_per_doc, "source": f"doc-{d}.pdf"}
+        for n in range(chunks_per_doc):
+            ids.append(f"{doc_id}-{n}")
+            metas.append({"doc_id": doc_id, "chunk": n, "section_id": section_id(doc_id, n)})
+
+    for start in range(0, len(ids), batch):
+        end = start + batch
+        add_embedded_batch(
+            vectordb, ids[start:end], vectors[start:end].tolist(),
+            ["" for _ in ids[start:end]], metas[start:end],
+        )
+    return ids, documents
+
+
+# ==========================================================
+# BENCHMARK
+# ==========================================================
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def run_size(n_chunks, args):
+    vectors, n_docs = synthetic_corpus(n_chunks, args.dim, args.chunks_per_doc)
+    workdir = tempfile.mkdtemp(prefix="smartdoc-hier-")
+    try:
+        embedding = NoEmbeddings()
+        vectordb = open_vectordb(workdir, embedding_model=embedding)
+        ids, documents = load_corpus(vectordb, vectors, n_docs, args.chunks_per_doc)
+
+        _, build_ms = timed(lambda: rebuild(vectordb, documents, open_sections(workdir, embedding)))
+        sections_db = open_sections(workdir, embedding)
+
+        rng = np.random.default_rng(11)
+        picks = rng.integers(0, len(ids), size=args.queries)
+        queries = unit(vectors[picks] + 0.7 * unit(rng.standard_normal((args.queries, args.dim)))).astype("float32")
+
+        # Exact top-k (ground truth) by brute force
+        exact = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+        exact_ids = [{ids[i] for i in row} for row in exact]
+
+        rows = []
+        flat_ms, flat_recall = [], []
+        for q, truth in zip(queries, exact_ids):
+            hits, ms = timed(lambda: flat_search_by_vector(vectordb, q.tolist(), args.k))
+            flat_ms.append(ms)
+            flat_recall.append(len({d.metadata["doc_id"] + "-" + str(d.metadata["chunk"]) for d, _ in hits} & truth) / args.k)
+        rows.append(("flat", flat_ms, flat_recall))
+
+        for groups in args.top_groups:
+            hier_ms, hier_recall = [], []
+            for q, truth in zip(queries, exact_ids):
+                hits, ms = timed(lambda: coarse_to_fine_by_vector(vectordb, sections_db, q.tolist(), args.k, top_groups=groups))
+                hier_ms.append(ms)
+                hier_recall.append(len({d.metadata["doc_id"] + "-" + str(d.metadata["chunk"]) for d, _ in hits} & truth) / args.k)
+            rows.append((f"hier (top {groups} sections)", hier_ms, hier_recall))
+
+        print(f"\n📚 {len(ids):,} chunks / {n_docs:,} docs / {sections_db._collection.count():,} coarse vectors "
+              f"(section index built in {build_ms / 1000:.1f}s)")
+        for name, ms, recall in rows:
+            print(f"   {name:<26} p50 {percentile(ms, 0.5):7.2f} ms   p95 {percentile(ms, 0.95):7.2f} ms   "
+                  f"recall@{args.k} {sum(recall) / len(recall):.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SmartDoc hierarchical retrieval benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--chunks-per-doc", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--top-groups", type=int, nargs="+", default=[4, 8, 16])
+    args = parser.parse_args()
+
+    print(f"⚙️ dim={args.dim}  k={args.k}  section size={SECTION_CHUNKS} chunks  queries={args.queries}")
+    for size in args.sizes:
+        run_size(size, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Retrieval throughput vs. number of uvicorn workers.
+
+Starts `uvicorn main:app --workers N` for each N, waits until every worker
+is ready, then hammers POST /retrieve from concurrent client threads.
+Ingest a few documents first — the benchmark only reads.
+
+Usage (from backend/):
+    python eval/bench_workers.py
+    python eval/bench_workers.py --workers 1 2 4 8 --clients 32 --seconds 20
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+import subprocess
+
+import requests
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUESTIONS = [
+    "What is this document about?",
+    "How do I install the device?",
+    "Which safety warnings are listed?",
+    "What are the maintenance steps?",
+    "What does the error code mean?",
+    "Who is the intended audience?",
+]
+
+
+# ==========================================================
+# SERVER
+# ==========================================================
+def start_server(workers: int, port: int):
+    cmd = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR)
+
+
+def wait_until_ready(base: str, workers: int, timeout: float = 600):
+    """
+    /readyz is answered by whichever worker accepts the connection, so keep
+    polling until `workers` distinct pids have reported ready.
+    """
+    ready_pids = set()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            resp = requests.get(f"{base}/readyz", timeout=5)
+            if resp.status_code == 200:
+                ready_pids.add(resp.json()["worker"]["pid"])
+                if len(ready_pids) >= workers:
+                    return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"Server not ready after {timeout}s ({len(ready_pids)}/{workers} workers).")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# ==========================================================
+# LOAD
+# ==========================================================
+def hammer(base: str, clients: int, seconds: float, k: int):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def client(seed):
+        rng = random.Random(seed)
+        session = requests.Session()
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                resp = session.post(
+                    f"{base}/retrieve",
+                    json={"question": rng.choice(QUESTIONS), "k": k},
+                    timeout=60,
+                )
+                ok = resp.ok
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    n = len(latencies)
+    return {
+        "requests": n,
+        "errors": errors[0],
+        "rps": n / seconds,
+        "p50_ms": latencies[n // 2] * 1000 if n else 0,
+        "p95_ms": latencies[int(n * 0.95)] * 1000 if n else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SmartDoc multi-worker retrieval benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    base = f"http://127.0.0.1:{args.port}"
+    results = []
+
+    for workers in args.workers:
+        print(f"\n🚀 Starting {workers} worker(s)...")
+        proc = start_server(workers, args.port)
+        try:
+            wait_until_ready(base, workers)
+            # Short warm-up so first-request costs don't skew the numbers
+            hammer(base, args.clients, 2, args.k)
+            stats = hammer(base, args.clients, args.seconds, args.k)
+        finally:
+            stop_server(proc)
+
+        results.append((workers, stats))
+        print(f"   {stats['rps']:.1f} req/s  p50={stats['p50_ms']:.0f} ms  p95={stats['p95_ms']:.0f} ms  errors={stats['errors']}")
+
+    print("\n--- /retrieve THROUGHPUT ---")
+    baseline = results[0][1]["rps"] or 1
+    for workers, stats in results:
+        print(f"{workers:3d} workers  {stats['rps']:8.1f} req/s  ×{stats['rps'] / baseline:4.2f}  p95 {stats['p95_ms']:6.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
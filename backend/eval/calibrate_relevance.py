@@ -0,0 +1,87 @@
+"""
+Pick RELEVANCE_MIN_SCORE from data: compares best-chunk similarity for
+in-scope questions (eval/data.json) against off-topic ones.
+
+Usage (from backend/, with the server running and documents ingested):
+    python eval/calibrate_relevance.py
+    python eval/calibrate_relevance.py --offtopic my_offtopic.txt
+"""
+
+import os
+import json
+import argparse
+
+import requests
+
+BACKEND = "http://127.0.0.1:8000"
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+OFF_TOPIC = [
+    "What is the capital of Australia?",
+    "Who won the 2018 football world cup?",
+    "Give me a recipe for banana bread.",
+    "How many moons does Jupiter have?",
+    "What's the weather like in Paris today?",
+    "Write a haiku about the ocean.",
+    "Who painted the Mona Lisa?",
+    "How do I reverse a linked list in Java?",
+]
+
+
+def top_score(question: str, k: int):
+    resp = requests.post(f"{BACKEND}/retrieve", json={"question": question, "k": k}, timeout=30)
+    resp.raise_for_status()
+    contexts = resp.json().get("contexts", [])
+    return contexts[0]["score"] if contexts else None
+
+
+def best_threshold(in_scope, off_topic):
+    """
+    Threshold that maximizes correct gating decisions over both sets.
+    """
+    candidates = sorted(set(in_scope + off_topic))
+    best = (0, None)
+    for t in candidates:
+        correct = sum(s >= t for s in in_scope) + sum(s < t for s in off_topic)
+        if correct > best[0]:
+            best = (correct, t)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SmartDoc relevance threshold calibration")
+    parser.add_argument("--data", default=os.path.join(HERE, "data.json"))
+    parser.add_argument("--offtopic", help="Text file, one off-topic question per line")
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.data, "r", encoding="utf-8") as f:
+        in_scope_q = [item["question"] for item in json.load(f)]
+
+    off_topic_q = OFF_TOPIC
+    if args.offtopic:
+        with open(args.offtopic, "r", encoding="utf-8") as f:
+            off_topic_q = [line.strip() for line in f if line.strip()]
+
+    in_scope = [s for s in (top_score(q, args.k) for q in in_scope_q) if s is not None]
+    off_topic = [s for s in (top_score(q, args.k) for q in off_topic_q) if s is not None]
+
+    if not in_scope or not off_topic:
+        print("❌ No scores returned — is anything ingested?")
+        return
+
+    print(f"\nIn-scope   ({len(in_scope)}): min={min(in_scope):.3f}  max={max(in_scope):.3f}")
+    print(f"Off-topic  ({len(off_topic)}): min={min(off_topic):.3f}  max={max(off_topic):.3f}")
+
+    correct, threshold = best_threshold(in_scope, off_topic)
+    total = len(in_scope) + len(off_topic)
+    avoided = sum(s < threshold for s in off_topic)
+    lost = sum(s < threshold for s in in_scope)
+
+    print(f"\n🎯 Suggested RELEVANCE_MIN_SCORE={threshold:.3f}  ({correct}/{total} correct)")
+    print(f"   LLM calls avoided on off-topic: {avoided}/{len(off_topic)}")
+    print(f"   In-scope questions wrongly gated: {lost}/{len(in_scope)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,72 @@
+import time
+
+_IMPORT_START = time.perf_counter()
+
 import sys
 import os
-import time
+import json
+import uuid
 import shutil
+import asyncio
+import threading
 from dotenv import load_dotenv
 
-# Disable telemetry BEFORE any google import
-import disable_telemetry  # noqa
+# NOTE: heavy deps (chromadb, langchain, pandas, pdfplumber, google) are
+# imported lazily / by the startup warm-up — keep this module cheap to import.
 
 # Ensure local imports work
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from fastapi import FastAPI, File, UploadFile
+from typing import Optional, List
+from datetime import datetime
+
+from fastapi import FastAPI, File, Form, UploadFile, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, FileResponse
 from pydantic import BaseModel
 
 # Local utilities
-from utils.document_loader import load_document
+from utils.ingest import iter_chunk_batches, dedup_key
 from utils.vector_store import (
     store_embeddings,
     load_existing_embeddings,
-    split_into_chunks,
-    close_vectordb,   # <-- IMPORTANT
+    delete_chunks,
+    force_remove_dir,
+    release_chroma_system,
 )
+from utils.index_state import IndexVersion, IndexWatcher, WriteQueue
+from utils.index_manager import IndexManager, DocumentManifest, discard_dir_async
+from utils.upload_store import (
+    save_upload_stream,
+    safe_filename,
+    stored_name,
+    hash_file,
+    HashRegistry,
+    ResumableUploads,
+    UploadTooLarge,
+    UploadOffsetMismatch,
+)
+from utils.extraction_cache import get_extraction_cache, load_pages
+from utils.document_loader import extract_pdf_page
+from utils.file_serving import file_response, bytes_response
+from utils.bulk_ingest import BulkIngestJob, CheckpointManifest, is_archive
+from utils.snapshot import (
+    export_snapshot,
+    import_snapshot,
+    verify_snapshot,
+    SnapshotError,
+    SNAPSHOT_EXTENSION,
+)
+from utils.startup import StartupState, warm_up
+from utils.relevance import get_relevance_policy, relevance_metrics
+from utils.filters import RetrievalFilter
+from utils.hierarchy import search, index_document, remove_document, rebuild as rebuild_sections, forget_sections
+from utils.admission import admission, Rejected
 from rag_pipeline import load_llm_pipeline, answer_question
 
+startup_state = StartupState()
+startup_state.record_import("main (app modules)", time.perf_counter() - _IMPORT_START)
+
 
 # =====================================================
 # Load environment variables
@@ -32,17 +75,95 @@ load_dotenv()
 
 VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH", "./vectorstore")
 UPLOAD_DIR = "uploaded_docs"
+BULK_STAGING_DIR = os.path.join(UPLOAD_DIR, ".bulk")
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "./snapshots")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 vectordb = None
 llm = None
 
+index_manager = IndexManager(VECTOR_DB_PATH)
+hash_registry = HashRegistry(UPLOAD_DIR)
+resumable_uploads = ResumableUploads(UPLOAD_DIR)
+bulk_jobs = {}
+
+# Multi-worker: every write runs on one owner worker; readers reopen on version bumps
+index_version = IndexVersion(VECTOR_DB_PATH)
+index_watcher = IndexWatcher(index_version)
+write_queue = WriteQueue(VECTOR_DB_PATH)
+
 
 # =====================================================
 # FastAPI Application
 # =====================================================
 app = FastAPI(title="SmartDoc Backend", version="3.4")
 
+# =====================================================
+# ADMISSION CONTROL (priority lanes, per-client limits, 429 shedding)
+# Registered before CORS so CORS stays outermost and 429s carry its headers
+# =====================================================
+# Requests that stream a file body. They are network bound, so they wait in
+# the transfer lane; the handler takes an ingest slot (admission.slot) only
+# once the body is on disk, for parse + embed.
+BODY_UPLOADS = ("/upload", "/ingest/bulk/archive", "/snapshots/upload")
+
+
+def admission_lane(method: str, path: str):
+    if method == "POST" and path in ("/ask", "/retrieve"):
+        return "interactive"
+    if (method == "PUT" and path.startswith("/upload/sessions/")) or (method == "POST" and path in BODY_UPLOADS):
+        return "transfer"
+    if method == "POST" and (
+        (path.startswith("/upload/sessions/") and path.endswith("/complete"))
+        or path.startswith("/ingest/bulk")
+        or path.startswith("/snapshots/")
+    ):
+        return "ingest"
+    return None  # health, metrics, status and listings are never queued
+
+
+# Peers allowed to name the end user via X-Client-Id, e.g. the Streamlit
+# frontend calling on behalf of every browser session (TRUSTED_PROXIES=127.0.0.1).
+# Anyone else is limited by their own address — a self-chosen header would
+# otherwise reset the limits.
+TRUSTED_PROXIES = {ip.strip() for ip in os.getenv("TRUSTED_PROXIES", "").split(",") if ip.strip()}
+
+
+def client_key(request: Request) -> str:
+    host = request.client.host if request.client else "unknown"
+    client_id = request.headers.get("x-client-id")
+    if client_id and host in TRUSTED_PROXIES:
+        return f"{host}/{client_id}"
+    return host
+
+
+def too_busy(e: Rejected):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Server busy — retry later.", "reason": e.reason, "retry_after": e.retry_after},
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    lane = admission_lane(request.method, request.url.path)
+    if lane is None or not admission.enabled:
+        return await call_next(request)
+
+    client = client_key(request)
+    try:
+        await admission.acquire(lane, client)
+    except Rejected as e:
+        return too_busy(e)
+
+    start = time.monotonic()
+    try:
+        return await call_next(request)
+    finally:
+        admission.release(lane, client, time.monotonic() - start)
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -52,46 +173,456 @@ app.add_middleware(
 )
 
 
+# =====================================================
+# STARTUP WARM-UP (background — server accepts traffic immediately)
+# =====================================================
+def _warm_up():
+    global vectordb, llm
+
+    db, model = warm_up(startup_state, index_manager.current_path())
+
+    # Don't clobber handles a request created while we were warming up
+    if vectordb is None:
+        vectordb = db
+    if llm is None:
+        llm = model
+
+
+@app.on_event("startup")
+async def start_warm_up():
+    # Finish deleting generations left over from a previous run
+    index_manager.collect_garbage_async()
+
+    # Elect the ingest owner (first worker to grab the lock) and start draining
+    write_queue.start()
+
+    if os.getenv("WARM_UP", "1") == "0":
+        # Components load on first use; /readyz must not wait for a warm-up
+        startup_state.defer()
+        return
+    asyncio.get_running_loop().run_in_executor(None, _warm_up)
+
+
+class SearchFilters(BaseModel):
+    doc_ids: List[str] = []
+    sources: List[str] = []          # file names, case-insensitive
+    file_types: List[str] = []       # "pdf", "txt", ...
+    uploaded_after: Optional[datetime] = None    # ISO 8601 or epoch seconds
+    uploaded_before: Optional[datetime] = None
+    page_from: Optional[int] = None  # 1-based, inclusive
+    page_to: Optional[int] = None
+
+
 class Query(BaseModel):
     question: str
+    filters: Optional[SearchFilters] = None
+
+
+class RetrieveQuery(BaseModel):
+    question: str
+    k: int = 5
+    parent_context: Optional[bool] = None
+    filters: Optional[SearchFilters] = None
+
+
+class UploadSession(BaseModel):
+    filename: str
+    size: int
+
+
+class BulkIngestRequest(BaseModel):
+    path: str
 
 
 # =====================================================
-# UPLOAD ENDPOINT
+# SHARED INDEX HANDLE (one per worker)
 # =====================================================
-@app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+def get_vectordb():
+    """
+    This worker's Chroma handle for the live generation. Reopened when the
+    generation switched, or — on non-owner workers — when the owner wrote
+    (Chroma caches the HNSW index in memory and never sees other processes' writes).
+    """
     global vectordb
 
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
+    current = index_manager.current_path()
+    changed = index_watcher.changed()
+
+    if vectordb is not None:
+        opened = getattr(vectordb, "_persist_directory", current)
+        if opened != current or (changed and not write_queue.is_owner):
+            print("🔄 Index changed by another worker → reopening.")
+            # Evict without stopping — in-flight searches keep the old System
+            release_chroma_system(opened, stop=False)
+            forget_sections(opened)
+            vectordb = None
+
+    if vectordb is None:
+        vectordb = load_existing_embeddings(current)
+        # Loaded on demand (no warm-up, or a reopen) → readiness reflects it
+        if vectordb is not None:
+            startup_state.set("embeddings", "ready")
+        startup_state.set("index", "ready" if vectordb is not None else "empty")
+    return vectordb
+
 
-    # Save file
+def mark_index_changed():
+    index_version.bump(os.path.basename(index_manager.current_path()))
+
+
+def resolve_filters(filters: Optional[SearchFilters]):
+    """
+    Request filters → Scope (chunk `where` + eligible doc ids), resolved
+    against the live generation's document manifest. None = unfiltered.
+    """
+    if filters is None:
+        return None
     try:
-        with open(file_path, "wb") as f:
-            f.write(await file.read())
-        print(f"📄 Uploaded: {file.filename}")
+        flt = RetrievalFilter(
+            doc_ids=filters.doc_ids,
+            sources=filters.sources,
+            file_types=filters.file_types,
+            uploaded_after=filters.uploaded_after.timestamp() if filters.uploaded_after else None,
+            uploaded_before=filters.uploaded_before.timestamp() if filters.uploaded_before else None,
+            page_from=filters.page_from,
+            page_to=filters.page_to,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return flt.resolve(index_manager.documents.all())
+
+
+# =====================================================
+# DOCUMENT BOOKKEEPING
+# =====================================================
+def register_document(entry: dict):
+    """
+    Records a fully stored file in the dedup registry and in the current
+    generation's document manifest (used for per-document delete).
+    """
+    doc_id = entry["sha256"][:16]
+    documents = index_manager.documents
+
+    # Re-ingest produced fewer chunks (e.g. other CSV columns) → drop the tail
+    previous = documents.get(doc_id)
+    if previous and previous.get("chunks", 0) > entry["chunks"] and vectordb is not None:
+        stale = DocumentManifest.chunk_ids(doc_id, previous)[entry["chunks"]:]
+        delete_chunks(vectordb, stale)
+
+    # Its chunks were just overwritten, so the old column selection is no
+    # longer indexed — forget it, or re-uploading it reads as a duplicate
+    if previous and previous.get("dedup_key", previous.get("sha256")) != entry["dedup_key"]:
+        hash_registry.remove(previous.get("dedup_key", previous["sha256"]))
+
+    documents.add(doc_id, entry)
+    hash_registry.add(entry["dedup_key"], entry["source"])
+
+    # Coarse index: section + document centroids for this document
+    db = get_vectordb()
+    if db is not None:
+        try:
+            index_document(db, doc_id, entry["chunks"], entry["source"])
+        except Exception as e:
+            print(f"⚠️ Section index update failed for {entry['source']}: {e}")
+
+
+# =====================================================
+# INGEST (shared by /upload and resumable uploads)
+# =====================================================
+def ingest_file(file_path: str, sha256: str, columns=None, source: str = None):
+    global vectordb
+
+    filename = source or os.path.basename(file_path)
+    key = dedup_key(file_path, sha256, columns)
+
+    # Same bytes already embedded → skip the whole pipeline
+    existing = hash_registry.get(key)
+    if existing is not None:
+        print(f"♻️ Duplicate upload: {filename} (same content as {existing})")
+        return {
+            "message": "File already processed — reusing existing embeddings.",
+            "duplicate": True,
+            "doc_id": sha256[:16],
+        }
+
+    # Extract + chunk in batches (CSV streams row groups), store each batch
+    batches = iter_chunk_batches(file_path, sha256, columns=columns, source=filename)
+    stored = 0
+
+    while True:
+        try:
+            batch = next(batches, None)
+        except Exception as e:
+            return {"message": f"❌ Failed to extract text: {e}"}
+
+        if batch is None:
+            break
+
+        chunks, ids, metadatas = batch
+
+        # Embedding competes with queries for CPU → let queued queries go first
+        admission.yield_to_interactive()
+        try:
+            if stored == 0:
+                vectordb = store_embeddings(
+                    chunks, persist_dir=index_manager.current_path(), metadatas=metadatas, ids=ids
+                )
+            else:
+                vectordb.add_texts(chunks, metadatas=metadatas, ids=ids)
+        except Exception as e:
+            return {"message": f"❌ Failed storing embeddings: {e}"}
+
+        stored += len(chunks)
+
+    if stored == 0:
+        return {"message": "❌ No readable text in document."}
+
+    print(f"📌 Stored {stored} chunks for {filename}.")
+    register_document({
+        "sha256": sha256,
+        "dedup_key": key,
+        "source": filename,
+        "path": file_path,
+        "chunks": stored,
+    })
+    mark_index_changed()
+    return {"message": "File uploaded & processed successfully!", "doc_id": sha256[:16]}
+
+
+# =====================================================
+# UPLOAD ENDPOINT
+# =====================================================
+@app.post("/upload")
+async def upload_file(
+    file: UploadFile = File(...),
+    csv_columns: Optional[str] = Form(None),
+):
+    try:
+        filename = safe_filename(file.filename)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"message": f"❌ {e}"})
+
+    # Save file (streamed in chunks, hashed on the fly), then file it under
+    # its content-addressed name — same-named uploads never collide
+    incoming = os.path.join(UPLOAD_DIR, f".incoming-{uuid.uuid4().hex}")
+    try:
+        size, sha256 = await save_upload_stream(file, incoming)
+        file_path = os.path.join(UPLOAD_DIR, stored_name(sha256, filename))
+        os.replace(incoming, file_path)
+        print(f"📄 Uploaded: {filename} ({size} bytes)")
+    except UploadTooLarge as e:
+        return JSONResponse(status_code=413, content={"message": f"❌ {e}"})
     except Exception as e:
+        if os.path.exists(incoming):
+            os.remove(incoming)
         return {"message": f"❌ Error saving file: {e}"}
 
-    # Extract text
+    # The body is on disk → only parse + embed hold an ingest slot
     try:
-        full_text = load_document(file_path)
-    except Exception as e:
-        return {"message": f"❌ Failed to extract text: {e}"}
+        async with admission.slot("ingest"):
+            return await write_queue.submit(
+                "ingest", file_path=file_path, sha256=sha256, columns=csv_columns, source=filename
+            )
+    except Rejected as e:
+        # The stored copy stays: a retry (or a concurrent upload of the
+        # same bytes) lands on the same content-addressed path
+        return too_busy(e)
 
-    if not full_text.strip():
-        return {"message": "❌ No readable text in document."}
 
-    # Chunk text
-    chunks = split_into_chunks(full_text)
+# =====================================================
+# RESUMABLE UPLOAD ENDPOINTS
+# =====================================================
+@app.post("/upload/sessions")
+async def create_upload_session(session: UploadSession):
+    try:
+        return resumable_uploads.create(session.filename, session.size)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
-    # Store embeddings
+@app.get("/upload/sessions/{upload_id}")
+async def upload_session_status(upload_id: str):
     try:
-        vectordb = store_embeddings(chunks, persist_dir=VECTOR_DB_PATH)
-    except Exception as e:
-        return {"message": f"❌ Failed storing embeddings: {e}"}
+        return resumable_uploads.status(upload_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown upload session.")
 
-    return {"message": "File uploaded & processed successfully!"}
+
+@app.put("/upload/sessions/{upload_id}")
+async def upload_session_chunk(upload_id: str, request: Request, offset: int = 0):
+    try:
+        new_offset = await resumable_uploads.append(upload_id, offset, request.stream())
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown upload session.")
+    except UploadOffsetMismatch as e:
+        return JSONResponse(
+            status_code=409,
+            content={"detail": "Offset mismatch — resume from `offset`.", "offset": e.expected},
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    return {"upload_id": upload_id, "offset": new_offset}
+
+
+@app.post("/upload/sessions/{upload_id}/complete")
+async def complete_upload_session(upload_id: str, csv_columns: Optional[str] = None):
+    try:
+        file_path, size, sha256, filename = resumable_uploads.complete(upload_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown upload session.")
+    except UploadOffsetMismatch as e:
+        return JSONResponse(
+            status_code=409,
+            content={"detail": "Upload incomplete — resume from `offset`.", "offset": e.expected},
+        )
+
+    print(f"📄 Uploaded (resumable): {filename} ({size} bytes)")
+    return await write_queue.submit(
+        "ingest", file_path=file_path, sha256=sha256, columns=csv_columns, source=filename
+    )
+
+
+@app.delete("/upload/sessions/{upload_id}")
+async def abort_upload_session(upload_id: str):
+    resumable_uploads.abort(upload_id)
+    return {"message": "Upload session aborted."}
+
+
+# =====================================================
+# BULK INGEST ENDPOINTS (directory / archive)
+# =====================================================
+def bulk_status_path(job_id: str) -> str:
+    return os.path.join(write_queue.spool, f"bulk-{job_id}.json")
+
+
+def save_bulk_status(status: dict):
+    # Any worker can answer GET /ingest/bulk/{id}, so progress lives on disk
+    path = bulk_status_path(status["job_id"])
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(status, f)
+    os.replace(tmp, path)
+
+
+def run_bulk_job(source: str, job_id: str):
+    """
+    Owner only: starts the bulk pipeline in a thread. It takes the write
+    lock per flushed batch, so uploads, deletes and resets interleave with it.
+    """
+    def on_progress(status: dict):
+        save_bulk_status(status)
+        # Readers on other workers pick up each flushed batch
+        mark_index_changed()
+
+    def run():
+        global vectordb
+        try:
+            db = job.run()
+            with write_queue.exclusive():
+                # A /reset during the job switched generations — don't resurrect the old one
+                if job.persist_dir == index_manager.current_path():
+                    vectordb = db
+        except Exception as e:
+            print(f"❌ Bulk ingest failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+            save_bulk_status(job.to_dict())
+        finally:
+            # Uploaded archives live in the job's staging dir — never keep them
+            shutil.rmtree(job.staging_dir, ignore_errors=True)
+
+    job = BulkIngestJob(
+        source,
+        persist_dir=index_manager.current_path(),
+        staging_dir=BULK_STAGING_DIR,
+        on_file_done=register_document,
+        on_progress=on_progress,
+        job_id=job_id,
+        throttle=admission.yield_to_interactive,
+        write_lock=write_queue.exclusive(),
+    )
+    bulk_jobs[job.job_id] = job
+    save_bulk_status(job.to_dict())
+    threading.Thread(target=run, name=f"bulk-{job.job_id}", daemon=True).start()
+    return job.to_dict()
+
+
+def cancel_bulk_jobs(reason: str):
+    """
+    Called by write-queue ops that switch generations (lock held): running
+    jobs stop before writing another batch into the old one.
+    """
+    for job in bulk_jobs.values():
+        if job.status in ("pending", "running"):
+            job.cancel(reason)
+
+
+async def start_bulk_job(source: str, job_id: str = None):
+    return await write_queue.submit("bulk", source=source, job_id=job_id or uuid.uuid4().hex)
+
+
+@app.post("/ingest/bulk")
+async def ingest_bulk(req: BulkIngestRequest):
+    # Server-side paths only from an explicitly configured root; realpath so
+    # symlinks inside the root can't point back out of it
+    root = os.getenv("BULK_INGEST_ROOT")
+    if not root:
+        raise HTTPException(status_code=403, detail="Server-path ingest is disabled (set BULK_INGEST_ROOT).")
+
+    source = os.path.realpath(req.path)
+    if not is_within(source, root):
+        raise HTTPException(status_code=403, detail="Path is outside BULK_INGEST_ROOT.")
+
+    if not os.path.exists(source):
+        raise HTTPException(status_code=404, detail=f"Path not found: {req.path}")
+
+    return await start_bulk_job(source)
+
+
+@app.post("/ingest/bulk/archive")
+async def ingest_bulk_archive(file: UploadFile = File(...)):
+    try:
+        filename = safe_filename(file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not is_archive(filename):
+        raise HTTPException(status_code=400, detail="Expected a .zip, .tar, .tar.gz or .tgz archive.")
+
+    # Stored in the job's own staging dir: concurrent same-name uploads don't
+    # collide, and the job deletes it together with the extracted files
+    job_id = uuid.uuid4().hex
+    job_dir = os.path.join(BULK_STAGING_DIR, job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    archive_path = os.path.join(job_dir, filename)
+
+    try:
+        await save_upload_stream(file, archive_path)
+        async with admission.slot("ingest"):
+            return await start_bulk_job(archive_path, job_id)
+    except UploadTooLarge as e:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise HTTPException(status_code=413, detail=str(e))
+    except Rejected as e:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        return too_busy(e)
+
+
+@app.get("/ingest/bulk/{job_id}")
+async def ingest_bulk_status(job_id: str):
+    job = bulk_jobs.get(job_id)
+    if job is not None:
+        return job.to_dict()
+
+    # Job runs on the ingest owner — read the status it persisted
+    try:
+        with open(bulk_status_path(safe_filename(job_id)), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        raise HTTPException(status_code=404, detail="Unknown bulk job.")
 
 
 # =====================================================
@@ -99,22 +630,27 @@ async def upload_file(file: UploadFile = File(...)):
 # =====================================================
 @app.post("/ask")
 async def ask(query: Query):
-    global vectordb, llm
+    global llm
 
-    # Ensure vector DB exists
+    # Ensure vector DB exists (and is current)
+    vectordb = get_vectordb()
     if vectordb is None:
-        vectordb = load_existing_embeddings(VECTOR_DB_PATH)
-        if vectordb is None:
-            return {"answer": "❌ Please upload a document first."}
+        return {"answer": "❌ Please upload a document first."}
 
     # Load LLM if not loaded
     if llm is None:
         print("⏳ Loading Gemini LLM...")
         llm = load_llm_pipeline()
         if llm is None:
+            startup_state.set("llm", "failed", error=RuntimeError("LLM could not be initialized."))
             return {"answer": "❌ Failed to initialize LLM."}
+        startup_state.set("llm", "ready")
         print("🤖 Gemini LLM Ready!")
 
+    scope = resolve_filters(query.filters)
+    if scope is not None and scope.empty:
+        return {"answer": "❌ No documents match the selected filters."}
+
     try:
         # Determine how many chunks exist
         try:
@@ -127,61 +663,427 @@ async def ask(query: Query):
 
         print(f"🔍 Chroma search → k={safe_k}/{available}")
 
-        answer = answer_question(
+        # Off the event loop, so queued requests keep being admitted / shed
+        answer = await asyncio.to_thread(
+            answer_question,
             question=query.question,
             vectordb=vectordb,
             llm=llm,
             k=safe_k,
+            scope=scope,
         )
 
         return {"answer": answer}
 
+    except Rejected as e:
+        return too_busy(e)
+
     except Exception as e:
         print(f"❌ Error in /ask: {e}")
         return {"answer": "Something went wrong while generating the answer."}
 
 
 # =====================================================
-# RESET ENDPOINT (Windows-safe)
+# RETRIEVE ENDPOINT (contexts only — no LLM call)
 # =====================================================
-@app.post("/reset")
-async def reset():
-    global vectordb, llm
+@app.post("/retrieve")
+async def retrieve(query: RetrieveQuery):
+    vectordb = get_vectordb()
+    if vectordb is None:
+        return {"contexts": []}
 
-    # 1️⃣ Release Chroma file locks
-    close_vectordb(vectordb)
+    scope = resolve_filters(query.filters)
+    scored = await asyncio.to_thread(search, vectordb, query.question, max(1, query.k), query.parent_context, scope)
+    relevant = {id(doc) for doc, _ in get_relevance_policy().select(scored)}
+    return {
+        "contexts": [
+            {"content": d.page_content, "metadata": d.metadata, "score": score, "relevant": id(d) in relevant}
+            for d, score in scored
+        ]
+    }
 
-    vectordb = None
-    llm = None
 
-    # 2️⃣ Delete uploaded docs
+# =====================================================
+# DOCUMENTS (list / per-document delete)
+# =====================================================
+@app.get("/documents")
+async def list_documents():
+    docs = index_manager.documents.all()
+    return {"documents": [{"doc_id": doc_id, **entry} for doc_id, entry in docs.items()]}
+
+
+def is_within(path: str, root: str) -> bool:
+    """True if `path` resolves (symlinks included) to somewhere inside `root`."""
+    path, root = os.path.realpath(path), os.path.realpath(root)
+    return path == root or path.startswith(root + os.sep)
+
+
+def stored_document(doc_id: str):
+    # Only files kept in UPLOAD_DIR are served — bulk sources stay where they are
+    entry = index_manager.documents.get(doc_id)
+    path = entry.get("path") if entry else None
+    if (
+        not path
+        or not is_within(path, UPLOAD_DIR)
+        or not os.path.isfile(path)
+        or not owns_file(doc_id, entry, path)
+    ):
+        raise HTTPException(status_code=404, detail="Unknown document or file no longer stored.")
+    return entry, path
+
+
+_verified_files = {}
+
+
+def owns_file(doc_id: str, entry: dict, path: str) -> bool:
+    """
+    True if `path` still holds this document's bytes. Content-addressed
+    uploads are trusted by name; anything else (bulk sources, uploads stored
+    by their original name) is hashed once per (size, mtime).
+    """
+    if os.path.basename(path).startswith(doc_id):
+        return True
     try:
-        for f in os.listdir(UPLOAD_DIR):
+        st = os.stat(path)
+    except OSError:
+        return False
+    key = (path, st.st_size, st.st_mtime_ns)
+    if key not in _verified_files:
+        _verified_files[key] = hash_file(path) == entry["sha256"]
+    return _verified_files[key]
+
+
+@app.get("/documents/{doc_id}/file")
+async def document_file(doc_id: str, request: Request):
+    # Range + ETag aware, so PDF viewers fetch only the pages they display
+    entry, path = stored_document(doc_id)
+    return file_response(request, path, etag=entry["sha256"], filename=entry["source"])
+
+
+@app.get("/documents/{doc_id}/pages/{page}")
+async def document_page(doc_id: str, page: int, request: Request, format: str = "pdf"):
+    """
+    One cited page: a single-page PDF, or its extracted text/tables (format=text).
+    """
+    if format not in ("pdf", "text"):
+        raise HTTPException(status_code=400, detail="format must be 'pdf' or 'text'.")
+
+    entry, path = stored_document(doc_id)
+    etag = f"{entry['sha256']}-p{page}-{format}"
+
+    if format == "text":
+        cache = get_extraction_cache()
+        data = cache.get_page(entry["sha256"], page)
+        if data is None:
             try:
-                os.remove(os.path.join(UPLOAD_DIR, f))
-            except:
-                pass
-    except:
-        pass
-
-    # 3️⃣ Delete vectorstore directory
-    if os.path.exists(VECTOR_DB_PATH):
+                pages = await asyncio.to_thread(load_pages, path, entry["sha256"], cache)
+            except ValueError as e:
+                # e.g. CSVs, which are indexed by rows, not pages
+                raise HTTPException(status_code=400, detail=str(e))
+            data = next((p for p in pages if p["page"] == page), None)
+        if data is None:
+            raise HTTPException(status_code=404, detail=f"No page {page}.")
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        return bytes_response(request, body, etag=etag, media_type="application/json")
+
+    if not path.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Page previews are only available for PDFs; use format=text.")
+
+    try:
+        data = await asyncio.to_thread(extract_pdf_page, path, page)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    name = f"{os.path.splitext(entry['source'])[0]}-p{page}.pdf"
+    return bytes_response(request, data, etag=etag, media_type="application/pdf", filename=name)
+
+
+def delete_document_now(doc_id: str):
+    """
+    Owner only (via the write queue). Returns None for an unknown doc_id.
+    """
+    documents = index_manager.documents
+    entry = documents.get(doc_id)
+    if entry is None:
+        return None
+
+    vectordb = get_vectordb()
+
+    # Only this document's chunks go — no rebuild, no re-embedding
+    ids = DocumentManifest.chunk_ids(doc_id, entry)
+    if vectordb is not None:
+        delete_chunks(vectordb, ids)
+
+    documents.remove(doc_id)
+    remove_document(index_manager.current_path(), doc_id)
+    hash_registry.remove(entry.get("dedup_key", entry["sha256"]))
+    CheckpointManifest(index_manager.current_path()).forget(entry["sha256"])
+
+    # Drop the stored upload (bulk sources outside UPLOAD_DIR are left alone)
+    # …and only if it really is this document's file (not another upload
+    # that happened to be stored under the same name)
+    path = entry.get("path", "")
+    if (
+        is_within(path, UPLOAD_DIR)
+        and os.path.isfile(path)
+        and owns_file(doc_id, entry, path)
+    ):
         try:
-            shutil.rmtree(VECTOR_DB_PATH)
-            print("🗑 Vector DB deleted successfully.")
-        except Exception as e:
-            print(f"❌ Delete failed: {e} — retrying in 1s...")
-            time.sleep(1)
-            try:
-                shutil.rmtree(VECTOR_DB_PATH)
-                print("🗑 Vector DB deleted on retry.")
-            except Exception as e2:
-                print(f"❌ Retry failed: {e2}")
-                return {"message": f"Failed to reset vector DB: {e2}"}
+            os.remove(path)
+        except OSError:
+            pass
+
+    print(f"🗑 Deleted document {entry['source']} ({len(ids)} chunks).")
+    mark_index_changed()
+    return {"message": f"Deleted {entry['source']}.", "doc_id": doc_id, "chunks_deleted": len(ids)}
+
+
+@app.delete("/documents/{doc_id}")
+async def delete_document(doc_id: str):
+    result = await write_queue.submit("delete", doc_id=doc_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Unknown document.")
+    return result
+
+
+# =====================================================
+# RESET ENDPOINT (generation swap — constant time)
+# =====================================================
+def reset_now():
+    """
+    Write-queue op: swaps generations, so it must not race an ingest
+    the owner is still writing into the old one.
+    """
+    global vectordb
+
+    # 1️⃣ Point at a fresh, empty index generation (atomic rename).
+    #    The old generation is released + deleted in the background.
+    cancel_bulk_jobs("Index was reset.")
+    vectordb = None
+    index_manager.reset()
+    mark_index_changed()
+
+    # 2️⃣ Move uploaded docs aside; delete them in the background
+    try:
+        discard_dir_async(UPLOAD_DIR)
+    except Exception as e:
+        print(f"⚠️ Could not clear uploads: {e}")
 
     return {"message": "SmartDoc reset successfully!"}
 
 
+@app.post("/reset")
+async def reset():
+    return await write_queue.submit("reset")
+
+
+# =====================================================
+# SNAPSHOTS (export / import / verify)
+# =====================================================
+def snapshot_path(name: str) -> str:
+    name = safe_filename(name)
+    if not name.endswith(SNAPSHOT_EXTENSION):
+        name += SNAPSHOT_EXTENSION
+    return os.path.join(SNAPSHOT_DIR, name)
+
+
+def existing_snapshot(name: str) -> str:
+    try:
+        path = snapshot_path(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Unknown snapshot.")
+    return path
+
+
+@app.get("/snapshots")
+async def list_snapshots():
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    snapshots = []
+    for name in sorted(os.listdir(SNAPSHOT_DIR)):
+        if name.endswith(SNAPSHOT_EXTENSION):
+            path = os.path.join(SNAPSHOT_DIR, name)
+            snapshots.append({"name": name, "size_bytes": os.path.getsize(path), "modified": os.path.getmtime(path)})
+    return {"snapshots": snapshots}
+
+
+@app.post("/snapshots/export")
+async def create_snapshot():
+    vectordb = get_vectordb()
+    if vectordb is None:
+        raise HTTPException(status_code=409, detail="Nothing to export — the index is empty.")
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    name = f"smartdoc-{time.strftime('%Y%m%d-%H%M%S')}{SNAPSHOT_EXTENSION}"
+    path = os.path.join(SNAPSHOT_DIR, name)
+
+    header = await asyncio.to_thread(
+        export_snapshot, vectordb, path, index_manager.documents.all()
+    )
+    return {"name": name, "count": header["count"], "dim": header["dim"], "size_bytes": os.path.getsize(path)}
+
+
+@app.get("/snapshots/{name}")
+async def download_snapshot(name: str):
+    path = existing_snapshot(name)
+    return FileResponse(path, media_type="application/octet-stream", filename=os.path.basename(path))
+
+
+@app.post("/snapshots/upload")
+async def upload_snapshot(file: UploadFile = File(...)):
+    try:
+        path = snapshot_path(file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    max_bytes = int(os.getenv("SNAPSHOT_MAX_MB", 16384)) * 1024 * 1024
+    try:
+        size, _ = await save_upload_stream(file, path, max_bytes=max_bytes)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    return {"name": os.path.basename(path), "size_bytes": size}
+
+
+@app.post("/snapshots/{name}/verify")
+async def verify_snapshot_endpoint(name: str):
+    path = existing_snapshot(name)
+    try:
+        return await asyncio.to_thread(verify_snapshot, path)
+    except SnapshotError as e:
+        return JSONResponse(status_code=422, content={"ok": False, "error": str(e)})
+
+
+def import_snapshot_now(path: str, force: bool = False):
+    """
+    Write-queue op: builds a new generation from the snapshot and makes it
+    live. Returns {"status", ...}; non-200 statuses carry a "detail".
+    """
+    global vectordb
+
+    # Load into a new, inactive generation; only switch once it is complete
+    generation = index_manager.create_generation()
+    try:
+        db, header = import_snapshot(path, generation, True, force)
+    except SnapshotError as e:
+        force_remove_dir(generation)
+        return {"status": 422, "detail": str(e)}
+    except Exception as e:
+        force_remove_dir(generation)
+        return {"status": 500, "detail": f"Snapshot import failed: {e}"}
+
+    documents = header.get("documents", {})
+    index_manager.documents_for(generation).replace_all(documents)
+    cancel_bulk_jobs("A snapshot import replaced the index.")
+
+    # Snapshots carry chunks only; centroids are cheap to recompute from them
+    try:
+        rebuild_sections(db, documents)
+    except Exception as e:
+        print(f"⚠️ Section index rebuild failed: {e}")
+    index_manager.activate(generation)
+    vectordb = db
+    mark_index_changed()
+
+    # Dedup must match the imported index exactly — documents not in the
+    # snapshot have to be ingestable again
+    hash_registry.replace_all(HashRegistry.from_documents(documents))
+
+    return {
+        "status": 200,
+        "message": f"Snapshot {os.path.basename(path)} is live.",
+        "count": header["count"],
+        "documents": len(documents),
+    }
+
+
+@app.post("/snapshots/{name}/import")
+async def import_snapshot_endpoint(name: str, force: bool = False):
+    path = existing_snapshot(name)
+
+    result = await write_queue.submit("import_snapshot", path=path, force=force)
+    status = result.pop("status")
+    if status != 200:
+        raise HTTPException(status_code=status, detail=result["detail"])
+    return result
+
+
+# =====================================================
+# EXTRACTION CACHE (parsed pages keyed by file hash)
+# =====================================================
+def extraction_cache_stats():
+    return get_extraction_cache().stats()
+
+
+def evict_extraction_cache(max_mb: float = None):
+    cache = get_extraction_cache()
+    max_bytes = None if max_mb is None else int(max_mb * 1024 * 1024)
+    freed = cache.evict(max_bytes=max_bytes)
+    return {"freed_bytes": freed, **cache.stats()}
+
+
+# =====================================================
+# WRITE QUEUE OPERATIONS (run on the ingest owner only)
+# =====================================================
+write_queue.register("ingest", ingest_file)
+write_queue.register("delete", delete_document_now)
+write_queue.register("bulk", run_bulk_job)
+write_queue.register("reset", reset_now)
+write_queue.register("import_snapshot", import_snapshot_now)
+write_queue.register("cache_stats", extraction_cache_stats, exclusive=False)
+write_queue.register("cache_evict", evict_extraction_cache, exclusive=False)
+
+
+@app.get("/cache/extraction")
+async def extraction_cache_status():
+    # Hit/miss counters live on the ingest owner — ask it
+    return await write_queue.submit("cache_stats")
+
+
+@app.post("/cache/extraction/evict")
+async def extraction_cache_evict(max_mb: Optional[float] = None):
+    return await write_queue.submit("cache_evict", max_mb=max_mb)
+
+
+@app.delete("/cache/extraction")
+async def extraction_cache_clear():
+    return await write_queue.submit("cache_evict", max_mb=0)
+
+
+# =====================================================
+# METRICS
+# =====================================================
+@app.get("/metrics/admission")
+async def admission_metrics():
+    # Per worker: queue depth, in-flight, wait-time percentiles, rejections, LLM slots
+    return admission.to_dict()
+
+
+@app.get("/metrics/relevance")
+async def relevance_metrics_endpoint():
+    # Per worker: questions answered without an LLM call, chunks sent, scores
+    return relevance_metrics.to_dict()
+
+
+# =====================================================
+# HEALTH / READINESS
+# =====================================================
+@app.get("/healthz")
+def healthz():
+    # Liveness only: the process is up and serving
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    # Readiness: heavy imports done, models loaded, index opened
+    report = startup_state.to_dict()
+    report["worker"] = {"pid": os.getpid(), "ingest_owner": write_queue.is_owner}
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+
 # =====================================================
 # ROOT ROUTE
 # =====================================================
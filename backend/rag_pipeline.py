@@ -1,6 +1,9 @@
 import os
 from dotenv import load_dotenv
-import google.generativeai as genai
+
+from utils.relevance import get_relevance_policy, relevance_metrics
+from utils.hierarchy import search
+from utils.admission import llm_limiter, Rejected
 
 load_dotenv()
 
@@ -16,6 +19,11 @@ def load_llm_pipeline():
 
     print(f"🤖 Trying Gemini model: {model_name}")
 
+    # Deferred: google.generativeai is slow to import; disable telemetry first
+    import disable_telemetry
+    disable_telemetry.disable()
+    import google.generativeai as genai
+
     genai.configure(api_key=api_key)
 
     try:
@@ -100,7 +108,7 @@ This question does not seem to be related to the content of the uploaded PDF.
 # ===========================================================
 # 🔹 MAIN RAG PIPELINE
 # ===========================================================
-def answer_question(question: str, vectordb, llm, k=4):
+def answer_question(question: str, vectordb, llm, k=4, policy=None, scope=None):
 
     # ----------------------------
     # Handle missing vector DB
@@ -116,15 +124,24 @@ def answer_question(question: str, vectordb, llm, k=4):
 
     try:
         # ---------------------------------------------
-        # 1. Retrieve relevant chunks
+        # 1. Retrieve chunks with similarity scores,
+        #    keep only the relevant ones
         # ---------------------------------------------
-        retriever = vectordb.as_retriever(search_kwargs={"k": k})
-        docs = retriever.get_relevant_documents(question)
+        policy = policy or get_relevance_policy()
+        scored = search(vectordb, question, k, scope=scope)
+        kept = policy.select(scored)
+        docs = [doc for doc, _ in kept]
 
-        # If RAG finds nothing → unrelated question
+        top_score = scored[0][1] if scored else None
+        relevance_metrics.record(len(scored), len(docs), top_score)
+
+        # Nothing relevant → unrelated question, skip the LLM entirely
         if not docs:
+            print(f"🚫 Relevance gate: no chunk ≥ {policy.min_score} (best={top_score}) → LLM skipped.")
             return format_answer("I don't know", [])
 
+        print(f"🎯 Relevance gate: {len(docs)}/{len(scored)} chunks kept (best={top_score}).")
+
         # ---------------------------------------------
         # 2. Build context
         # ---------------------------------------------
@@ -151,7 +168,8 @@ Answer:
         # 4. Generate Answer
         # ---------------------------------------------
         print("🔎 Sending prompt to Gemini...")
-        response = llm.generate_content(prompt)
+        with llm_limiter:
+            response = llm.generate_content(prompt)
         answer = _extract_text_from_genai_response(response).strip()
 
         # ---------------------------------------------
@@ -159,5 +177,8 @@ Answer:
         # ---------------------------------------------
         return format_answer(answer, docs)
 
+    except Rejected:
+        # Too many Gemini calls in flight → let the API answer 429
+        raise
     except Exception as e:
         return f"❌ RAG Pipeline Error → {e}"
@@ -0,0 +1,116 @@
+"""
+Export / import / verify SmartDoc index snapshots.
+
+Usage:
+    python snapshot.py export snapshots/primary.sdsnap
+    python snapshot.py verify snapshots/primary.sdsnap
+    python snapshot.py import snapshots/primary.sdsnap [--force]
+
+Import loads into a new index generation and switches to it only once
+the load is complete, so a running backend never sees a half-loaded index.
+Like bulk_ingest.py it goes through the single-owner write queue: if a
+backend is running, the import is handed to its ingest owner; otherwise
+this process takes the owner lock itself.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+# Ensure local imports work
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.index_manager import IndexManager
+from utils.index_state import IndexVersion, WriteQueue
+from utils.hierarchy import rebuild as rebuild_sections
+from utils.snapshot import export_snapshot, import_snapshot, verify_snapshot, SnapshotError
+from utils.upload_store import HashRegistry
+from utils.vector_store import load_existing_embeddings, force_remove_dir
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SmartDoc index snapshots")
+    parser.add_argument("command", choices=["export", "import", "verify"])
+    parser.add_argument("path", help="Snapshot file")
+    parser.add_argument("--db-root", default=os.getenv("VECTOR_DB_PATH", "./vectorstore"))
+    parser.add_argument("--force", action="store_true", help="Import even if the embedding model differs")
+    args = parser.parse_args()
+
+    index_manager = IndexManager(args.db_root)
+
+    try:
+        if args.command == "verify":
+            print(json.dumps(verify_snapshot(args.path), indent=2))
+
+        elif args.command == "export":
+            vectordb = load_existing_embeddings(index_manager.current_path())
+            if vectordb is None:
+                print("❌ Nothing to export — the index is empty.")
+                sys.exit(1)
+            os.makedirs(os.path.dirname(os.path.abspath(args.path)), exist_ok=True)
+            export_snapshot(vectordb, args.path, index_manager.documents.all())
+
+        else:
+            write_queue = WriteQueue(args.db_root)
+            if write_queue.try_become_owner():
+                import_locally(index_manager, args)
+            else:
+                print("📨 A backend owns the index → handing the import to it.")
+                import_on_owner(write_queue, args)
+
+    except SnapshotError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+def import_locally(index_manager: IndexManager, args):
+    """
+    This process holds owner.lock, so nothing else is writing: load into a
+    new generation, rebuild its section index, switch, bump VERSION so
+    running readers reload.
+    """
+    generation = index_manager.create_generation()
+    try:
+        vectordb, header = import_snapshot(args.path, generation, verify=True, force=args.force)
+    except BaseException:
+        force_remove_dir(generation)
+        raise
+
+    documents = header.get("documents", {})
+    index_manager.documents_for(generation).replace_all(documents)
+
+    # Snapshots carry chunks only; centroids are cheap to recompute from them
+    try:
+        rebuild_sections(vectordb, documents)
+    except Exception as e:
+        print(f"⚠️ Section index rebuild failed: {e}")
+
+    index_manager.activate(generation)
+    IndexVersion(args.db_root).bump(os.path.basename(generation))
+
+    HashRegistry("uploaded_docs").replace_all(HashRegistry.from_documents(documents))
+
+    # Still the owner and about to exit — delete old generations now
+    index_manager.collect_garbage()
+
+
+def import_on_owner(write_queue: WriteQueue, args):
+    """
+    Submits "import_snapshot" to the running backend's owner and waits for it.
+    """
+    result = asyncio.run(
+        write_queue.submit("import_snapshot", path=os.path.abspath(args.path), force=args.force)
+    )
+    if result.get("status") != 200:
+        print(f"❌ {result.get('detail')}")
+        sys.exit(1)
+    print(f"✅ {result['message']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import os
+import sys
+import importlib
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND not in sys.path:
+    sys.path.insert(0, BACKEND)
+
+
+@pytest.fixture
+def backend_main(tmp_path, monkeypatch):
+    """
+    Fresh `main` module rooted in a temp dir (uploads, index, snapshots),
+    without the startup warm-up.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path / "vectorstore"))
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    monkeypatch.setenv("EXTRACTION_CACHE_DIR", str(tmp_path / "extraction_cache"))
+    monkeypatch.setenv("WARM_UP", "0")
+
+    sys.modules.pop("main", None)
+    module = importlib.import_module("main")
+
+    # The controller is process-wide; a fresh one keeps per-client buckets
+    # from draining across tests
+    from utils.admission import AdmissionController
+    monkeypatch.setattr(module, "admission", AdmissionController())
+    yield module
+    sys.modules.pop("main", None)
+
+
+class HashEmbeddings:
+    """
+    Deterministic unit vectors from text hashes — stands in for the BGE
+    model so Chroma-backed code runs without downloading weights.
+    """
+
+    dim = 16
+
+    def _vector(self, text):
+        import hashlib
+        import numpy as np
+
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        v = np.random.default_rng(seed).standard_normal(self.dim)
+        return (v / np.linalg.norm(v)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+@pytest.fixture
+def fake_embeddings(monkeypatch):
+    pytest.importorskip("chromadb")
+    pytest.importorskip("langchain_community")
+
+    import utils.vector_store as vector_store
+
+    model = HashEmbeddings()
+    monkeypatch.setattr(vector_store, "get_embedding_model", lambda: model)
+    return model
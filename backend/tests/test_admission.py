@@ -0,0 +1,125 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from utils.admission import AdmissionController, Lane, Rejected
+
+
+def controller(slots=1, ingest_queue=4, client_rate=100.0, client_burst=100.0):
+    lanes = {
+        "interactive": Lane("interactive", priority=0, max_concurrency=slots, max_queue=4, max_wait_s=5),
+        "ingest": Lane("ingest", priority=1, max_concurrency=1, max_queue=ingest_queue, max_wait_s=5),
+        "transfer": Lane("transfer", priority=2, max_concurrency=4, max_queue=4, max_wait_s=5, shared=False),
+    }
+    adm = AdmissionController(slots=slots, lanes=lanes)
+    adm.enabled = True
+    adm.client_rate, adm.client_burst = client_rate, client_burst
+    return adm
+
+
+def test_freed_slot_goes_to_interactive_first():
+    async def scenario():
+        adm = controller(slots=1)
+        await adm.acquire("ingest", "a")
+        order = []
+
+        async def wait(lane, client):
+            await adm.acquire(lane, client)
+            order.append(lane)
+            adm.release(lane, client, 0.01)
+
+        ingest = asyncio.create_task(wait("ingest", "b"))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(wait("interactive", "c"))
+        await asyncio.sleep(0)
+
+        adm.release("ingest", "a", 0.01)
+        await asyncio.gather(ingest, interactive)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "ingest"]
+
+
+def test_full_queue_and_client_rate_are_shed():
+    async def scenario():
+        adm = controller(ingest_queue=0)
+        await adm.acquire("ingest", "a")
+        with pytest.raises(Rejected) as full:
+            await adm.acquire("ingest", "b")
+
+        limited = controller(client_rate=0.001, client_burst=1)
+        await limited.acquire("transfer", "x")
+        with pytest.raises(Rejected) as rate:
+            await limited.acquire("transfer", "x")
+        return full.value, rate.value
+
+    full, rate = asyncio.run(scenario())
+    assert full.reason == "queue_full" and full.retry_after >= 1
+    assert rate.reason == "client_rate"
+
+
+def test_slot_without_client_skips_client_limits():
+    async def scenario():
+        adm = controller(client_rate=0.001, client_burst=1)
+        await adm.acquire("transfer", "x")  # uses the client's only token
+        async with adm.slot("ingest"):
+            busy = (adm.lanes["ingest"].in_flight, adm.in_flight, dict(adm._client_active))
+        adm.release("transfer", "x", 0.01)
+        return busy, adm.lanes["ingest"].in_flight, adm._client_active
+
+    busy, after, clients = asyncio.run(scenario())
+    assert busy == (1, 1, {"x": 1})
+    assert after == 0 and clients == {}
+
+
+def test_lanes_for_routes(backend_main):
+    lane = backend_main.admission_lane
+    assert lane("POST", "/ask") == "interactive"
+    assert lane("POST", "/upload") == "transfer"
+    assert lane("PUT", "/upload/sessions/abc") == "transfer"
+    assert lane("POST", "/snapshots/upload") == "transfer"
+    assert lane("POST", "/upload/sessions/abc/complete") == "ingest"
+    assert lane("POST", "/ingest/bulk") == "ingest"
+    assert lane("GET", "/documents") is None
+
+
+def test_upload_holds_ingest_slot_only_after_the_body(backend_main, monkeypatch):
+    admission = backend_main.admission
+    monkeypatch.setattr(admission, "enabled", True)
+    seen = {}
+
+    real_save = backend_main.save_upload_stream
+
+    async def save(upload, dest_path, max_bytes=None):
+        seen["saving"] = (admission.lanes["transfer"].in_flight, admission.lanes["ingest"].in_flight)
+        return await real_save(upload, dest_path, max_bytes)
+
+    async def submit(op, **args):
+        seen["ingesting"] = (admission.lanes["transfer"].in_flight, admission.lanes["ingest"].in_flight)
+        return {"message": "ok", "op": op}
+
+    monkeypatch.setattr(backend_main, "save_upload_stream", save)
+    monkeypatch.setattr(backend_main.write_queue, "submit", submit)
+
+    with TestClient(backend_main.app) as client:
+        res = client.post("/upload", files={"file": ("a.txt", b"hello world", "text/plain")})
+
+    assert res.json() == {"message": "ok", "op": "ingest"}
+    assert seen == {"saving": (1, 0), "ingesting": (1, 1)}
+    assert admission.lanes["ingest"].in_flight == 0 and admission.lanes["transfer"].in_flight == 0
+
+
+def test_client_header_is_trusted_only_from_proxies(backend_main, monkeypatch):
+    def request(host, client_id=None):
+        headers = {"x-client-id": client_id} if client_id else {}
+        return SimpleNamespace(client=SimpleNamespace(host=host), headers=headers)
+
+    key = backend_main.client_key
+    assert key(request("203.0.113.7", "fresh-id")) == "203.0.113.7"
+
+    monkeypatch.setattr(backend_main, "TRUSTED_PROXIES", {"10.0.0.2"})
+    assert key(request("10.0.0.2", "session-1")) == "10.0.0.2/session-1"
+    assert key(request("10.0.0.2")) == "10.0.0.2"
+    assert key(request("203.0.113.7", "session-1")) == "203.0.113.7"
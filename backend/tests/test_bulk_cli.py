@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import threading
+
+import pytest
+
+import bulk_ingest
+from utils.index_manager import IndexManager
+from utils.index_state import IndexVersion, WriteQueue
+
+
+def write_corpus(root):
+    os.makedirs(root)
+    for i in range(2):
+        with open(os.path.join(root, f"doc{i}.txt"), "w", encoding="utf-8") as f:
+            f.write(f"Document {i} talks about pumps and valves. " * 40)
+
+
+def test_cli_takes_owner_lock_and_bumps_version(tmp_path, monkeypatch, fake_embeddings):
+    import utils.bulk_ingest
+
+    monkeypatch.setattr(utils.bulk_ingest, "get_embedding_model", lambda: fake_embeddings)
+    monkeypatch.chdir(tmp_path)
+    write_corpus(tmp_path / "corpus")
+    db_root = str(tmp_path / "vectorstore")
+
+    monkeypatch.setattr(sys, "argv", ["bulk_ingest.py", "corpus", "--db-root", db_root, "--workers", "1"])
+    with pytest.raises(SystemExit) as exit_info:
+        bulk_ingest.main()
+    assert exit_info.value.code == 0
+
+    manager = IndexManager(db_root)
+    version = IndexVersion(db_root).read()
+    assert version["version"] >= 1
+    assert version["generation"] == os.path.basename(manager.current_path())
+    assert len(manager.documents.all()) == 2
+
+
+def test_cli_hands_job_to_running_owner(tmp_path):
+    db_root = str(tmp_path / "vectorstore")
+    owner = WriteQueue(db_root, poll_interval=0.01)
+    assert owner.try_become_owner()
+
+    received = {}
+
+    def fake_bulk(source, job_id):
+        received["source"] = source
+        status = {"job_id": job_id, "status": "completed", "files_done": 2,
+                  "files_skipped": 0, "files_failed": []}
+        with open(os.path.join(owner.spool, f"bulk-{job_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(status, f)
+        return {**status, "status": "pending"}
+
+    owner.register("bulk", fake_bulk)
+    stop = threading.Event()
+
+    def serve():
+        while not stop.is_set():
+            owner.drain()
+            stop.wait(0.01)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    try:
+        cli_queue = WriteQueue(db_root, poll_interval=0.01)
+        assert not cli_queue.try_become_owner()
+        result = bulk_ingest.run_on_owner(cli_queue, "/data/corpus", poll_interval=0.01)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert received["source"] == "/data/corpus"
+    assert result["status"] == "completed" and result["files_done"] == 2
@@ -0,0 +1,160 @@
+import io
+import os
+import json
+import time
+import zipfile
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import utils.bulk_ingest
+from utils.extraction_cache import ExtractionCache
+from utils.bulk_ingest import BulkIngestJob, CheckpointManifest, extract_archive, iter_source_files
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_archive_members_stay_inside_staging(tmp_path):
+    archive = tmp_path / "docs.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("manuals/a.txt", "inside")
+        zf.writestr("../escape.txt", "outside")
+        zf.writestr("image.png", "not a document")
+
+    staging = tmp_path / "staging"
+    extracted = list(extract_archive(str(archive), str(staging)))
+
+    assert extracted == [str(staging / "manuals" / "a.txt")]
+    assert not (tmp_path / "escape.txt").exists()
+
+
+@pytest.mark.parametrize("limits", [{"max_members": 2}, {"max_bytes": 1000}])
+def test_archive_expansion_is_bounded(tmp_path, limits):
+    archive = tmp_path / "bomb.zip"
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(3):
+            zf.writestr(f"doc{i}.txt", "0" * 600)
+
+    with pytest.raises(ValueError):
+        list(extract_archive(str(archive), str(tmp_path / "staging"), **limits))
+
+
+def test_directory_sources_are_sorted_and_filtered(tmp_path):
+    for name in ("b.txt", "a.pdf", "sub/c.csv", "notes.md"):
+        write(str(tmp_path / "src" / name), "x")
+
+    files = [os.path.relpath(p, tmp_path / "src") for p in iter_source_files(str(tmp_path / "src"), "")]
+    assert files == ["a.pdf", "b.txt", os.path.join("sub", "c.csv")]
+
+
+def test_checkpoint_survives_torn_lines_and_deletes(tmp_path):
+    manifest = CheckpointManifest(str(tmp_path))
+    manifest.mark_done({"sha256": "a"})
+    manifest.mark_done({"sha256": "b"})
+    manifest.forget("b")
+    with open(manifest.path, "a", encoding="utf-8") as f:
+        f.write('{"sha256": "c"')  # crash mid-write
+
+    reloaded = CheckpointManifest(str(tmp_path))
+    assert reloaded.is_done("a")
+    assert not reloaded.is_done("b") and not reloaded.is_done("c")
+
+
+def test_rerun_skips_finished_files(tmp_path, monkeypatch, fake_embeddings):
+    monkeypatch.setattr(utils.bulk_ingest, "get_embedding_model", lambda: fake_embeddings)
+    cache = ExtractionCache(str(tmp_path / "extraction_cache"))
+    monkeypatch.setattr(utils.bulk_ingest, "get_extraction_cache", lambda: cache)
+    for i in range(3):
+        write(str(tmp_path / "src" / f"doc{i}.txt"), f"Document {i} covers maintenance intervals. " * 30)
+
+    def run():
+        done = []
+        job = BulkIngestJob(
+            str(tmp_path / "src"),
+            persist_dir=str(tmp_path / "index"),
+            staging_dir=str(tmp_path / "staging"),
+            workers=1,
+            on_file_done=done.append,
+        )
+        job.run()
+        return job.to_dict(), done
+
+    first, done = run()
+    assert first["status"] == "completed"
+    assert first["files_done"] == 3 and len(done) == 3
+    assert all(entry["chunks"] > 0 for entry in done)
+
+    second, done = run()
+    assert second["files_done"] == 0 and second["files_skipped"] == 3 and done == []
+
+    with open(tmp_path / "index" / "bulk_manifest.jsonl", encoding="utf-8") as f:
+        assert len([json.loads(line) for line in f]) == 3
+
+
+def test_cancel_under_the_write_lock_drops_pending_batches(tmp_path, monkeypatch, fake_embeddings):
+    monkeypatch.setattr(utils.bulk_ingest, "get_embedding_model", lambda: fake_embeddings)
+    cache = ExtractionCache(str(tmp_path / "extraction_cache"))
+    monkeypatch.setattr(utils.bulk_ingest, "get_extraction_cache", lambda: cache)
+    write(str(tmp_path / "src" / "doc.txt"), "Bleed the pump valve before start-up. " * 30)
+
+    lock = threading.Lock()
+    waiting = threading.Event()
+
+    class WriteLock:
+        # Stands in for the owner's write lock, held here by a "reset"
+        def __enter__(self):
+            waiting.set()
+            lock.acquire()
+
+        def __exit__(self, *exc):
+            lock.release()
+
+    done = []
+    job = BulkIngestJob(
+        str(tmp_path / "src"),
+        persist_dir=str(tmp_path / "index"),
+        staging_dir=str(tmp_path / "staging"),
+        workers=1,
+        on_file_done=done.append,
+        write_lock=WriteLock(),
+    )
+
+    with lock:
+        runner = threading.Thread(target=job.run)
+        runner.start()
+        assert waiting.wait(30)
+        job.cancel("Index was reset.")
+    runner.join(30)
+
+    assert job.status == "cancelled" and job.error == "Index was reset."
+    assert job.chunks_written == 0 and done == []
+    assert not (tmp_path / "index" / "bulk_manifest.jsonl").exists()
+
+
+def test_uploaded_archives_are_staged_per_job_and_removed(backend_main, tmp_path, monkeypatch, fake_embeddings):
+    monkeypatch.setattr(utils.bulk_ingest, "get_embedding_model", lambda: fake_embeddings)
+    cache = ExtractionCache(str(tmp_path / "extraction_cache"))
+    monkeypatch.setattr(utils.bulk_ingest, "get_extraction_cache", lambda: cache)
+    monkeypatch.setenv("BULK_EXTRACT_WORKERS", "1")
+
+    body = io.BytesIO()
+    with zipfile.ZipFile(body, "w") as zf:
+        zf.writestr("manual.txt", "Bleed the pump valve before start-up. " * 30)
+
+    with TestClient(backend_main.app) as client:
+        res = client.post("/ingest/bulk/archive", files={"file": ("docs.zip", body.getvalue(), "application/zip")})
+        assert res.status_code == 200, res.text
+        job_id = res.json()["job_id"]
+
+        deadline = time.time() + 30
+        while client.get(f"/ingest/bulk/{job_id}").json()["status"] in ("pending", "running"):
+            assert time.time() < deadline
+            time.sleep(0.05)
+        assert client.get(f"/ingest/bulk/{job_id}").json()["files_done"] == 1
+
+    assert not os.path.exists(os.path.join(backend_main.BULK_STAGING_DIR, job_id))
@@ -0,0 +1,67 @@
+import csv
+
+import pytest
+
+from utils.document_loader import iter_csv_chunks, parse_columns
+from utils.ingest import dedup_key, iter_chunk_batches
+
+pytest.importorskip("pandas")
+
+
+@pytest.fixture
+def table(tmp_path):
+    path = tmp_path / "parts.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "notes"])
+        for i in range(200):
+            writer.writerow([i, f"part, model {i}", "" if i % 7 else "check seal"])
+    return str(path)
+
+
+def test_chunks_repeat_header_and_never_split_rows(table):
+    chunks = list(iter_csv_chunks(table, chunk_chars=400))
+
+    assert len(chunks) > 5
+    rows = []
+    for text, meta in chunks:
+        lines = text.split("\n")
+        assert lines[0] == "id,name,notes"
+        assert len(text) <= 400
+        assert meta["row_end"] - meta["row_start"] + 1 == len(lines) - 1
+        assert meta["columns"] == "id,name,notes"
+        rows.extend(lines[1:])
+
+    assert len(rows) == 200
+    assert rows[0] == '0,"part, model 0",check seal'  # quoting survives
+    assert [m["row_start"] for _, m in chunks][0] == 0
+    assert chunks[-1][1]["row_end"] == 199
+
+
+def test_column_selection(table):
+    text, meta = next(iter_csv_chunks(table, columns="id, notes", chunk_chars=10_000))
+    assert text.split("\n")[:2] == ["id,notes", "0,check seal"]
+    assert meta["columns"] == "id,notes"
+
+
+def test_unknown_column_is_reported(table):
+    with pytest.raises(ValueError):
+        list(iter_csv_chunks(table, columns=["nope"]))
+
+
+def test_parse_columns_falls_back_to_env(monkeypatch):
+    monkeypatch.setenv("CSV_COLUMNS", "a, b")
+    assert parse_columns(None) == ["a", "b"]
+    assert parse_columns(["x"]) == ["x"]
+    monkeypatch.delenv("CSV_COLUMNS")
+    assert parse_columns("") is None
+
+
+def test_batches_carry_row_metadata_and_dedup_key(table):
+    batches = list(iter_chunk_batches(table, "f" * 64, columns="name"))
+    texts, ids, metadatas = batches[0]
+
+    assert ids[0] == f"{'f' * 16}-0"
+    assert metadatas[0]["row_start"] == 0 and metadatas[0]["columns"] == "name"
+    assert dedup_key(table, "f" * 64, "name") == "f" * 64 + ":name"
+    assert dedup_key(table, "f" * 64) == "f" * 64
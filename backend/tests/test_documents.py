@@ -0,0 +1,108 @@
+import hashlib
+
+from fastapi.testclient import TestClient
+
+
+def upload(client, name, body):
+    res = client.post("/upload", files={"file": (name, body, "text/plain")})
+    assert res.status_code == 200, res.text
+    return res.json()["doc_id"]
+
+
+def test_same_named_uploads_keep_their_own_bytes(backend_main, fake_embeddings):
+    x = b"The pump manual says to bleed the valve before start-up.\n" * 20
+    y = b"The heater manual says to check the thermostat fuse first.\n" * 20
+
+    with TestClient(backend_main.app) as client:
+        doc_x = upload(client, "manual.txt", x)
+        doc_y = upload(client, "manual.txt", y)
+        assert doc_x != doc_y
+
+        res = client.get(f"/documents/{doc_x}/file")
+        assert res.status_code == 200
+        assert res.content == x
+        assert res.headers["etag"].strip('"') == hashlib.sha256(x).hexdigest()
+
+        assert client.delete(f"/documents/{doc_x}").status_code == 200
+
+        res = client.get(f"/documents/{doc_y}/file")
+        assert res.status_code == 200
+        assert res.content == y
+
+        listed = {d["doc_id"]: d for d in client.get("/documents").json()["documents"]}
+        assert listed[doc_y]["source"] == "manual.txt"
+
+
+def test_file_whose_bytes_changed_is_not_served(backend_main, fake_embeddings, tmp_path):
+    legacy = tmp_path / "uploaded_docs" / "legacy.txt"
+    legacy.parent.mkdir(exist_ok=True)
+    legacy.write_bytes(b"original bytes")
+    sha = hashlib.sha256(b"original bytes").hexdigest()
+    backend_main.index_manager.documents.add(sha[:16], {"sha256": sha, "source": "legacy.txt", "path": str(legacy), "chunks": 0})
+
+    with TestClient(backend_main.app) as client:
+        assert client.get(f"/documents/{sha[:16]}/file").status_code == 200
+
+        legacy.write_bytes(b"someone else's upload with the same name")
+        assert client.get(f"/documents/{sha[:16]}/file").status_code == 404
+
+        client.delete(f"/documents/{sha[:16]}")
+        assert legacy.exists()
+
+
+def test_server_path_ingest_needs_a_root_and_stays_inside_it(backend_main, tmp_path, monkeypatch):
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "secret.txt").write_text("not for the index")
+    root = tmp_path / "corpus"
+    root.mkdir()
+    (root / "escape").symlink_to(outside)
+
+    with TestClient(backend_main.app) as client:
+        assert client.post("/ingest/bulk", json={"path": str(outside)}).status_code == 403
+
+        monkeypatch.setenv("BULK_INGEST_ROOT", str(root))
+        assert client.post("/ingest/bulk", json={"path": str(outside)}).status_code == 403
+        assert client.post("/ingest/bulk", json={"path": str(root / "escape")}).status_code == 403
+        assert client.post("/ingest/bulk", json={"path": str(root / "missing")}).status_code == 404
+
+
+def test_files_outside_the_upload_dir_are_not_served(backend_main, tmp_path):
+    source = tmp_path / "corpus" / "manual.txt"
+    source.parent.mkdir()
+    source.write_bytes(b"bulk source bytes")
+    sha = hashlib.sha256(b"bulk source bytes").hexdigest()
+    backend_main.index_manager.documents.add(sha[:16], {"sha256": sha, "source": "manual.txt", "path": str(source), "chunks": 0})
+
+    with TestClient(backend_main.app) as client:
+        assert client.get(f"/documents/{sha[:16]}/file").status_code == 404
+
+
+def test_reingesting_other_csv_columns_forgets_the_old_selection(backend_main, fake_embeddings):
+    table = b"a,b\n" + b"pump valve,heater fuse\n" * 20
+
+    with TestClient(backend_main.app) as client:
+        def ingest(columns):
+            res = client.post("/upload", files={"file": ("t.csv", table, "text/csv")}, data={"csv_columns": columns})
+            assert res.status_code == 200, res.text
+            return res.json()
+
+        doc_id = ingest("a")["doc_id"]
+        ingest("b")
+        assert not ingest("a").get("duplicate")
+
+        chunks = backend_main.get_vectordb()._collection.get(where={"doc_id": doc_id})
+        assert chunks["ids"] and all(m["columns"] == "a" for m in chunks["metadatas"])
+        assert ingest("a").get("duplicate")
+
+
+def test_page_text_format_and_unsupported_types(backend_main, fake_embeddings):
+    with TestClient(backend_main.app) as client:
+        txt = upload(client, "manual.txt", b"Bleed the pump valve before start-up.\n" * 20)
+        csv = upload(client, "parts.csv", b"part,qty\n" + b"valve,2\n" * 20)
+
+        res = client.get(f"/documents/{txt}/pages/1", params={"format": "text"})
+        assert res.status_code == 200 and "Bleed the pump valve" in res.json()["text"]
+
+        assert client.get(f"/documents/{csv}/pages/1", params={"format": "text"}).status_code == 400
+        assert client.get(f"/documents/{txt}/pages/1", params={"format": "docx"}).status_code == 400
@@ -0,0 +1,72 @@
+import os
+import importlib
+
+import utils.document_loader as document_loader
+from utils.extraction_cache import ExtractionCache, load_text
+
+PAGES = [
+    {"page": 1, "text": "First page text. " * 50, "tables": [[["a", "b"], ["1", "2"]]]},
+    {"page": 2, "text": "Second page text. " * 50, "tables": []},
+]
+
+
+def key(n):
+    return f"{n:064x}"
+
+
+def test_table_extraction_is_on_by_default(monkeypatch):
+    monkeypatch.delenv("EXTRACT_TABLES", raising=False)
+    try:
+        importlib.reload(document_loader)
+        assert document_loader.EXTRACT_TABLES is True
+        assert document_loader.extractor_version().endswith("+tables-1")
+    finally:
+        monkeypatch.undo()
+        importlib.reload(document_loader)
+
+
+def test_round_trip_and_single_page(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+    assert cache.get(key(1)) is None
+
+    cache.put(key(1), PAGES, source="a.pdf")
+
+    assert cache.get(key(1)) == PAGES
+    assert cache.get_page(key(1), 2) == PAGES[1]
+    assert cache.get_page(key(1), 3) is None
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+    for n in range(4):
+        cache.put(key(n), PAGES)
+        os.utime(cache._path(key(n)), (1000 + n, 1000 + n))
+
+    # Reading entry 0 makes it the most recently used
+    cache.get(key(0))
+    entry_size = os.path.getsize(cache._path(key(1)))
+
+    cache.evict(max_bytes=int(entry_size * 3))
+
+    assert cache.get(key(0)) is not None
+    assert cache.get(key(1)) is None
+    assert cache.get(key(3)) is not None
+
+
+def test_load_text_extracts_once(tmp_path, monkeypatch):
+    path = tmp_path / "notes.txt"
+    path.write_text("hello cached world", encoding="utf-8")
+    cache = ExtractionCache(str(tmp_path / "cache"))
+
+    calls = []
+    real = document_loader.extract_pages
+    monkeypatch.setattr("utils.extraction_cache.extract_pages", lambda p: calls.append(p) or real(p))
+
+    first = load_text(str(path), key(9), cache)
+    second = load_text(str(path), key(9), cache)
+
+    assert first == second and "hello cached world" in first
+    assert len(calls) == 1
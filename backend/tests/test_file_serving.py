@@ -0,0 +1,77 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from utils.file_serving import parse_range, RangeNotSatisfiable, file_response, bytes_response
+
+BODY = bytes(range(256)) * 40  # 10240 bytes
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 10239)),
+    ("bytes=-100", (10140, 10239)),
+    ("bytes=10000-99999", (10000, 10239)),
+    ("bytes=0-1,5-6", None),       # multi-range → full body
+    ("items=0-1", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, len(BODY)) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=10240-", "bytes=5-4", "bytes=-0"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range(header, len(BODY))
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(BODY)
+
+    app = FastAPI()
+
+    @app.get("/file")
+    def serve_file(request: Request):
+        return file_response(request, str(path), etag="abc123", filename="doc.pdf")
+
+    @app.get("/bytes")
+    def serve_bytes(request: Request):
+        return bytes_response(request, BODY, etag="abc123-p1", media_type="application/pdf")
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("url", ["/file", "/bytes"])
+def test_full_and_partial_content(client, url):
+    res = client.get(url)
+    assert res.status_code == 200
+    assert res.content == BODY
+    assert res.headers["accept-ranges"] == "bytes"
+
+    res = client.get(url, headers={"Range": "bytes=100-199"})
+    assert res.status_code == 206
+    assert res.content == BODY[100:200]
+    assert res.headers["content-range"] == f"bytes 100-199/{len(BODY)}"
+
+
+@pytest.mark.parametrize("url", ["/file", "/bytes"])
+def test_unsatisfiable_range(client, url):
+    res = client.get(url, headers={"Range": "bytes=999999-"})
+    assert res.status_code == 416
+    assert res.headers["content-range"] == f"bytes */{len(BODY)}"
+
+
+def test_conditional_get_and_if_range(client):
+    etag = client.get("/file").headers["etag"]
+
+    assert client.get("/file", headers={"If-None-Match": etag}).status_code == 304
+
+    # Stale validator → whole (new) representation instead of a mismatched slice
+    res = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+    assert res.status_code == 200 and res.content == BODY
+
+    res = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert res.status_code == 206 and res.content == BODY[:10]
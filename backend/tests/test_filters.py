@@ -0,0 +1,78 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from utils.filters import RetrievalFilter, Scope, and_where, file_type
+from utils.hierarchy import flat_search_by_vector
+from utils.vector_store import open_vectordb, add_embedded_batch
+
+DOCUMENTS = {
+    "a" * 16: {"source": "Pump.PDF", "added_at": 100.0},
+    "b" * 16: {"source": "heater.txt", "added_at": 200.0},
+    "c" * 16: {"source": "parts.csv", "added_at": 300.0},
+}
+
+
+def test_and_where_flattens_and_unwraps():
+    assert and_where() is None
+    assert and_where(None, {"x": 1}) == {"x": 1}
+    assert and_where({"$and": [{"x": 1}, {"y": 2}]}, {"z": 3}) == {"$and": [{"x": 1}, {"y": 2}, {"z": 3}]}
+
+
+def test_file_type_is_lowercase_extension():
+    assert file_type("Pump.PDF") == "pdf" and file_type(None) == ""
+
+
+@pytest.mark.parametrize("flt,doc_ids", [
+    (RetrievalFilter(file_types=[".PDF"]), ("a" * 16,)),
+    (RetrievalFilter(sources=["HEATER.TXT"]), ("b" * 16,)),
+    (RetrievalFilter(uploaded_after=150, uploaded_before=300), ("b" * 16, "c" * 16)),
+    (RetrievalFilter(doc_ids=["c" * 16], file_types=["csv", "txt"]), ("c" * 16,)),
+])
+def test_document_predicates_become_doc_id_clause(flt, doc_ids):
+    scope = flt.resolve(DOCUMENTS)
+    assert scope.doc_ids == doc_ids
+    assert scope.where == {"doc_id": {"$in": list(doc_ids)}}
+
+
+def test_edge_scopes():
+    assert RetrievalFilter(file_types=["docx"]).resolve(DOCUMENTS).empty
+    # Matches every document → nothing to prune
+    assert RetrievalFilter(uploaded_after=0).resolve(DOCUMENTS) == Scope()
+    assert RetrievalFilter(page_from=2, page_to=3).resolve(DOCUMENTS) == Scope(
+        where={"$and": [{"page": {"$gte": 2}}, {"page": {"$lte": 3}}]}
+    )
+    with pytest.raises(ValueError):
+        RetrievalFilter(page_from=5, page_to=2)
+
+
+def test_where_prefilters_inside_chroma(tmp_path, fake_embeddings):
+    db = open_vectordb(str(tmp_path), embedding_model=fake_embeddings)
+    ids, texts, metas = [], [], []
+    for doc_id, entry in DOCUMENTS.items():
+        for n in range(8):
+            ids.append(f"{doc_id}-{n}")
+            texts.append(f"{entry['source']} chunk {n}")
+            metas.append({"doc_id": doc_id, "source": entry["source"], "chunk": n, "page": n // 2 + 1})
+    add_embedded_batch(db, ids, fake_embeddings.embed_documents(texts), texts, metas)
+
+    scope = RetrievalFilter(file_types=["txt"], page_from=2, page_to=3).resolve(DOCUMENTS)
+    hits = flat_search_by_vector(db, fake_embeddings.embed_query("Pump.PDF chunk 0"), 10, where=scope.where)
+
+    assert len(hits) == 4
+    assert all(d.metadata["doc_id"] == "b" * 16 and 2 <= d.metadata["page"] <= 3 for d, _ in hits)
+
+
+def test_retrieve_endpoint_applies_filters(backend_main, fake_embeddings):
+    with TestClient(backend_main.app) as client:
+        for name, line in (("pump.txt", "Bleed the pump valve. "), ("heater.csv", "fuse,amps\n")):
+            client.post("/upload", files={"file": (name, (line * 100).encode(), "text/plain")})
+
+        res = client.post("/retrieve", json={"question": "valve", "k": 20, "filters": {"file_types": ["txt"]}})
+        contexts = res.json()["contexts"]
+        assert contexts and {c["metadata"]["source"] for c in contexts} == {"pump.txt"}
+
+        res = client.post("/retrieve", json={"question": "valve", "filters": {"file_types": ["docx"]}})
+        assert res.json()["contexts"] == []
+
+        res = client.post("/retrieve", json={"question": "valve", "filters": {"page_from": 4, "page_to": 1}})
+        assert res.status_code == 400
@@ -0,0 +1,78 @@
+import pytest
+
+import utils.hierarchy as hierarchy
+from utils.filters import RetrievalFilter
+from utils.vector_store import open_vectordb, add_embedded_batch, build_chunk_records, SECTION_CHUNKS
+
+DOCS = {f"{d:016x}": {"source": f"doc{d}.txt", "chunks": 40} for d in range(3)}
+
+
+@pytest.fixture
+def corpus(tmp_path, fake_embeddings):
+    db = open_vectordb(str(tmp_path), embedding_model=fake_embeddings)
+    for doc_id, entry in DOCS.items():
+        chunks = [f"{entry['source']} chunk {n}" for n in range(entry["chunks"])]
+        ids, metas = build_chunk_records(chunks, doc_id * 4, entry["source"])
+        add_embedded_batch(db, ids, fake_embeddings.embed_documents(chunks), chunks, metas)
+
+    yield db
+    hierarchy.forget_sections(str(tmp_path))
+
+
+def test_rebuild_writes_section_and_document_centroids(corpus):
+    sections_per_doc = -(-40 // SECTION_CHUNKS)
+    assert hierarchy.rebuild(corpus, DOCS) == 3 * sections_per_doc
+
+    sections = hierarchy.open_sections(corpus._persist_directory)._collection
+    assert sections.count() == 3 * (sections_per_doc + 1)
+    assert len(sections.get(where={"level": "document"})["ids"]) == 3
+
+    meta = corpus._collection.get(ids=[f"{'0' * 16}-17"])["metadatas"][0]
+    assert meta["section_id"] == f"{'0' * 16}-s1"
+
+
+def test_coarse_to_fine_finds_the_exact_chunk(corpus, fake_embeddings, monkeypatch):
+    hierarchy.rebuild(corpus, DOCS)
+    monkeypatch.setattr(hierarchy, "RETRIEVAL_MODE", "hierarchical")
+    monkeypatch.setattr(hierarchy, "HIER_TOP_GROUPS", 100)
+
+    hits = hierarchy.search(corpus, "doc1.txt chunk 33", k=3)
+    assert hits[0][0].page_content == "doc1.txt chunk 33"
+    assert hits[0][1] == pytest.approx(1.0, abs=1e-3)
+
+    vector = fake_embeddings.embed_query("doc2.txt chunk 5")
+    sections = hierarchy.open_sections(corpus._persist_directory)
+    hits = hierarchy.coarse_to_fine_by_vector(corpus, sections, vector, 1, top_groups=3, level="document")
+    assert hits[0][0].page_content == "doc2.txt chunk 5"
+
+
+def test_filter_scope_limits_both_stages(corpus, monkeypatch):
+    hierarchy.rebuild(corpus, DOCS)
+    monkeypatch.setattr(hierarchy, "RETRIEVAL_MODE", "hierarchical")
+    monkeypatch.setattr(hierarchy, "HIER_TOP_GROUPS", 1)
+
+    # Two eligible documents > HIER_TOP_GROUPS → the coarse stage runs
+    eligible = {f"{1:016x}", f"{2:016x}"}
+    scope = RetrievalFilter(doc_ids=sorted(eligible)).resolve(DOCS)
+    hits = hierarchy.search(corpus, "doc0.txt chunk 3", k=5, scope=scope)
+
+    assert len(hits) == 5
+    assert {doc.metadata["doc_id"] for doc, _ in hits} < eligible
+
+
+def test_parent_context_returns_whole_sections(corpus):
+    hits = hierarchy.search(corpus, "doc0.txt chunk 20", k=1, parent_context=True)
+
+    parent, _ = hits[0]
+    assert parent.metadata["parent"] == f"{'0' * 16}-s1"
+    assert parent.metadata["hit_chunk"] == 20
+    assert parent.page_content.split("\n")[0] == f"doc0.txt chunk {SECTION_CHUNKS}"
+
+
+def test_remove_document_drops_its_sections(corpus):
+    hierarchy.rebuild(corpus, DOCS)
+    hierarchy.remove_document(corpus._persist_directory, f"{0:016x}")
+
+    sections = hierarchy.open_sections(corpus._persist_directory)._collection
+    assert sections.get(where={"doc_id": f"{0:016x}"})["ids"] == []
+    assert sections.get(where={"doc_id": f"{1:016x}"})["ids"]
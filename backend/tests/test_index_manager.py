@@ -0,0 +1,74 @@
+import os
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+import utils.index_manager as index_manager
+from utils.index_manager import IndexManager, DocumentManifest
+
+
+def test_reset_switches_to_an_empty_generation(tmp_path, monkeypatch):
+    manager = IndexManager(str(tmp_path))
+    monkeypatch.setattr(manager, "collect_garbage_async", lambda: None)
+    old = manager.current_path()
+    manager.documents.add("a" * 16, {"source": "a.txt", "chunks": 2})
+
+    new = manager.reset()
+
+    assert new != old and manager.current_path() == new
+    assert manager.documents.all() == {}
+    assert manager.documents_for(old).get("a" * 16)["chunks"] == 2
+
+
+def test_garbage_collection_spares_newer_inactive_generations(tmp_path, monkeypatch):
+    manager = IndexManager(str(tmp_path))
+    monkeypatch.setattr(manager, "collect_garbage_async", lambda: None)  # swept explicitly below
+    old = manager.current_path()
+    live = manager.activate(manager.create_generation())
+    importing = manager.create_generation()
+
+    assert manager.stale_generations() == [old]
+
+    manager.collect_garbage()
+    assert not os.path.exists(old)
+    assert os.path.isdir(live) and os.path.isdir(importing)
+
+
+def test_generations_created_in_the_same_millisecond_stay_ordered(tmp_path, monkeypatch):
+    manager = IndexManager(str(tmp_path))
+    monkeypatch.setattr(manager, "collect_garbage_async", lambda: None)
+    monkeypatch.setattr(index_manager, "time", SimpleNamespace(time=lambda: 1_700_000_000.0))
+
+    old = manager.current_path()
+    live = manager.activate(manager.create_generation())
+
+    assert os.path.basename(live) > os.path.basename(old)
+    assert manager.stale_generations() == [old]
+
+
+def test_chunk_ids_are_enumerated_from_the_count():
+    assert DocumentManifest.chunk_ids("d", {"chunks": 3}) == ["d-0", "d-1", "d-2"]
+    assert DocumentManifest.chunk_ids("d", {}) == []
+
+
+def test_delete_removes_only_that_documents_chunks(backend_main, fake_embeddings):
+    with TestClient(backend_main.app) as client:
+        ids = []
+        for name, line in (("pump.txt", "Bleed the pump valve. "), ("heater.txt", "Check the heater fuse. ")):
+            res = client.post("/upload", files={"file": (name, (line * 200).encode(), "text/plain")})
+            ids.append(res.json()["doc_id"])
+
+        collection = backend_main.get_vectordb()._collection
+        assert collection.get(where={"doc_id": ids[0]})["ids"]
+
+        assert client.delete(f"/documents/{ids[0]}").status_code == 200
+        assert client.delete(f"/documents/{ids[0]}").status_code == 404
+
+        collection = backend_main.get_vectordb()._collection
+        assert collection.get(where={"doc_id": ids[0]})["ids"] == []
+        assert collection.get(where={"doc_id": ids[1]})["ids"]
+        assert [d["doc_id"] for d in client.get("/documents").json()["documents"]] == [ids[1]]
+
+        # Same bytes again → ingested again, not treated as a duplicate
+        res = client.post("/upload", files={"file": ("pump.txt", ("Bleed the pump valve. " * 200).encode(), "text/plain")})
+        assert not res.json().get("duplicate")
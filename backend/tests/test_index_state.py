@@ -0,0 +1,80 @@
+import os
+import json
+import asyncio
+
+from utils.index_state import IndexVersion, IndexWatcher, WriteQueue, SPOOL_DIR, VERSION_FILE
+from utils.index_manager import IndexManager, CURRENT_FILE
+
+
+def test_version_bump_is_seen_once(tmp_path):
+    version = IndexVersion(str(tmp_path))
+    watcher = IndexWatcher(version)
+    assert not watcher.changed()
+
+    assert version.bump("gen-1") == 1
+    assert watcher.changed()
+    assert not watcher.changed()
+    assert version.read()["generation"] == "gen-1"
+
+
+def test_owner_runs_jobs_and_serializes_writes(tmp_path):
+    queue = WriteQueue(str(tmp_path))
+    queue.register("add", lambda a, b: a + b)
+    assert asyncio.run(queue.submit("add", a=2, b=3)) == 5
+    assert queue.is_owner
+
+
+def test_second_queue_is_not_owner_and_spools(tmp_path):
+    owner = WriteQueue(str(tmp_path))
+    owner.register("echo", lambda value: value)
+    assert owner.try_become_owner()
+
+    other = WriteQueue(str(tmp_path))
+    assert not other.try_become_owner()
+    asyncio.run(other.submit("echo", wait=False, value="hi"))
+
+    owner.drain()
+    results = [n for n in os.listdir(owner.spool) if n.endswith(".result.json")]
+    assert len(results) == 1
+    with open(os.path.join(owner.spool, results[0]), encoding="utf-8") as f:
+        assert json.load(f) == {"ok": True, "result": "hi"}
+
+
+def test_spool_is_recreated_and_ownership_reelected(tmp_path):
+    queue = WriteQueue(str(tmp_path))
+    assert queue.try_become_owner()
+
+    os.rename(queue.spool, str(tmp_path / "moved"))
+    assert queue._ensure_spool()
+    assert not queue.is_owner
+    assert os.path.isdir(queue.spool)
+    assert queue.try_become_owner()
+
+
+def test_legacy_layout_adoption_keeps_coordination_files_at_root(tmp_path):
+    root = tmp_path / "vectorstore"
+    root.mkdir()
+    (root / "chroma.sqlite3").write_bytes(b"legacy")
+    (root / "3f2c-segment").mkdir()
+
+    # What a worker creates before the index is first touched
+    queue = WriteQueue(str(root))
+    IndexVersion(str(root)).bump("")
+    (root / (VERSION_FILE + ".lock")).touch()
+
+    manager = IndexManager(str(root))
+    generation = manager.current_path()
+
+    assert os.path.isfile(os.path.join(generation, "chroma.sqlite3"))
+    assert os.path.isdir(os.path.join(generation, "3f2c-segment"))
+    for entry in (SPOOL_DIR, VERSION_FILE, VERSION_FILE + ".lock"):
+        assert (root / entry).exists()
+        assert not os.path.exists(os.path.join(generation, entry))
+
+    # The spool still works after adoption
+    queue.register("ping", lambda: "pong")
+    assert asyncio.run(queue.submit("ping")) == "pong"
+
+    # Second call reuses the pointer instead of adopting again
+    assert manager.current_path() == generation
+    assert (root / CURRENT_FILE).read_text().strip() == os.path.basename(generation)
@@ -0,0 +1,7 @@
+def test_main_imports(backend_main):
+    assert backend_main.app is not None
+
+
+def test_write_queue_ops_registered(backend_main):
+    for op in ("ingest", "delete", "bulk", "cache_stats", "cache_evict"):
+        assert op in backend_main.write_queue.handlers
@@ -0,0 +1,44 @@
+import os
+
+from fastapi.testclient import TestClient
+
+
+def test_reset_runs_on_the_write_queue(backend_main, monkeypatch):
+    calls = []
+    original = backend_main.write_queue.handlers["reset"]
+    backend_main.write_queue.register("reset", lambda: calls.append("reset") or original())
+
+    before = backend_main.index_manager.current_path()
+    with TestClient(backend_main.app) as client:
+        res = client.post("/reset")
+
+    assert res.status_code == 200
+    assert calls == ["reset"]
+    after = backend_main.index_manager.current_path()
+    assert after != before and os.path.isdir(after)
+
+
+def test_snapshot_import_errors_keep_their_status(backend_main, tmp_path):
+    os.makedirs(backend_main.SNAPSHOT_DIR, exist_ok=True)
+    with open(os.path.join(backend_main.SNAPSHOT_DIR, "broken.sdsnap"), "wb") as f:
+        f.write(b"not a snapshot")
+
+    live = backend_main.index_manager.current_path()
+    with TestClient(backend_main.app) as client:
+        res = client.post("/snapshots/broken/import")
+
+    assert res.status_code == 422
+    assert backend_main.index_manager.current_path() == live
+
+
+def test_reset_cancels_running_bulk_jobs(backend_main, tmp_path):
+    from utils.bulk_ingest import BulkIngestJob
+
+    job = BulkIngestJob(str(tmp_path), persist_dir=backend_main.index_manager.current_path(), staging_dir=str(tmp_path))
+    job.status = "running"
+    backend_main.bulk_jobs[job.job_id] = job
+
+    with TestClient(backend_main.app) as client:
+        assert client.post("/reset").status_code == 200
+
+    assert job.cancel_reason == "Index was reset."
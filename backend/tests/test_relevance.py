@@ -0,0 +1,75 @@
+import pytest
+
+from utils.relevance import RelevancePolicy, RelevanceMetrics, distance_to_similarity, get_relevance_policy
+from utils.vector_store import open_vectordb, add_embedded_batch, build_chunk_records
+
+SCORED = [("a", 0.91), ("b", 0.84), ("c", 0.70), ("d", 0.40)]
+
+
+@pytest.mark.parametrize("mode,expected", [
+    ("off", ["a", "b", "c", "d"]),
+    ("threshold", ["a", "b", "c"]),
+    ("adaptive", ["a", "b"]),
+])
+def test_policy_modes(mode, expected):
+    policy = RelevancePolicy(mode=mode, min_score=0.55, max_drop=0.12)
+    assert [doc for doc, _ in policy.select(SCORED)] == expected
+
+
+def test_nothing_relevant_keeps_nothing():
+    assert RelevancePolicy().select([("x", 0.2), ("y", 0.1)]) == []
+
+
+def test_policy_from_env(monkeypatch):
+    monkeypatch.setenv("RELEVANCE_MODE", "Threshold")
+    monkeypatch.setenv("RELEVANCE_MIN_SCORE", "0.7")
+    assert get_relevance_policy() == RelevancePolicy(mode="threshold", min_score=0.7)
+
+    monkeypatch.setenv("RELEVANCE_MODE", "strict")
+    with pytest.raises(ValueError):
+        get_relevance_policy()
+
+
+@pytest.mark.parametrize("distance,space,similarity", [
+    (0.0, "l2", 1.0), (2.0, "l2", 0.0), (0.3, "cosine", 0.7), (0.3, "ip", 0.7),
+])
+def test_distance_to_similarity(distance, space, similarity):
+    assert distance_to_similarity(distance, space) == pytest.approx(similarity)
+
+
+def test_metrics_count_avoided_calls():
+    metrics = RelevanceMetrics()
+    metrics.record(5, 2, 0.8)
+    metrics.record(5, 0, 0.3)
+
+    stats = metrics.to_dict(RelevancePolicy())
+    assert (stats["llm_calls"], stats["llm_calls_avoided"], stats["avoided_rate"]) == (1, 1, 0.5)
+    assert stats["avg_chunks_sent"] == 2 and stats["avg_top_score"] == 0.55
+
+
+class RecordingLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        return type("Response", (), {"text": "Bleed the valve first."})()
+
+
+def test_off_topic_question_skips_the_llm(tmp_path, fake_embeddings):
+    from rag_pipeline import answer_question
+
+    db = open_vectordb(str(tmp_path), embedding_model=fake_embeddings)
+    chunks = ["Bleed the pump valve before start-up.", "Replace the heater fuse yearly."]
+    ids, metas = build_chunk_records(chunks, "cd" * 32, "manual.txt")
+    add_embedded_batch(db, ids, fake_embeddings.embed_documents(chunks), chunks, metas)
+
+    llm = RecordingLLM()
+    policy = RelevancePolicy(mode="threshold", min_score=0.95)
+
+    answer = answer_question("Who won the 1998 world cup?", db, llm, k=2, policy=policy)
+    assert "I don't know" in answer and llm.prompts == []
+
+    answer = answer_question(chunks[0], db, llm, k=2, policy=policy)
+    assert "Bleed the valve first." in answer
+    assert len(llm.prompts) == 1 and chunks[0] in llm.prompts[0] and chunks[1] not in llm.prompts[0]
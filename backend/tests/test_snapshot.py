@@ -0,0 +1,135 @@
+import os
+import sys
+import threading
+
+import pytest
+
+import snapshot
+from utils.hierarchy import open_sections, forget_sections
+from utils.index_manager import IndexManager
+from utils.index_state import IndexVersion, WriteQueue
+from utils.snapshot import export_snapshot, import_snapshot, verify_snapshot, SnapshotError
+from utils.vector_store import open_vectordb, add_embedded_batch, build_chunk_records
+from utils.upload_store import HashRegistry
+
+
+def populated_db(path, embeddings):
+    db = open_vectordb(str(path), embedding_model=embeddings)
+    chunks = [f"chunk number {i} about topic {i % 3}" for i in range(12)]
+    ids, metas = build_chunk_records(chunks, "ab" * 32, "manual.pdf")
+    add_embedded_batch(db, ids, embeddings.embed_documents(chunks), chunks, metas)
+    return db
+
+
+def test_export_verify_import_round_trip(tmp_path, fake_embeddings):
+    db = populated_db(tmp_path / "src", fake_embeddings)
+    documents = {"abababababababab": {"source": "manual.pdf", "sha256": "ab" * 32, "chunks": 12}}
+
+    snap = str(tmp_path / "one.sdsnap")
+    header = export_snapshot(db, snap, documents)
+    assert header["count"] == 12
+    assert verify_snapshot(snap)["ok"]
+
+    imported, header = import_snapshot(snap, str(tmp_path / "dst"))
+    assert imported._collection.count() == 12
+    assert header["documents"] == documents
+
+    src = db._collection.get(ids=["abababababababab-3"], include=["embeddings", "documents", "metadatas"])
+    dst = imported._collection.get(ids=["abababababababab-3"], include=["embeddings", "documents", "metadatas"])
+    assert dst["documents"] == src["documents"]
+    assert dst["metadatas"] == src["metadatas"]
+    assert list(dst["embeddings"][0]) == pytest.approx(list(src["embeddings"][0]))
+
+
+def flip_byte(path, offset):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+@pytest.mark.parametrize("where", ["vectors", "footer"])
+def test_verify_detects_corruption(tmp_path, fake_embeddings, where):
+    db = populated_db(tmp_path / "src", fake_embeddings)
+    snap = str(tmp_path / "one.sdsnap")
+    header = export_snapshot(db, snap, {})
+
+    offset = header["vectors"]["offset"] + 5 if where == "vectors" else os.path.getsize(snap) - 10
+    flip_byte(snap, offset)
+
+    with pytest.raises(SnapshotError):
+        verify_snapshot(snap)
+
+
+def test_registry_is_rebuilt_from_manifest(tmp_path):
+    registry = HashRegistry(str(tmp_path))
+    registry.add("x" * 64, "gone.pdf")
+    registry.add("y" * 64, "kept.pdf")
+
+    documents = {"yyyyyyyyyyyyyyyy": {"sha256": "y" * 64, "dedup_key": "y" * 64, "source": "kept.pdf"}}
+    registry.replace_all(HashRegistry.from_documents(documents))
+
+    assert registry.get("x" * 64) is None
+    assert registry.get("y" * 64) == "kept.pdf"
+
+
+def test_import_endpoint_drops_registry_entries_missing_from_snapshot(backend_main, fake_embeddings, tmp_path):
+    db = populated_db(tmp_path / "src", fake_embeddings)
+    documents = {"abababababababab": {"source": "manual.pdf", "sha256": "ab" * 32, "dedup_key": "ab" * 32, "chunks": 12}}
+    os.makedirs(backend_main.SNAPSHOT_DIR, exist_ok=True)
+    snap = os.path.join(backend_main.SNAPSHOT_DIR, "one.sdsnap")
+    export_snapshot(db, snap, documents)
+
+    backend_main.hash_registry.add("cd" * 32, "other.pdf")
+    result = backend_main.import_snapshot_now(snap)
+
+    assert result["status"] == 200
+    assert backend_main.hash_registry.get("cd" * 32) is None
+    assert backend_main.hash_registry.get("ab" * 32) == "manual.pdf"
+
+
+def test_cli_import_takes_owner_lock_and_bumps_version(tmp_path, monkeypatch, fake_embeddings):
+
+    monkeypatch.chdir(tmp_path)
+    db = populated_db(tmp_path / "src", fake_embeddings)
+    documents = {"abababababababab": {"source": "manual.pdf", "sha256": "ab" * 32, "dedup_key": "ab" * 32, "chunks": 12}}
+    snap = str(tmp_path / "one.sdsnap")
+    export_snapshot(db, snap, documents)
+
+    db_root = str(tmp_path / "vectorstore")
+    monkeypatch.setattr(sys, "argv", ["snapshot.py", "import", snap, "--db-root", db_root])
+    snapshot.main()
+
+    live = IndexManager(db_root).current_path()
+    assert IndexVersion(db_root).read()["generation"] == os.path.basename(live)
+    assert open_sections(live)._collection.get(where={"level": "document"})["ids"]
+    forget_sections(live)
+
+
+def test_cli_import_is_handed_to_running_owner(tmp_path, monkeypatch):
+
+    db_root = str(tmp_path / "vectorstore")
+    owner = WriteQueue(db_root, poll_interval=0.01)
+    assert owner.try_become_owner()
+
+    received = {}
+    owner.register("import_snapshot", lambda path, force: received.update(path=path, force=force)
+                   or {"status": 200, "message": "Snapshot one.sdsnap is live."})
+    stop = threading.Event()
+
+    def serve():
+        while not stop.is_set():
+            owner.drain()
+            stop.wait(0.01)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    try:
+        monkeypatch.setattr(sys, "argv", ["snapshot.py", "import", str(tmp_path / "one.sdsnap"), "--db-root", db_root, "--force"])
+        snapshot.main()
+    finally:
+        stop.set()
+        thread.join()
+
+    assert received == {"path": str(tmp_path / "one.sdsnap"), "force": True}
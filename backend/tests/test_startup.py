@@ -0,0 +1,41 @@
+from fastapi.testclient import TestClient
+
+from utils.startup import StartupState
+
+
+def test_pending_components_block_readiness():
+    state = StartupState()
+    assert not state.ready
+
+    for name in StartupState.COMPONENTS:
+        state.set(name, "ready")
+    assert state.ready
+
+    state.set("llm", "failed", error=RuntimeError("no key"))
+    assert not state.ready
+    assert state.to_dict()["errors"] == {"llm": "no key"}
+
+    state.set("llm", "ready")
+    assert state.ready and state.to_dict()["errors"] == {}
+
+
+def test_deferred_components_count_as_ready():
+    state = StartupState()
+    state.set("imports", "ready")
+    state.defer()
+
+    assert state.ready
+    assert state.to_dict()["components"] == {"imports": "ready", "embeddings": "lazy", "index": "lazy", "llm": "lazy"}
+
+
+def test_readyz_with_warm_up_disabled(backend_main):
+    with TestClient(backend_main.app) as client:
+        res = client.get("/readyz")
+    assert res.status_code == 200
+    assert res.json()["ready"]
+
+
+def test_lazy_index_load_is_reported(backend_main):
+    with TestClient(backend_main.app) as client:
+        assert backend_main.get_vectordb() is None
+        assert client.get("/readyz").json()["components"]["index"] == "empty"
@@ -0,0 +1,73 @@
+import pytest
+
+import utils.text_chunker as text_chunker
+from utils.text_chunker import Chunker, ChunkingConfig, chunk_stats, get_chunker
+
+DOC = """# Installation Guide
+
+1. Introduction
+This manual describes the setup, e.g. the base unit. It has many steps. See Fig. 3 for details! Version 2.5 is covered.
+The pump must be primed before use. Never run it dry.
+
+SAFETY NOTES
+Always disconnect power before servicing. Wear gloves at all times.
+""" * 10
+
+
+def unified(size=120, overlap=30):
+    return Chunker(ChunkingConfig(chunk_size=size, chunk_overlap=overlap, length_unit="chars", engine="unified"))
+
+
+def test_unified_chunks_fit_and_headings_open_chunks():
+    chunks = unified().split(DOC)
+
+    assert chunks and all(len(c) <= 120 for c in chunks)
+    assert sum(c.startswith("SAFETY NOTES") for c in chunks) == 10
+    # Abbreviations and decimals are not sentence ends
+    assert not any(c.endswith(("e.g.", "2.")) for c in chunks)
+
+
+def test_unified_overlap_repeats_whole_units():
+    text = " ".join(f"Sentence number {i} is here." for i in range(40))
+    chunks = unified(size=100, overlap=40).split(text)
+
+    assert len(chunks) > 1
+    for prev, nxt in zip(chunks, chunks[1:]):
+        first_sentence = nxt.split(". ")[0] + "."
+        assert first_sentence in prev
+
+
+def test_oversized_piece_is_hard_split():
+    chunks = unified(size=50, overlap=0).split("x" * 500)
+    assert len(chunks) == 10 and all(len(c) == 50 for c in chunks)
+
+
+def test_unified_is_the_default_engine(monkeypatch):
+    monkeypatch.delenv("CHUNKER", raising=False)
+
+    chunker = get_chunker(chunk_size=100, chunk_overlap=20, length_unit="chars")
+    assert type(chunker).__name__ == "Chunker"
+
+
+def test_legacy_engine_splits_without_a_token_counter(monkeypatch):
+    pytest.importorskip("langchain_text_splitters")
+    monkeypatch.setattr(text_chunker, "TokenCounter", None)  # would fail if built
+
+    chunker = text_chunker.LegacyChunker(ChunkingConfig(chunk_size=25, chunk_overlap=5, engine="legacy"))
+    assert all(len(c) <= 100 for c in chunker.split(DOC))
+
+
+def test_unknown_engine_is_rejected():
+    with pytest.raises(ValueError):
+        get_chunker(engine="nope")
+
+
+def test_stats_last_bucket_includes_chunk_size(monkeypatch):
+    monkeypatch.setenv("CHUNK_SIZE", "80")
+    monkeypatch.setenv("CHUNK_OVERLAP", "0")
+    monkeypatch.setenv("CHUNK_LENGTH_UNIT", "chars")
+
+    stats = chunk_stats(["a" * 5, "b" * 79, "c" * 80, "d" * 81])
+
+    assert stats["histogram"] == {"0-9": 1, "70-80": 2, "81+": 1}
+    assert stats["max"] == 81
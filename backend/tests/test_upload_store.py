@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+
+import pytest
+
+import utils.upload_store as upload_store
+from utils.upload_store import (
+    HashRegistry,
+    ResumableUploads,
+    UploadOffsetMismatch,
+    UploadTooLarge,
+    safe_filename,
+    stored_name,
+)
+
+DATA = bytes(range(256)) * 1000
+
+
+def append(uploads, upload_id, offset, data):
+    async def stream():
+        for i in range(0, len(data), 4096):
+            yield data[i:i + 4096]
+
+    return asyncio.run(uploads.append(upload_id, offset, stream()))
+
+
+@pytest.fixture
+def no_rehash(monkeypatch):
+    def fail(path):
+        raise AssertionError(f"re-read {path}")
+
+    monkeypatch.setattr(upload_store, "hash_file", fail)
+
+
+def test_complete_uses_the_running_hash(tmp_path, no_rehash):
+    uploads = ResumableUploads(str(tmp_path))
+    upload_id = uploads.create("Manual.PDF", len(DATA))["upload_id"]
+
+    offset = 0
+    for part in (DATA[:100_000], DATA[100_000:200_000], DATA[200_000:]):
+        offset = append(uploads, upload_id, offset, part)
+
+    path, size, sha256, filename = uploads.complete(upload_id)
+
+    assert sha256 == hashlib.sha256(DATA).hexdigest()
+    assert (size, filename) == (len(DATA), "Manual.PDF")
+    assert path.endswith(stored_name(sha256, filename)) and path.endswith(".pdf")
+    assert open(path, "rb").read() == DATA
+
+
+def test_chunks_from_another_worker_are_caught_up(tmp_path):
+    worker_a = ResumableUploads(str(tmp_path))
+    worker_b = ResumableUploads(str(tmp_path))
+    upload_id = worker_a.create("a.txt", len(DATA))["upload_id"]
+
+    offset = append(worker_a, upload_id, 0, DATA[:50_000])
+    offset = append(worker_b, upload_id, offset, DATA[50_000:150_000])
+    append(worker_a, upload_id, offset, DATA[150_000:])
+
+    assert worker_a.complete(upload_id)[2] == hashlib.sha256(DATA).hexdigest()
+
+
+def test_rejected_chunks_leave_offset_and_hash_intact(tmp_path):
+    uploads = ResumableUploads(str(tmp_path))
+    upload_id = uploads.create("a.txt", 1000)["upload_id"]
+    append(uploads, upload_id, 0, DATA[:600])
+
+    with pytest.raises(UploadOffsetMismatch) as err:
+        append(uploads, upload_id, 0, DATA[:10])
+    assert err.value.expected == 600
+
+    with pytest.raises(UploadTooLarge):
+        append(uploads, upload_id, 600, DATA[600:1200])
+    assert uploads.status(upload_id)["offset"] == 600
+
+    append(uploads, upload_id, 600, DATA[600:1000])
+    assert uploads.complete(upload_id)[2] == hashlib.sha256(DATA[:1000]).hexdigest()
+
+
+def test_complete_requires_every_byte(tmp_path):
+    uploads = ResumableUploads(str(tmp_path))
+    upload_id = uploads.create("a.txt", 10)["upload_id"]
+    append(uploads, upload_id, 0, b"12345")
+
+    with pytest.raises(UploadOffsetMismatch):
+        uploads.complete(upload_id)
+
+
+def test_unknown_or_malformed_ids(tmp_path):
+    uploads = ResumableUploads(str(tmp_path))
+    with pytest.raises(KeyError):
+        uploads.status("../../etc/passwd")
+    with pytest.raises(KeyError):
+        uploads.status("0" * 32)
+
+
+@pytest.mark.parametrize("name,expected", [("a/b/c.pdf", "c.pdf"), ("..\\..\\x.txt", "x.txt")])
+def test_safe_filename_strips_directories(name, expected):
+    assert safe_filename(name) == expected
+
+
+@pytest.mark.parametrize("name", ["", "..", "dir/"])
+def test_safe_filename_rejects_empty_names(name):
+    with pytest.raises(ValueError):
+        safe_filename(name)
+
+
+def test_registry_rebuilt_from_documents(tmp_path):
+    registry = HashRegistry(str(tmp_path))
+    registry.add("stale", "old.pdf")
+
+    documents = {
+        "aaaa": {"sha256": "a" * 64, "source": "a.pdf"},
+        "bbbb": {"sha256": "b" * 64, "dedup_key": "b" * 64 + ":cols", "source": "b.csv"},
+    }
+    registry.replace_all(HashRegistry.from_documents(documents))
+
+    assert registry.get("stale") is None
+    assert registry.get("a" * 64) == "a.pdf"
+    assert registry.get("b" * 64 + ":cols") == "b.csv"
@@ -0,0 +1,391 @@
+"""
+Admission control for the request path.
+
+- Lanes: interactive (/ask, /retrieve) outrank ingest (uploads, bulk,
+  snapshots). Both share ADMISSION_SLOTS CPU slots, but ingest is capped
+  well below that, so queries always find a free slot. Freed slots go to the
+  highest-priority waiter first.
+- Per client (peer IP; X-Client-Id only from TRUSTED_PROXIES): a
+  token-bucket rate limit and a cap on concurrent (running + queued) requests.
+- Backpressure: a full lane queue, an empty bucket or a wait past the lane's
+  deadline is answered with 429 + Retry-After instead of piling up work.
+- Uploads stream their body in the transfer lane and only take an ingest
+  slot (`slot()`) once the bytes are on disk, for parse + embed.
+- LLMLimiter caps in-flight Gemini calls independently of the lanes.
+"""
+
+import os
+import math
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+class Rejected(Exception):
+    """Request shed by admission control → HTTP 429."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+# ============================================================
+# 🔹 LANES
+# ============================================================
+@dataclass
+class Lane:
+    name: str
+    priority: int              # lower = served first
+    max_concurrency: int
+    max_queue: int
+    max_wait_s: float
+    shared: bool = True        # counts against the global CPU slots
+
+    in_flight: int = 0
+    waiters: deque = field(default_factory=deque)
+    admitted: int = 0
+    completed: int = 0
+    rejected: dict = field(default_factory=dict)
+    wait_ms: deque = field(default_factory=lambda: deque(maxlen=1000))
+    service_ewma_s: float = 1.0
+
+    def reject(self, reason: str):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    def to_dict(self) -> dict:
+        waits = sorted(self.wait_ms)
+        n = len(waits)
+        return {
+            "priority": self.priority,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self.waiters),
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "completed": self.completed,
+            "rejected": dict(self.rejected),
+            "wait_ms": {
+                "p50": round(waits[n // 2], 1) if n else 0,
+                "p95": round(waits[int(n * 0.95)], 1) if n else 0,
+                "max": round(waits[-1], 1) if n else 0,
+            },
+            "avg_service_ms": round(self.service_ewma_s * 1000, 1),
+        }
+
+
+def default_lanes(slots: int):
+    return {
+        "interactive": Lane(
+            "interactive", priority=0,
+            max_concurrency=_env_int("ADMISSION_INTERACTIVE_CONCURRENCY", slots),
+            max_queue=_env_int("ADMISSION_INTERACTIVE_QUEUE", 64),
+            max_wait_s=_env_float("ADMISSION_INTERACTIVE_MAX_WAIT", 30),
+        ),
+        "ingest": Lane(
+            "ingest", priority=1,
+            max_concurrency=_env_int("ADMISSION_INGEST_CONCURRENCY", max(1, slots // 4)),
+            max_queue=_env_int("ADMISSION_INGEST_QUEUE", 16),
+            max_wait_s=_env_float("ADMISSION_INGEST_MAX_WAIT", 300),
+        ),
+        # Resumable-upload chunks: network bound, kept off the CPU slots
+        "transfer": Lane(
+            "transfer", priority=2,
+            max_concurrency=_env_int("ADMISSION_TRANSFER_CONCURRENCY", 16),
+            max_queue=_env_int("ADMISSION_TRANSFER_QUEUE", 64),
+            max_wait_s=_env_float("ADMISSION_TRANSFER_MAX_WAIT", 60),
+            shared=False,
+        ),
+    }
+
+
+# ============================================================
+# 🔹 PER-CLIENT LIMITS
+# ============================================================
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Consumes one token. Returns 0, or the seconds until one is available.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+# ============================================================
+# 🔹 CONTROLLER
+# ============================================================
+class AdmissionController:
+    """
+    Priority scheduler over a fixed number of slots. All state is touched
+    from the event loop only; `interactive_busy()` is a lock-free read for
+    background ingest threads.
+    """
+
+    CLIENT_IDLE_S = 600
+
+    def __init__(self, slots: int = None, lanes: dict = None):
+        self.enabled = os.getenv("ADMISSION", "1") != "0"
+        self.slots = slots or _env_int("ADMISSION_SLOTS", os.cpu_count() or 4)
+        self.lanes = lanes or default_lanes(self.slots)
+        self.in_flight = 0
+
+        self.client_concurrency = _env_int("ADMISSION_CLIENT_CONCURRENCY", 4)
+        self.client_rate = _env_float("ADMISSION_CLIENT_RATE", 5)
+        self.client_burst = _env_float("ADMISSION_CLIENT_BURST", 10)
+        self._buckets = {}
+        self._client_active = {}
+        self._last_prune = time.monotonic()
+
+    # ---------- helpers ----------
+    def _can_run(self, lane: Lane) -> bool:
+        if lane.in_flight >= lane.max_concurrency:
+            return False
+        return not lane.shared or self.in_flight < self.slots
+
+    def _start(self, lane: Lane):
+        lane.in_flight += 1
+        lane.admitted += 1
+        if lane.shared:
+            self.in_flight += 1
+
+    def _retry_after(self, lane: Lane) -> float:
+        # Time for the queue ahead to drain at the lane's service rate
+        return lane.service_ewma_s * (len(lane.waiters) + 1) / max(1, lane.max_concurrency)
+
+    def _dispatch(self):
+        # Hand freed slots to waiters, highest-priority lane first
+        for lane in sorted(self.lanes.values(), key=lambda l: l.priority):
+            while lane.waiters and self._can_run(lane):
+                fut = lane.waiters.popleft()
+                if fut.done():
+                    continue  # timed out / cancelled while queued
+                self._start(lane)
+                fut.set_result(None)
+
+    def _prune_clients(self):
+        now = time.monotonic()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        for client, bucket in list(self._buckets.items()):
+            if now - bucket.updated > self.CLIENT_IDLE_S and not self._client_active.get(client):
+                del self._buckets[client]
+                self._client_active.pop(client, None)
+
+    def _admit_client(self, lane: Lane, client: str):
+        self._prune_clients()
+
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.client_rate, self.client_burst)
+        wait = bucket.take()
+        if wait > 0:
+            lane.reject("client_rate")
+            raise Rejected("client_rate", wait)
+
+        if self._client_active.get(client, 0) >= self.client_concurrency:
+            lane.reject("client_concurrency")
+            raise Rejected("client_concurrency", lane.service_ewma_s)
+        self._client_active[client] = self._client_active.get(client, 0) + 1
+
+    def _client_release(self, client: str):
+        if client is None:
+            return
+        left = self._client_active.get(client, 1) - 1
+        if left > 0:
+            self._client_active[client] = left
+        else:
+            self._client_active.pop(client, None)
+
+    # ---------- admission ----------
+    async def acquire(self, lane_name: str, client: str = None) -> float:
+        """
+        Waits for a slot in `lane_name`. Returns the queueing time in seconds;
+        raises Rejected when the request should be shed.
+
+        client=None skips the per-client limits (the request was already
+        admitted for its client, e.g. an upload moving on to ingest).
+        """
+        lane = self.lanes[lane_name]
+        if client is not None:
+            self._admit_client(lane, client)
+
+        start = time.monotonic()
+        if not lane.waiters and self._can_run(lane):
+            self._start(lane)
+            lane.wait_ms.append(0.0)
+            return 0.0
+
+        if len(lane.waiters) >= lane.max_queue:
+            self._client_release(client)
+            lane.reject("queue_full")
+            raise Rejected("queue_full", self._retry_after(lane))
+
+        fut = asyncio.get_running_loop().create_future()
+        lane.waiters.append(fut)
+        try:
+            await asyncio.wait_for(fut, lane.max_wait_s)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if fut.done() and not fut.cancelled():
+                # Slot was granted just as the client went away → hand it back
+                self._release_slot(lane)
+            self._client_release(client)
+            try:
+                lane.waiters.remove(fut)
+            except ValueError:
+                pass
+            self._dispatch()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            lane.reject("wait_timeout")
+            raise Rejected("wait_timeout", self._retry_after(lane))
+
+        waited = time.monotonic() - start
+        lane.wait_ms.append(waited * 1000)
+        return waited
+
+    def _release_slot(self, lane: Lane):
+        lane.in_flight -= 1
+        if lane.shared:
+            self.in_flight -= 1
+
+    def release(self, lane_name: str, client: str, service_s: float):
+        """client=None when acquire() was called without one."""
+        lane = self.lanes[lane_name]
+        self._release_slot(lane)
+        lane.completed += 1
+        lane.service_ewma_s = 0.8 * lane.service_ewma_s + 0.2 * service_s
+        self._client_release(client)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, lane_name: str, client: str = None):
+        """
+        `async with admission.slot("ingest"):` — holds a lane slot for the
+        block. No-op when admission is disabled.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        await self.acquire(lane_name, client)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(lane_name, client, time.monotonic() - start)
+
+    # ---------- cooperation with background ingest ----------
+    def interactive_busy(self) -> bool:
+        lane = self.lanes.get("interactive")
+        return lane is not None and (lane.in_flight > 0 or bool(lane.waiters))
+
+    def yield_to_interactive(self, max_wait_s: float = 2.0, poll_s: float = 0.05):
+        """
+        Called by ingest threads between embedding batches: pauses (bounded)
+        while queries are running so they get the CPU first.
+        """
+        deadline = time.monotonic() + max_wait_s
+        while self.enabled and self.interactive_busy() and time.monotonic() < deadline:
+            time.sleep(poll_s)
+
+    def to_dict(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "enabled": self.enabled,
+            "slots": self.slots,
+            "in_flight": self.in_flight,
+            "lanes": {name: lane.to_dict() for name, lane in self.lanes.items()},
+            "clients": {
+                "tracked": len(self._buckets),
+                "active": len(self._client_active),
+                "max_concurrency": self.client_concurrency,
+                "rate_per_s": self.client_rate,
+                "burst": self.client_burst,
+            },
+            "llm": llm_limiter.to_dict(),
+        }
+
+
+# ============================================================
+# 🔹 LLM IN-FLIGHT LIMIT (called from worker threads)
+# ============================================================
+class LLMLimiter:
+    """
+    Bounded semaphore around Gemini calls with wait-time accounting.
+    """
+
+    def __init__(self, limit: int = None, timeout_s: float = None):
+        self.limit = limit or _env_int("LLM_MAX_INFLIGHT", 8)
+        self.timeout_s = timeout_s or _env_float("LLM_MAX_WAIT", 60)
+        self._sem = threading.BoundedSemaphore(self.limit)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.waiting = 0
+        self.calls = 0
+        self.timeouts = 0
+        self.wait_ms = deque(maxlen=1000)
+
+    def __enter__(self):
+        start = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+        acquired = self._sem.acquire(timeout=self.timeout_s)
+        with self._lock:
+            self.waiting -= 1
+            if not acquired:
+                self.timeouts += 1
+            else:
+                self.in_flight += 1
+                self.calls += 1
+                self.wait_ms.append((time.monotonic() - start) * 1000)
+        if not acquired:
+            raise Rejected("llm_saturated", self.timeout_s / 4)
+        return self
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.in_flight -= 1
+        self._sem.release()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            waits = sorted(self.wait_ms)
+            n = len(waits)
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "calls": self.calls,
+                "timeouts": self.timeouts,
+                "wait_ms_p95": round(waits[int(n * 0.95)], 1) if n else 0,
+            }
+
+
+llm_limiter = LLMLimiter()
+admission = AdmissionController()
@@ -0,0 +1,553 @@
+import os
+import json
+import time
+import uuid
+import queue
+import shutil
+import tarfile
+import zipfile
+import threading
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+
+from utils.document_loader import extract_pages
+from utils.extraction_cache import get_extraction_cache
+from utils.ingest import iter_chunk_batches, is_csv, dedup_key
+from utils.upload_store import hash_file
+from utils.vector_store import (
+    get_embedding_model,
+    open_vectordb,
+    add_embedded_batch,
+)
+
+load_dotenv()
+
+
+# ============================================================
+# 🔹 CONFIG
+# ============================================================
+SUPPORTED_EXTENSIONS = (".pdf", ".csv", ".txt")
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+MANIFEST_NAME = "bulk_manifest.jsonl"
+
+# Sentinel passed down the pipeline when a stage has no more work
+_DONE = object()
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def is_archive(path: str) -> bool:
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+# ============================================================
+# 🔹 SOURCE DISCOVERY (directory or archive)
+# ============================================================
+def _safe_member_path(staging_dir: str, name: str):
+    # Block zip-slip: every member must land inside staging_dir
+    target = os.path.realpath(os.path.join(staging_dir, name))
+    if not target.startswith(os.path.realpath(staging_dir) + os.sep):
+        return None
+    return target
+
+
+class _ExtractionBudget:
+    """
+    Caps what one archive may expand to (zip bombs): MAX_UPLOAD_MB only
+    bounds the compressed upload. Bytes are counted as they are written,
+    not taken from the (forgeable) member headers.
+    """
+
+    def __init__(self, max_members: int = None, max_bytes: int = None):
+        self.max_members = max_members or _env_int("BULK_MAX_MEMBERS", 50_000)
+        self.max_bytes = max_bytes or _env_int("BULK_MAX_EXTRACTED_MB", 10_240) * 1024 * 1024
+        self.members = 0
+        self.bytes = 0
+
+    def copy(self, src, target: str):
+        self.members += 1
+        if self.members > self.max_members:
+            raise ValueError(f"Archive has more than {self.max_members} documents (BULK_MAX_MEMBERS).")
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with src, open(target, "wb") as dst:
+            while True:
+                block = src.read(1024 * 1024)
+                if not block:
+                    return
+                self.bytes += len(block)
+                if self.bytes > self.max_bytes:
+                    raise ValueError(
+                        f"Archive expands to more than {self.max_bytes // (1024 * 1024)} MB (BULK_MAX_EXTRACTED_MB)."
+                    )
+                dst.write(block)
+
+
+def extract_archive(archive_path: str, staging_dir: str, max_members: int = None, max_bytes: int = None):
+    """
+    Streams supported members of a zip / tar archive into staging_dir.
+    Yields the extracted file paths; raises ValueError once the archive
+    exceeds BULK_MAX_MEMBERS documents or BULK_MAX_EXTRACTED_MB in total.
+    """
+    os.makedirs(staging_dir, exist_ok=True)
+    budget = _ExtractionBudget(max_members, max_bytes)
+
+    if archive_path.lower().endswith(".zip"):
+        with zipfile.ZipFile(archive_path) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not info.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    continue
+                target = _safe_member_path(staging_dir, info.filename)
+                if target is None:
+                    continue
+                budget.copy(zf.open(info), target)
+                yield target
+        return
+
+    with tarfile.open(archive_path) as tf:
+        for member in tf:
+            if not member.isfile() or not member.name.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            target = _safe_member_path(staging_dir, member.name)
+            if target is None:
+                continue
+            budget.copy(tf.extractfile(member), target)
+            yield target
+
+
+def iter_source_files(source: str, staging_dir: str):
+    """
+    Yields every supported file under a directory, inside an archive,
+    or the single file itself.
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    yield os.path.join(root, name)
+        return
+
+    if is_archive(source):
+        yield from extract_archive(source, staging_dir)
+        return
+
+    if source.lower().endswith(SUPPORTED_EXTENSIONS):
+        yield source
+        return
+
+    raise ValueError(f"Unsupported bulk source: {source}")
+
+
+# ============================================================
+# 🔹 CHECKPOINT MANIFEST
+# ============================================================
+class CheckpointManifest:
+    """
+    Append-only JSONL of fully written files, keyed by content hash.
+    A line is written only after every chunk of that file is in Chroma,
+    so after a crash a re-run skips exactly the finished files. Chunk ids
+    are deterministic, so a half-written file is simply upserted again.
+    """
+
+    def __init__(self, persist_dir: str):
+        self.path = os.path.join(persist_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._done = set()
+
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        if entry.get("deleted"):
+                            self._done.discard(entry["sha256"])
+                        else:
+                            self._done.add(entry["sha256"])
+                    except (ValueError, KeyError):
+                        # Torn last line from a crash — ignore it
+                        continue
+
+    def is_done(self, sha256: str) -> bool:
+        return sha256 in self._done
+
+    def _append(self, entry: dict):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def mark_done(self, entry: dict):
+        with self._lock:
+            self._append(entry)
+            self._done.add(entry["sha256"])
+
+    def forget(self, sha256: str):
+        """
+        Records a per-document delete so a later bulk run ingests it again.
+        """
+        with self._lock:
+            if sha256 in self._done:
+                self._append({"sha256": sha256, "deleted": True, "ts": time.time()})
+                self._done.discard(sha256)
+
+
+# ============================================================
+# 🔹 BULK INGEST JOB (pipelined producer / consumer)
+# ============================================================
+class BulkIngestJob:
+    """
+    extract (process pool) → chunk → embed → write, joined by bounded queues.
+
+    Parsing runs in worker processes while the embedding model runs in its
+    own thread, so the two overlap instead of alternating. Full queues block
+    the upstream stage, which keeps memory bounded no matter how many files
+    the source holds. Chroma writes are accumulated into large batches.
+
+    `write_lock` is held around each flushed batch only, so other writers
+    (single uploads, deletes, a reset) interleave with a long job; a reset
+    cancels the job first (`cancel()`), and batches not yet written are dropped.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        persist_dir: str,
+        staging_dir: str,
+        workers: int = None,
+        on_file_done=None,
+        on_progress=None,
+        job_id: str = None,
+        throttle=None,
+        write_lock=None,
+    ):
+        self.job_id = job_id or uuid.uuid4().hex
+        self.source = source
+        self.persist_dir = persist_dir
+        self.staging_dir = os.path.join(staging_dir, self.job_id)
+        self.workers = workers or _env_int("BULK_EXTRACT_WORKERS", max(1, (os.cpu_count() or 2) - 1))
+        self.queue_size = _env_int("BULK_QUEUE_SIZE", 8)
+        self.embed_batch = _env_int("EMBED_BATCH_SIZE", 64)
+        self.write_batch = _env_int("CHROMA_WRITE_BATCH", 2048)
+        self.on_file_done = on_file_done
+        self.on_progress = on_progress
+        # Called before each embedding batch; may block to let queries run first
+        self.throttle = throttle
+        self.write_lock = write_lock or nullcontext()
+
+        self.status = "pending"
+        self.error = None
+        self.files_seen = 0
+        self.files_skipped = 0
+        self.files_done = 0
+        self.files_failed = []
+        self.chunks_written = 0
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_reason = None
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def cancel(self, reason: str):
+        """
+        Stops the pipeline. Call with `write_lock` held (e.g. from a reset):
+        nothing is written after it returns.
+        """
+        with self._lock:
+            self.cancel_reason = reason
+        self._stop.set()
+
+    # ---------- reporting ----------
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "source": self.source,
+                "status": self.status,
+                "error": self.error,
+                "files_seen": self.files_seen,
+                "files_skipped": self.files_skipped,
+                "files_done": self.files_done,
+                "files_failed": list(self.files_failed),
+                "chunks_written": self.chunks_written,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+    def _report(self):
+        if self.on_progress:
+            try:
+                self.on_progress(self.to_dict())
+            except Exception as e:
+                print(f"⚠️ [BULK] Progress callback failed: {e}")
+
+    def _fail_file(self, path: str, reason):
+        print(f"❌ [BULK] {os.path.basename(path)}: {reason}")
+        with self._lock:
+            self.files_failed.append({"path": path, "error": str(reason)})
+
+    # ---------- queue helpers (never block forever once stopped) ----------
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _stage(self, target, *args):
+        def runner():
+            try:
+                target(*args)
+            except Exception as e:
+                print(f"❌ [BULK] Stage {target.__name__} crashed: {e}")
+                with self._lock:
+                    self.error = str(e)
+                self._stop.set()
+
+        t = threading.Thread(target=runner, name=f"bulk-{target.__name__}", daemon=True)
+        t.start()
+        return t
+
+    # ---------- stage 1: extraction ----------
+    def _extract_stage(self, manifest, out_q):
+        inflight = deque()
+        cache = get_extraction_cache()
+
+        def drain_one():
+            path, sha256, future = inflight.popleft()
+            try:
+                pages = future.result()
+                cache.put(sha256, pages, source=os.path.basename(path))
+            except Exception as e:
+                self._fail_file(path, e)
+                return
+            self._put(out_q, ({"path": path, "sha256": sha256}, pages))
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            for path in iter_source_files(self.source, self.staging_dir):
+                if self._stop.is_set():
+                    break
+
+                with self._lock:
+                    self.files_seen += 1
+
+                sha256 = hash_file(path)
+                if manifest.is_done(sha256):
+                    with self._lock:
+                        self.files_skipped += 1
+                    continue
+
+                # CSVs are streamed row-group by row-group in the chunk stage
+                if is_csv(path):
+                    self._put(out_q, ({"path": path, "sha256": sha256}, None))
+                    continue
+
+                # Parsed before (any job, any upload) → skip the process pool
+                pages = cache.get(sha256)
+                if pages is not None:
+                    self._put(out_q, ({"path": path, "sha256": sha256}, pages))
+                    continue
+
+                inflight.append((path, sha256, pool.submit(extract_pages, path)))
+
+                # Bounded look-ahead: never queue more parses than 2× workers
+                if len(inflight) >= self.workers * 2:
+                    drain_one()
+
+            while inflight and not self._stop.is_set():
+                drain_one()
+
+        self._put(out_q, _DONE)
+
+    # ---------- stage 2: chunking ----------
+    def _chunk_stage(self, in_q, out_q):
+        while True:
+            item = self._get(in_q)
+            if item is _DONE:
+                break
+
+            info, pages = item
+            info["chunks"] = None
+            total = 0
+            previous = None
+
+            try:
+                # Hold one batch back so the file's total chunk count is set
+                # before its last batch reaches the writer
+                for batch in iter_chunk_batches(info["path"], info["sha256"], pages=pages):
+                    if previous is not None:
+                        self._put(out_q, (info,) + previous)
+                    previous = batch
+                    total += len(batch[0])
+            except Exception as e:
+                self._fail_file(info["path"], e)
+                continue
+
+            if previous is None:
+                self._fail_file(info["path"], "No readable text in document.")
+                continue
+
+            info["chunks"] = total
+            self._put(out_q, (info,) + previous)
+
+        self._put(out_q, _DONE)
+
+    # ---------- stage 3: embedding ----------
+    def _embed_stage(self, embedding_model, in_q, out_q):
+        pending = []  # (info, id, text, metadata)
+
+        def flush():
+            if not pending:
+                return
+            texts = [p[2] for p in pending]
+            if self.throttle:
+                self.throttle()
+            vectors = embedding_model.embed_documents(texts)
+            self._put(out_q, (list(pending), vectors))
+            pending.clear()
+
+        while True:
+            item = self._get(in_q)
+            if item is _DONE:
+                break
+
+            info, chunks, ids, metadatas = item
+            for cid, text, meta in zip(ids, chunks, metadatas):
+                pending.append((info, cid, text, meta))
+                if len(pending) >= self.embed_batch:
+                    flush()
+
+        flush()
+        self._put(out_q, _DONE)
+
+    # ---------- stage 4: batched Chroma writes ----------
+    def _write_stage(self, vectordb, manifest, in_q):
+        buffer = []
+        vectors = []
+        written_per_file = {}
+
+        def flush():
+            if not buffer:
+                return
+            with self.write_lock:
+                if self.cancel_reason is None:
+                    write()
+            buffer.clear()
+            vectors.clear()
+
+        def write():
+            add_embedded_batch(
+                vectordb,
+                ids=[b[1] for b in buffer],
+                embeddings=vectors,
+                texts=[b[2] for b in buffer],
+                metadatas=[b[3] for b in buffer],
+            )
+
+            for info, _, _, _ in buffer:
+                sha256 = info["sha256"]
+                written_per_file[sha256] = written_per_file.get(sha256, 0) + 1
+                if written_per_file[sha256] == info["chunks"]:
+                    del written_per_file[sha256]
+                    manifest.mark_done({
+                        "sha256": sha256,
+                        "path": info["path"],
+                        "chunks": info["chunks"],
+                        "ts": time.time(),
+                    })
+                    with self._lock:
+                        self.files_done += 1
+                    if self.on_file_done:
+                        self.on_file_done({
+                            "sha256": sha256,
+                            "dedup_key": dedup_key(info["path"], sha256),
+                            "source": os.path.basename(info["path"]),
+                            "path": info["path"],
+                            "chunks": info["chunks"],
+                        })
+
+            with self._lock:
+                self.chunks_written += len(buffer)
+            print(f"💾 [BULK] Wrote {len(buffer)} chunks ({self.chunks_written} total).")
+            self._report()
+
+        while True:
+            item = self._get(in_q)
+            if item is _DONE:
+                break
+
+            records, batch_vectors = item
+            buffer.extend(records)
+            vectors.extend(batch_vectors)
+            if len(buffer) >= self.write_batch:
+                flush()
+
+        flush()
+
+    # ---------- driver ----------
+    def run(self):
+        """
+        Runs the whole pipeline in the calling thread and returns the
+        Chroma handle it wrote to.
+        """
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+        self._report()
+
+        print(f"📦 [BULK] Ingesting {self.source} with {self.workers} extract workers...")
+
+        embedding_model = get_embedding_model()
+        vectordb = open_vectordb(self.persist_dir, embedding_model)
+        manifest = CheckpointManifest(self.persist_dir)
+
+        extracted_q = queue.Queue(maxsize=self.queue_size)
+        chunked_q = queue.Queue(maxsize=self.queue_size)
+        embedded_q = queue.Queue(maxsize=self.queue_size)
+
+        threads = [
+            self._stage(self._extract_stage, manifest, extracted_q),
+            self._stage(self._chunk_stage, extracted_q, chunked_q),
+            self._stage(self._embed_stage, embedding_model, chunked_q, embedded_q),
+            self._stage(self._write_stage, vectordb, manifest, embedded_q),
+        ]
+        for t in threads:
+            t.join()
+
+        try:
+            vectordb.persist()
+        except:
+            pass
+
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+        with self._lock:
+            if self.cancel_reason:
+                self.status = "cancelled"
+                self.error = self.cancel_reason
+            else:
+                self.status = "failed" if self.error else "completed"
+            self.finished_at = time.time()
+        self._report()
+
+        print(
+            f"✅ [BULK] {self.status}: {self.files_done} done, "
+            f"{self.files_skipped} skipped, {len(self.files_failed)} failed, "
+            f"{self.chunks_written} chunks."
+        )
+        return vectordb
@@ -1,44 +1,225 @@
-import pandas as pd
-import pdfplumber
 import os
+import io
+import csv
 
-def load_document(file_path: str) -> str:
+
+# Target size of one CSV row-group chunk (characters, header included)
+CSV_CHUNK_CHARS = int(os.getenv("CSV_CHUNK_CHARS", 1500))
+
+# Rows pulled from disk per pandas read (bounds memory for multi-GB files)
+CSV_READ_ROWS = int(os.getenv("CSV_READ_ROWS", 10000))
+
+# Bump whenever extract_pages() output changes — invalidates the extraction cache
+EXTRACTOR_VERSION = "1"
+
+# Also pull tables out of PDF pages (served by /documents/{id}/pages/{n}?format=text).
+# The slowest part of PDF extraction — EXTRACT_TABLES=0 skips it when only text is needed
+EXTRACT_TABLES = os.getenv("EXTRACT_TABLES", "1") == "1"
+
+
+def parse_columns(columns):
     """
-    Loads text content from PDF, CSV, or TXT.
-    Returns a single string containing the document text.
+    Accepts "a,b,c", a list, or None. Falls back to CSV_COLUMNS from .env.
+    """
+    if columns is None:
+        columns = os.getenv("CSV_COLUMNS") or None
+    if isinstance(columns, str):
+        columns = [c.strip() for c in columns.split(",") if c.strip()]
+    return columns or None
+
+
+def _csv_line(values) -> str:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="").writerow(values)
+    return buf.getvalue()
+
+
+def iter_csv_chunks(file_path: str, columns=None, chunk_chars: int = None):
+    """
+    Streams a CSV as row-group chunks instead of one giant string.
+
+    Every chunk starts with the header line, never splits a row, and carries
+    row-range + column metadata. Only `columns` are read (and embedded) when
+    given; the file is read CSV_READ_ROWS at a time.
+
+    Yields:
+        (str, dict): chunk text and its metadata.
+    """
+    columns = parse_columns(columns)
+    chunk_chars = chunk_chars or CSV_CHUNK_CHARS
+
+    import pandas as pd
+
+    try:
+        reader = pd.read_csv(
+            file_path,
+            usecols=columns,
+            dtype=str,
+            keep_default_na=False,
+            chunksize=CSV_READ_ROWS,
+        )
+    except Exception as e:
+        raise ValueError(f"Failed to read CSV: {e}")
+
+    header = None
+    column_meta = None
+    lines = []
+    size = 0
+    row_start = 0
+    row = 0
+
+    def emit():
+        text = header + "\n" + "\n".join(lines)
+        meta = {
+            "row_start": row_start,
+            "row_end": row - 1,
+            "columns": column_meta,
+        }
+        return text, meta
+
+    try:
+        for frame in reader:
+            if header is None:
+                names = [str(c) for c in frame.columns]
+                header = _csv_line(names)
+                column_meta = ",".join(names)
+
+            for values in frame.itertuples(index=False, name=None):
+                line = _csv_line(values)
+
+                # Close the current group before it would overflow
+                if lines and size + len(line) + 1 > chunk_chars:
+                    yield emit()
+                    lines = []
+                    size = len(header)
+                    row_start = row
+
+                if not lines:
+                    size = len(header)
+                lines.append(line)
+                size += len(line) + 1
+                row += 1
+
+    except Exception as e:
+        raise ValueError(f"Failed to read CSV: {e}")
+
+    if lines:
+        yield emit()
+
+
+def extractor_version() -> str:
+    """
+    Identifies the extraction code + library version; part of the cache key.
+    """
+    try:
+        from importlib.metadata import version
+        plumber = version("pdfplumber")
+    except Exception:
+        plumber = "unknown"
+    return f"{EXTRACTOR_VERSION}+pdfplumber-{plumber}+tables-{int(EXTRACT_TABLES)}"
+
+
+def extract_pages(file_path: str):
+    """
+    Per-page extraction for PDF and TXT (TXT is a single page).
+
+    Returns:
+        list of {"page": n, "text": str, "tables": [[[cell, ...], ...], ...]}
     """
     if not os.path.exists(file_path):
         raise ValueError("File not found: " + file_path)
 
     # PDF
     if file_path.lower().endswith(".pdf"):
-        full_text = []
+        import pdfplumber
+
+        pages = []
         try:
             with pdfplumber.open(file_path) as pdf:
-                for pg in pdf.pages:
-                    text = pg.extract_text()
-                    if text:
-                        full_text.append(text)
+                for n, pg in enumerate(pdf.pages, start=1):
+                    tables = pg.extract_tables() if EXTRACT_TABLES else []
+                    pages.append({
+                        "page": n,
+                        "text": pg.extract_text() or "",
+                        "tables": tables or [],
+                    })
         except Exception as e:
             raise ValueError(f"Failed to read PDF: {e}")
 
-        return "\n\n".join(full_text).strip()
-
-    # CSV
-    if file_path.lower().endswith(".csv"):
-        try:
-            df = pd.read_csv(file_path)
-            return df.to_string(index=False)
-        except Exception as e:
-            raise ValueError(f"Failed to read CSV: {e}")
+        return pages
 
     # TXT
     if file_path.lower().endswith(".txt"):
         try:
             with open(file_path, "r", encoding="utf-8") as f:
-                return f.read()
+                text = f.read()
         except Exception:
             with open(file_path, "r", encoding="latin-1") as f:
-                return f.read()
+                text = f.read()
+        return [{"page": 1, "text": text, "tables": []}]
 
     raise ValueError("Unsupported file type. Only PDF, CSV, TXT are allowed.")
+
+
+def pages_to_text(pages, file_path: str = "") -> str:
+    """
+    Joins extracted pages into the single document string used for chunking.
+    """
+    if file_path.lower().endswith(".pdf"):
+        return "\n\n".join(p["text"] for p in pages if p["text"]).strip()
+    return "".join(p["text"] for p in pages)
+
+
+def extract_pdf_page(file_path: str, page: int) -> bytes:
+    """
+    One page (1-based) of a PDF as a standalone PDF document.
+    """
+    from PyPDF2 import PdfReader, PdfWriter
+
+    reader = PdfReader(file_path)
+    if not 1 <= page <= len(reader.pages):
+        raise ValueError(f"Page {page} out of range (1–{len(reader.pages)}).")
+
+    writer = PdfWriter()
+    writer.add_page(reader.pages[page - 1])
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def page_starts(pages, file_path: str = ""):
+    """
+    [(offset, page)] — where each page begins inside pages_to_text(pages).
+    Used to tag chunks with the page they came from.
+    """
+    if not file_path.lower().endswith(".pdf"):
+        return []
+
+    starts = []
+    pos = 0
+    for p in pages:
+        if not p["text"]:
+            continue
+        starts.append((pos, p["page"]))
+        pos += len(p["text"]) + 2
+
+    # pages_to_text strips leading whitespace → shift every offset back
+    joined = "\n\n".join(p["text"] for p in pages if p["text"])
+    lead = len(joined) - len(joined.lstrip())
+    return [(max(0, offset - lead), page) for offset, page in starts]
+
+
+def load_document(file_path: str) -> str:
+    """
+    Loads text content from PDF, CSV, or TXT.
+    Returns a single string containing the document text.
+    """
+    if not os.path.exists(file_path):
+        raise ValueError("File not found: " + file_path)
+
+    # CSV (row groups with repeated header; ingestion uses iter_csv_chunks directly)
+    if file_path.lower().endswith(".csv"):
+        return "\n\n".join(text for text, _ in iter_csv_chunks(file_path))
+
+    # PDF / TXT
+    return pages_to_text(extract_pages(file_path), file_path)
@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import threading
+from dotenv import load_dotenv
+
+from utils.document_loader import extract_pages, extractor_version, pages_to_text
+
+load_dotenv()
+
+
+# ============================================================
+# 🔹 LAYOUT
+# ============================================================
+#   <EXTRACTION_CACHE_DIR>/
+#       ab/abcdef…-<extractor>.pages   ← one entry per (file hash, extractor)
+#
+# Entry file:
+#   line 1   JSON header: sha256, extractor, source, per-page offsets/sizes
+#   rest     one zlib blob per page: {"text": …, "tables": […]}
+#
+# Pages are compressed separately so a single page can be read without
+# inflating the whole document. The cache lives outside uploaded_docs, so
+# /reset and per-document delete leave it intact — re-uploading, re-chunking
+# or re-embedding the same bytes skips PDF parsing entirely.
+ENTRY_EXTENSION = ".pages"
+
+# Evict down to this fraction of the budget, so eviction isn't run per write
+LOW_WATER = 0.9
+
+
+class ExtractionCache:
+    """
+    Content-addressed, size-bounded store of extracted pages.
+
+    Reads bump the entry's mtime, so eviction drops least-recently-used
+    entries first. Entries are written with write-then-rename and are safe
+    to share between processes.
+    """
+
+    def __init__(self, root: str = None, max_bytes: int = None):
+        self.root = root or os.getenv("EXTRACTION_CACHE_DIR", "./extraction_cache")
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("EXTRACTION_CACHE_MAX_MB", 2048)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.extractor = extractor_version()
+        self._tag = hashlib.sha1(self.extractor.encode("utf-8")).hexdigest()[:8]
+
+        self._lock = threading.Lock()
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    # ---------- paths ----------
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], f"{sha256}-{self._tag}{ENTRY_EXTENSION}")
+
+    def _entries(self):
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(ENTRY_EXTENSION):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    # ---------- read ----------
+    def _read_header(self, f) -> dict:
+        header = json.loads(f.readline())
+        header["_data_start"] = f.tell()
+        return header
+
+    def get(self, sha256: str):
+        """
+        All pages for a file hash, or None on a miss.
+        """
+        path = self._path(sha256)
+        try:
+            with open(path, "rb") as f:
+                header = self._read_header(f)
+                pages = []
+                for info in header["pages"]:
+                    f.seek(header["_data_start"] + info["offset"])
+                    page = json.loads(zlib.decompress(f.read(info["bytes"])))
+                    pages.append({"page": info["page"], **page})
+        except (OSError, ValueError, KeyError, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        with self._lock:
+            self.hits += 1
+        return pages
+
+    def get_page(self, sha256: str, page: int):
+        """
+        One page (1-based) without inflating the rest, or None.
+        """
+        try:
+            with open(self._path(sha256), "rb") as f:
+                header = self._read_header(f)
+                for info in header["pages"]:
+                    if info["page"] == page:
+                        f.seek(header["_data_start"] + info["offset"])
+                        return {"page": page, **json.loads(zlib.decompress(f.read(info["bytes"])))}
+        except (OSError, ValueError, KeyError, zlib.error):
+            pass
+        return None
+
+    # ---------- write ----------
+    def put(self, sha256: str, pages, source: str = None):
+        if self.max_bytes <= 0:
+            return
+
+        blobs = []
+        index = []
+        offset = 0
+        for page in pages:
+            blob = zlib.compress(
+                json.dumps({"text": page["text"], "tables": page.get("tables") or []}, ensure_ascii=False).encode("utf-8"),
+                6,
+            )
+            index.append({
+                "page": page["page"],
+                "offset": offset,
+                "bytes": len(blob),
+                "chars": len(page["text"]),
+                "tables": len(page.get("tables") or []),
+            })
+            blobs.append(blob)
+            offset += len(blob)
+
+        header = {
+            "sha256": sha256,
+            "extractor": self.extractor,
+            "source": source,
+            "created_at": time.time(),
+            "pages": index,
+        }
+
+        path = self._path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp, path)
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self.writes += 1
+            if self._size is not None:
+                self._size += size
+            over = self._size is None or self._size > self.max_bytes
+
+        if over:
+            self.evict()
+
+    # ---------- eviction / stats ----------
+    def evict(self, max_bytes: int = None) -> int:
+        """
+        Drops least-recently-used entries until the cache fits in
+        `max_bytes` (default: the configured budget). Returns bytes freed.
+        """
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+
+        freed = 0
+        removed = 0
+        if total > budget:
+            target = budget * LOW_WATER
+            for path, size, _ in entries:
+                if total - freed <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                freed += size
+                removed += 1
+
+        with self._lock:
+            self._size = total - freed
+            self.evictions += removed
+
+        if removed:
+            print(f"🧹 Extraction cache: evicted {removed} entries ({freed / 1024 / 1024:.1f} MB).")
+        return freed
+
+    def clear(self) -> int:
+        return self.evict(max_bytes=0)
+
+    def stats(self) -> dict:
+        entries = list(self._entries())
+        size = sum(s for _, s, _ in entries)
+        with self._lock:
+            self._size = size
+            lookups = self.hits + self.misses
+            return {
+                "dir": os.path.abspath(self.root),
+                "extractor": self.extractor,
+                "entries": len(entries),
+                "size_bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> ExtractionCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache()
+        return _cache
+
+
+def load_pages(file_path: str, sha256: str, cache: ExtractionCache = None):
+    """
+    Pages for PDF / TXT, parsed at most once per (bytes, extractor).
+    """
+    cache = cache or get_extraction_cache()
+    pages = cache.get(sha256)
+    if pages is None:
+        pages = extract_pages(file_path)
+        cache.put(sha256, pages, source=os.path.basename(file_path))
+    return pages
+
+
+def load_text(file_path: str, sha256: str, cache: ExtractionCache = None) -> str:
+    return pages_to_text(load_pages(file_path, sha256, cache), file_path)
@@ -0,0 +1,151 @@
+import os
+import re
+from email.utils import formatdate
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+
+# Content is addressed by hash (doc_id / page), so it never changes under a URL
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+READ_CHUNK = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+MEDIA_TYPES = {
+    ".pdf": "application/pdf",
+    ".txt": "text/plain; charset=utf-8",
+    ".csv": "text/csv; charset=utf-8",
+}
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def media_type_for(path: str) -> str:
+    return MEDIA_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+
+
+def parse_range(header: str, size: int):
+    """
+    Single "bytes=a-b" / "bytes=a-" / "bytes=-n" range → (start, end) inclusive.
+    Returns None for a missing or multi-range header (caller sends the full
+    body, which RFC 9110 allows); raises RangeNotSatisfiable when out of bounds.
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if first == "" and last == "":
+        return None
+
+    if first == "":
+        # Suffix range: the last n bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def _base_headers(etag: str, mtime: float = None, filename: str = None) -> dict:
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": f'"{etag}"',
+        "Cache-Control": IMMUTABLE_CACHE,
+    }
+    if mtime is not None:
+        headers["Last-Modified"] = formatdate(mtime, usegmt=True)
+    if filename:
+        headers["Content-Disposition"] = f'inline; filename="{filename}"'
+    return headers
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    for tag in request.headers.get("if-none-match", "").split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag.strip('"') == etag:
+            return True
+    return False
+
+
+def _requested_range(request: Request, etag: str, size: int):
+    # If-Range: only honour Range when the client's copy is still current
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip().strip('"') != etag:
+        return None
+    return parse_range(request.headers.get("range"), size)
+
+
+def _iter_file(path: str, start: int, end: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            block = f.read(min(READ_CHUNK, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def file_response(request: Request, path: str, etag: str, media_type: str = None, filename: str = None):
+    """
+    Serves a file with ETag / 304, Cache-Control and single-range (206)
+    support, streaming only the requested bytes.
+    """
+    st = os.stat(path)
+    size = st.st_size
+    media_type = media_type or media_type_for(path)
+    headers = _base_headers(etag, st.st_mtime, filename)
+
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        byte_range = _requested_range(request, etag, size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        start, end, status = 0, size - 1, 200
+    else:
+        (start, end), status = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    headers["Content-Length"] = str(max(0, end - start + 1))
+    return StreamingResponse(_iter_file(path, start, end), status_code=status, media_type=media_type, headers=headers)
+
+
+def bytes_response(request: Request, data: bytes, etag: str, media_type: str, filename: str = None):
+    """
+    Same contract as file_response for small generated bodies (e.g. one page).
+    """
+    size = len(data)
+    headers = _base_headers(etag, filename=filename)
+
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        byte_range = _requested_range(request, etag, size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        return Response(content=data, media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=data[start:end + 1], status_code=206, media_type=media_type, headers=headers)
@@ -0,0 +1,128 @@
+"""
+Metadata filters for retrieval (/ask, /retrieve).
+
+Document-level predicates (doc id, file name, file type, upload time) are
+answered from the generation's document manifest — one small JSON read,
+no vector work — and become a `doc_id $in [...]` clause. Page ranges are
+chunk-level and go straight to Chroma. Chroma evaluates `where` against
+its SQLite metadata index *before* vector scoring, so a selective filter
+shrinks the candidate set instead of post-filtering a global top-k.
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+def and_where(*clauses) -> Optional[dict]:
+    """
+    Chroma wants `$and` with two or more operands; a single clause stays bare.
+    """
+    flat = []
+    for clause in clauses:
+        if clause:
+            flat.extend(clause["$and"] if "$and" in clause else [clause])
+    clauses = flat
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def file_type(source: str) -> str:
+    return os.path.splitext(source or "")[1].lstrip(".").lower()
+
+
+# ============================================================
+# 🔹 RESOLVED SCOPE
+# ============================================================
+@dataclass(frozen=True)
+class Scope:
+    """
+    What a filter resolves to for one search.
+
+    where    chunk-level Chroma filter (None = whole collection)
+    doc_ids  documents still eligible (None = all of them)
+    """
+    where: Optional[dict] = None
+    doc_ids: Optional[tuple] = None
+
+    @property
+    def empty(self) -> bool:
+        return self.doc_ids is not None and not self.doc_ids
+
+
+EVERYTHING = Scope()
+
+
+# ============================================================
+# 🔹 FILTER
+# ============================================================
+@dataclass
+class RetrievalFilter:
+    """
+    All fields optional; set fields are ANDed, list fields match any value.
+    Times are epoch seconds (the manifest's `added_at`); pages are 1-based
+    and inclusive.
+    """
+    doc_ids: list = field(default_factory=list)
+    sources: list = field(default_factory=list)
+    file_types: list = field(default_factory=list)
+    uploaded_after: Optional[float] = None
+    uploaded_before: Optional[float] = None
+    page_from: Optional[int] = None
+    page_to: Optional[int] = None
+
+    def __post_init__(self):
+        self.doc_ids = list(self.doc_ids or [])
+        self.sources = [s.lower() for s in (self.sources or [])]
+        self.file_types = [t.lower().lstrip(".") for t in (self.file_types or [])]
+        if self.page_from is not None and self.page_to is not None and self.page_from > self.page_to:
+            raise ValueError("page_from must be <= page_to.")
+
+    @property
+    def document_level(self) -> bool:
+        return bool(
+            self.doc_ids or self.sources or self.file_types
+            or self.uploaded_after is not None or self.uploaded_before is not None
+        )
+
+    def matches(self, doc_id: str, entry: dict) -> bool:
+        if self.doc_ids and doc_id not in self.doc_ids:
+            return False
+        if self.sources and (entry.get("source") or "").lower() not in self.sources:
+            return False
+        if self.file_types and file_type(entry.get("source")) not in self.file_types:
+            return False
+        added = entry.get("added_at")
+        if self.uploaded_after is not None and (added is None or added < self.uploaded_after):
+            return False
+        if self.uploaded_before is not None and (added is None or added > self.uploaded_before):
+            return False
+        return True
+
+    def page_where(self) -> Optional[dict]:
+        clauses = []
+        if self.page_from is not None:
+            clauses.append({"page": {"$gte": int(self.page_from)}})
+        if self.page_to is not None:
+            clauses.append({"page": {"$lte": int(self.page_to)}})
+        return and_where(*clauses)
+
+    def resolve(self, documents: dict) -> Scope:
+        """
+        documents: the manifest (doc_id → entry) of the live generation.
+        """
+        doc_ids = None
+        doc_clause = None
+
+        if self.document_level:
+            doc_ids = tuple(sorted(d for d, entry in documents.items() if self.matches(d, entry)))
+            if not doc_ids:
+                return Scope(doc_ids=())
+            if len(doc_ids) == len(documents):
+                doc_ids = None  # matches everything → nothing to prune
+            else:
+                doc_clause = {"doc_id": {"$in": list(doc_ids)}}
+
+        where = and_where(doc_clause, self.page_where())
+        return Scope(where=where, doc_ids=doc_ids) if where or doc_ids else EVERYTHING
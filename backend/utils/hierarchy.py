@@ -0,0 +1,291 @@
+"""
+Two-level (coarse-to-fine) index.
+
+    sections collection   one centroid vector per section and per document
+          │               (mean of its chunk vectors, re-normalized)
+          ▼
+    chunk collection      chunks tagged with doc_id + section_id
+
+A query first ranks sections (or whole documents) in the small collection,
+then searches only the chunks of the winners with a Chroma `where` filter.
+The coarse collection is ~SECTION_CHUNKS× smaller than the chunk one, so
+query cost grows with the number of sections scanned, not the corpus size.
+
+Centroids are computed from stored chunk vectors — no extra embedding or
+LLM summarization pass. Maintenance CLI (from backend/):
+    python -m utils.hierarchy rebuild [--db-root ./vectorstore]
+"""
+
+import os
+import time
+from dotenv import load_dotenv
+
+from utils.vector_store import (
+    open_vectordb,
+    add_embedded_batch,
+    get_embedding_model,
+    section_id,
+    SECTION_CHUNKS,
+)
+from utils.relevance import distance_to_similarity, collection_space
+from utils.filters import and_where, EVERYTHING
+
+load_dotenv()
+
+
+SECTIONS_COLLECTION = "smartdoc_sections"
+
+# "flat", "hierarchical", or "auto" (hierarchical once the corpus is big enough)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "auto").lower()
+HIER_LEVEL = os.getenv("HIER_LEVEL", "section")            # or "document"
+HIER_TOP_GROUPS = int(os.getenv("HIER_TOP_GROUPS", 8))     # sections/docs kept
+HIER_MIN_SECTIONS = int(os.getenv("HIER_MIN_SECTIONS", 200))
+HIER_PARENT_CONTEXT = os.getenv("HIER_PARENT_CONTEXT", "0") == "1"
+
+FETCH_PAGE = 2000
+
+
+# ============================================================
+# 🔹 COARSE COLLECTION
+# ============================================================
+_sections_cache = {}
+
+
+def open_sections(persist_dir: str, embedding_model=None):
+    """
+    The coarse collection lives next to the chunks, in the same generation
+    directory, so reset / snapshot / GC treat both as one index.
+    """
+    key = os.path.abspath(persist_dir)
+    db = _sections_cache.get(key)
+    if db is None:
+        db = open_vectordb(persist_dir, embedding_model=embedding_model, collection_name=SECTIONS_COLLECTION)
+        _sections_cache[key] = db
+    return db
+
+
+def forget_sections(persist_dir: str):
+    _sections_cache.pop(os.path.abspath(persist_dir), None)
+
+
+def _unit_mean(vectors):
+    import numpy as np
+
+    mean = np.asarray(vectors, dtype="float32").mean(axis=0)
+    norm = float(np.linalg.norm(mean))
+    return (mean / norm if norm else mean).tolist()
+
+
+def index_document(vectordb, doc_id: str, chunks: int, source: str = None, sections_db=None):
+    """
+    (Re)builds the section + document centroids of one stored document.
+    Also backfills section_id on chunks stored before sections existed.
+    Returns the number of sections written.
+    """
+    if chunks <= 0:
+        return 0
+
+    sections_db = sections_db or open_sections(vectordb._persist_directory, vectordb._embedding_function)
+    collection = vectordb._collection
+
+    groups = {}
+    backfill_ids, backfill_meta = [], []
+
+    ids = [f"{doc_id}-{i}" for i in range(chunks)]
+    for start in range(0, len(ids), FETCH_PAGE):
+        page = collection.get(ids=ids[start:start + FETCH_PAGE], include=["embeddings", "metadatas"])
+        for cid, vector, meta in zip(page["ids"], page["embeddings"], page["metadatas"]):
+            n = int(cid.rsplit("-", 1)[1])
+            sid = section_id(doc_id, n)
+            groups.setdefault(sid, []).append((n, vector))
+            if meta is not None and meta.get("section_id") != sid:
+                backfill_ids.append(cid)
+                backfill_meta.append({**meta, "section_id": sid})
+
+    for start in range(0, len(backfill_ids), FETCH_PAGE):
+        collection.update(ids=backfill_ids[start:start + FETCH_PAGE], metadatas=backfill_meta[start:start + FETCH_PAGE])
+
+    if not groups:
+        return 0
+
+    sec_ids, sec_vectors, sec_texts, sec_meta = [], [], [], []
+    for sid, members in sorted(groups.items(), key=lambda kv: min(n for n, _ in kv[1])):
+        numbers = [n for n, _ in members]
+        sec_ids.append(sid)
+        sec_vectors.append(_unit_mean([v for _, v in members]))
+        sec_texts.append(f"{source or doc_id} — chunks {min(numbers)}–{max(numbers)}")
+        sec_meta.append({
+            "level": "section",
+            "doc_id": doc_id,
+            "section_id": sid,
+            "chunk_start": min(numbers),
+            "chunk_end": max(numbers),
+            "source": source or "",
+        })
+
+    # Document vector = centroid of its section centroids
+    sec_ids.append(f"{doc_id}-doc")
+    sec_vectors.append(_unit_mean(sec_vectors))
+    sec_texts.append(source or doc_id)
+    sec_meta.append({"level": "document", "doc_id": doc_id, "section_id": "", "source": source or ""})
+
+    # Drop sections that no longer exist (re-ingest produced fewer chunks)
+    keep = set(sec_ids)
+    stale = sections_db._collection.get(where={"doc_id": doc_id}, include=[])["ids"]
+    stale = [s for s in stale if s not in keep]
+    if stale:
+        sections_db._collection.delete(ids=stale)
+
+    add_embedded_batch(sections_db, sec_ids, sec_vectors, sec_texts, sec_meta)
+    return len(sec_ids) - 1
+
+
+def remove_document(persist_dir: str, doc_id: str):
+    try:
+        open_sections(persist_dir)._collection.delete(where={"doc_id": doc_id})
+    except Exception as e:
+        print(f"⚠️ Could not remove sections for {doc_id}: {e}")
+
+
+def rebuild(vectordb, documents: dict, sections_db=None) -> int:
+    """
+    Rebuilds every centroid from the document manifest (after a snapshot
+    import, or to upgrade an index built before sections existed).
+    """
+    total = 0
+    for doc_id, entry in documents.items():
+        total += index_document(vectordb, doc_id, int(entry.get("chunks", 0)), entry.get("source"), sections_db)
+    print(f"🧭 Section index rebuilt: {len(documents)} documents, {total} sections.")
+    return total
+
+
+# ============================================================
+# 🔹 SEARCH
+# ============================================================
+def _scored(db, results):
+    space = collection_space(db)
+    return [(doc, round(distance_to_similarity(dist, space), 4)) for doc, dist in results]
+
+
+def flat_search_by_vector(vectordb, vector, k: int, where=None):
+    results = vectordb.similarity_search_by_vector_with_relevance_scores(vector, k=k, filter=where)
+    scored = _scored(vectordb, results)
+    scored.sort(key=lambda pair: -pair[1])
+    return scored
+
+
+def coarse_to_fine_by_vector(vectordb, sections_db, vector, k: int, top_groups: int = None, level: str = None,
+                             scope=EVERYTHING):
+    """
+    Ranks sections (or documents), then searches only their chunks.
+    Returns [(Document, score)] best first, like a flat search.
+    A filter scope restricts both stages to the eligible documents.
+    """
+    level = level or HIER_LEVEL
+    top_groups = top_groups or HIER_TOP_GROUPS
+
+    doc_clause = {"doc_id": {"$in": list(scope.doc_ids)}} if scope.doc_ids else None
+    groups = flat_search_by_vector(sections_db, vector, top_groups, where=and_where({"level": level}, doc_clause))
+    if not groups:
+        return []
+
+    if level == "document":
+        where = {"doc_id": {"$in": [g.metadata["doc_id"] for g, _ in groups]}}
+    else:
+        where = {"section_id": {"$in": [g.metadata["section_id"] for g, _ in groups]}}
+    return flat_search_by_vector(vectordb, vector, k, where=and_where(where, scope.where))
+
+
+def expand_to_parents(vectordb, scored):
+    """
+    Replaces each hit by its whole parent section (once per section, keeping
+    the best score) so the LLM sees the surrounding context.
+    """
+    from langchain_core.documents import Document
+
+    seen = {}
+    for doc, score in scored:
+        sid = doc.metadata.get("section_id")
+        if not sid or sid in seen:
+            continue
+        doc_id = doc.metadata["doc_id"]
+        first = int(sid.rsplit("-s", 1)[1]) * SECTION_CHUNKS
+        ids = [f"{doc_id}-{n}" for n in range(first, first + SECTION_CHUNKS)]
+        page = vectordb._collection.get(ids=ids, include=["documents", "metadatas"])
+        parts = sorted(zip(page["ids"], page["documents"]), key=lambda p: int(p[0].rsplit("-", 1)[1]))
+        meta = {**doc.metadata, "parent": sid, "hit_chunk": doc.metadata.get("chunk")}
+        seen[sid] = (Document(page_content="\n".join(text for _, text in parts), metadata=meta), score)
+
+    return list(seen.values()) or scored
+
+
+def use_hierarchy(sections_db) -> bool:
+    if RETRIEVAL_MODE == "flat":
+        return False
+    if RETRIEVAL_MODE == "hierarchical":
+        return True
+    try:
+        return sections_db._collection.count() >= HIER_MIN_SECTIONS
+    except Exception:
+        return False
+
+
+def search(vectordb, question: str, k: int, parent_context: bool = None, scope=None):
+    """
+    Score-aware retrieval entry point: [(Document, cosine similarity)].
+    Picks flat or coarse-to-fine per RETRIEVAL_MODE; `scope` (a resolved
+    utils.filters.Scope) prefilters candidates inside Chroma.
+    """
+    scope = scope or EVERYTHING
+    if scope.empty:
+        return []
+
+    vector = vectordb._embedding_function.embed_query(question)
+
+    # A filter down to a handful of documents already prunes harder than
+    # the coarse stage would — go straight to the filtered chunks.
+    narrow = scope.doc_ids is not None and len(scope.doc_ids) <= HIER_TOP_GROUPS
+
+    scored = None
+    if RETRIEVAL_MODE != "flat" and not narrow:
+        sections_db = open_sections(vectordb._persist_directory, vectordb._embedding_function)
+        if use_hierarchy(sections_db):
+            scored = coarse_to_fine_by_vector(vectordb, sections_db, vector, k, scope=scope)
+
+    if not scored:
+        scored = flat_search_by_vector(vectordb, vector, k, where=scope.where)
+
+    if HIER_PARENT_CONTEXT if parent_context is None else parent_context:
+        scored = expand_to_parents(vectordb, scored)
+    return scored
+
+
+# ============================================================
+# 🔹 CLI
+# ============================================================
+def main():
+    import argparse
+    from utils.index_manager import IndexManager
+
+    parser = argparse.ArgumentParser(description="SmartDoc section index")
+    parser.add_argument("command", choices=["rebuild", "stats"])
+    parser.add_argument("--db-root", default=os.getenv("VECTOR_DB_PATH", "./vectorstore"))
+    args = parser.parse_args()
+
+    manager = IndexManager(args.db_root)
+    path = manager.current_path()
+    embedding_model = get_embedding_model()
+    vectordb = open_vectordb(path, embedding_model=embedding_model)
+    sections_db = open_sections(path, embedding_model)
+
+    if args.command == "rebuild":
+        start = time.perf_counter()
+        rebuild(vectordb, manager.documents.all(), sections_db)
+        print(f"⏱ {time.perf_counter() - start:.1f}s")
+
+    print(f"📊 chunks={vectordb._collection.count()}  sections+docs={sections_db._collection.count()}  "
+          f"mode={RETRIEVAL_MODE} (hierarchical: {use_hierarchy(sections_db)})")
+
+
+if __name__ == "__main__":
+    main()
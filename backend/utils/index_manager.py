@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import threading
+
+from utils.vector_store import force_remove_dir, release_chroma_system
+from utils.index_state import FileLock, SPOOL_DIR, VERSION_FILE
+
+
+# ============================================================
+# 🔹 LAYOUT
+# ============================================================
+#   <VECTOR_DB_PATH>/
+#       CURRENT               ← name of the live generation
+#       VERSION               ← bumped after every write (utils.index_state)
+#       .writes/              ← write spool + owner.lock (utils.index_state)
+#       gen-<ts>-<id>/        ← one Chroma directory per generation
+#           chroma.sqlite3
+#           documents.json    ← doc_id → chunk-id manifest
+#           bulk_manifest.jsonl
+#
+# Reset = create an empty generation + atomically rewrite CURRENT.
+# Old generations are deleted by a background sweeper.
+CURRENT_FILE = "CURRENT"
+GENERATION_PREFIX = "gen-"
+DOCUMENTS_FILE = "documents.json"
+
+# Root-level coordination files (utils.index_state) — never part of a generation
+ROOT_ENTRIES = (SPOOL_DIR, VERSION_FILE)
+
+
+def _created_ms(name: str) -> int:
+    try:
+        return int(name[len(GENERATION_PREFIX):].split("-")[0])
+    except ValueError:
+        return 0
+
+
+# ============================================================
+# 🔹 PER-GENERATION DOCUMENT MANIFEST
+# ============================================================
+class DocumentManifest:
+    """
+    doc_id → {source, sha256, dedup_key, chunks, path, added_at}.
+
+    Chunk ids are deterministic ("<doc_id>-<n>"), so the chunk count is
+    enough to enumerate every id belonging to a document.
+    """
+
+    def __init__(self, generation_dir: str):
+        self.path = os.path.join(generation_dir, DOCUMENTS_FILE)
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, data: dict):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def all(self) -> dict:
+        with self._lock:
+            return self._read()
+
+    def get(self, doc_id: str):
+        with self._lock:
+            return self._read().get(doc_id)
+
+    def add(self, doc_id: str, entry: dict):
+        with self._lock:
+            data = self._read()
+            data[doc_id] = {**entry, "added_at": entry.get("added_at", time.time())}
+            self._write(data)
+
+    def replace_all(self, data: dict):
+        with self._lock:
+            self._write(data)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            data = self._read()
+            entry = data.pop(doc_id, None)
+            if entry is not None:
+                self._write(data)
+            return entry
+
+    @staticmethod
+    def chunk_ids(doc_id: str, entry: dict):
+        return [f"{doc_id}-{i}" for i in range(int(entry.get("chunks", 0)))]
+
+
+# ============================================================
+# 🔹 GENERATION MANAGER
+# ============================================================
+class IndexManager:
+    """
+    Owns the generation layout under VECTOR_DB_PATH.
+
+    Callers always ask `current_path()` for the live Chroma directory.
+    `reset()` is O(1): it never waits on file deletion, so no sleeps or
+    rmtree retries run on the request path.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        self._manifests = {}
+        os.makedirs(root, exist_ok=True)
+
+    # ---------- pointer ----------
+    def _pointer(self) -> str:
+        return os.path.join(self.root, CURRENT_FILE)
+
+    def _read_current(self):
+        try:
+            with open(self._pointer(), "r", encoding="utf-8") as f:
+                name = f.read().strip()
+            return name or None
+        except OSError:
+            return None
+
+    def _new_generation(self) -> str:
+        # Names order by creation time (stale_generations relies on it): never
+        # reuse the live generation's millisecond, or the random suffix decides
+        created_ms = int(time.time() * 1000)
+        current = self._read_current()
+        if current:
+            created_ms = max(created_ms, _created_ms(current) + 1)
+        name = f"{GENERATION_PREFIX}{created_ms}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(os.path.join(self.root, name))
+        return name
+
+    def _switch(self, name: str):
+        # Write-then-rename: readers see either the old or the new pointer
+        tmp = self._pointer() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(name)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._pointer())
+
+    def current_path(self) -> str:
+        with self._lock:
+            name = self._read_current()
+            if name is None:
+                # Several workers may start on a fresh root at once
+                with FileLock(self._pointer() + ".lock"):
+                    name = self._read_current() or self._adopt_or_create()
+            return os.path.join(self.root, name)
+
+    def _adopt_or_create(self) -> str:
+        """
+        First run. A pre-generation store (Chroma files directly under root)
+        is moved into a generation so existing data keeps working. The write
+        spool and VERSION files stay at the root.
+        """
+        name = self._new_generation()
+        target = os.path.join(self.root, name)
+
+        for entry in os.listdir(self.root):
+            if (
+                entry == name
+                or entry.startswith(GENERATION_PREFIX)
+                or entry.startswith(CURRENT_FILE)
+                or entry.startswith(ROOT_ENTRIES)
+            ):
+                continue
+            shutil.move(os.path.join(self.root, entry), os.path.join(target, entry))
+
+        self._switch(name)
+        return name
+
+    @property
+    def documents(self) -> DocumentManifest:
+        return self.documents_for(self.current_path())
+
+    def documents_for(self, generation_path: str) -> DocumentManifest:
+        # One manifest object (and lock) per generation
+        with self._lock:
+            if generation_path not in self._manifests:
+                self._manifests[generation_path] = DocumentManifest(generation_path)
+            return self._manifests[generation_path]
+
+    # ---------- switching ----------
+    def create_generation(self) -> str:
+        """
+        New, inactive generation directory (e.g. to load a snapshot into
+        before making it live). Returns its path.
+        """
+        return os.path.join(self.root, self._new_generation())
+
+    def activate(self, generation_path: str) -> str:
+        """
+        Makes `generation_path` the live generation and schedules the old
+        ones for background deletion.
+        """
+        name = os.path.basename(generation_path.rstrip(os.sep))
+        with self._lock:
+            old = self._read_current()
+            self._switch(name)
+
+        print(f"🔁 Index generation switched: {old} → {name}")
+        self.collect_garbage_async()
+        return os.path.join(self.root, name)
+
+    def reset(self) -> str:
+        """
+        Switches to a fresh, empty generation. Returns the new generation path.
+        """
+        return self.activate(self.create_generation())
+
+    # ---------- garbage collection ----------
+    def stale_generations(self, min_age_s: float = 600):
+        """
+        Generations older than the live one. Newer inactive ones are left
+        alone for `min_age_s` — they may be a snapshot import in progress.
+        """
+        current = self._read_current()
+        now_ms = time.time() * 1000
+        stale = []
+        for entry in os.listdir(self.root):
+            if not entry.startswith(GENERATION_PREFIX) or entry == current:
+                continue
+            created_ms = _created_ms(entry)
+            if current and entry > current and now_ms - created_ms < min_age_s * 1000:
+                continue
+            stale.append(os.path.join(self.root, entry))
+        return stale
+
+    def collect_garbage(self):
+        for path in self.stale_generations():
+            release_chroma_system(path)
+            if force_remove_dir(path, retries=3):
+                with self._lock:
+                    self._manifests.pop(path, None)
+                print(f"🗑 Old index generation removed: {os.path.basename(path)}")
+            else:
+                # Still locked (e.g. Windows handle) → next sweep retries
+                print(f"⚠️ Old generation still in use, will retry: {os.path.basename(path)}")
+
+    def collect_garbage_async(self):
+        threading.Thread(target=self.collect_garbage, name="index-gc", daemon=True).start()
+
+
+# ============================================================
+# 🔹 BACKGROUND DIRECTORY DISPOSAL
+# ============================================================
+def discard_dir_async(path: str):
+    """
+    Renames `path` out of the way (instant), recreates it empty, and deletes
+    the renamed copy in a background thread.
+    """
+    if not os.path.exists(path):
+        os.makedirs(path, exist_ok=True)
+        return
+
+    path = path.rstrip(os.sep)
+    trash = f"{path}.trash-{uuid.uuid4().hex[:8]}"
+    os.replace(path, trash)
+    os.makedirs(path, exist_ok=True)
+
+    def sweep():
+        # Also picks up leftovers from a sweep interrupted by a restart
+        parent = os.path.dirname(path) or "."
+        prefix = os.path.basename(path) + ".trash-"
+        for entry in os.listdir(parent):
+            if entry.startswith(prefix):
+                force_remove_dir(os.path.join(parent, entry), retries=3)
+
+    threading.Thread(target=sweep, name="trash-gc", daemon=True).start()
@@ -0,0 +1,300 @@
+"""
+Shared index state for running several uvicorn workers.
+
+- IndexVersion: a tiny VERSION file bumped after every write. Readers stat()
+  it once per request and reopen their Chroma handle only when it changed.
+- WriteQueue: every write (ingest, delete, bulk) runs in ONE process — the
+  ingest owner, elected with an OS file lock. Other workers drop a job file
+  into a spool directory and wait for the owner's result file.
+
+Chroma keeps its HNSW index in process memory, so two processes writing the
+same directory would overwrite each other's segment files. Funnelling writes
+through one owner and reloading readers on version change avoids that.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+VERSION_FILE = "VERSION"
+SPOOL_DIR = ".writes"
+OWNER_LOCK = "owner.lock"
+
+
+# ============================================================
+# 🔹 CROSS-PROCESS FILE LOCKS
+# ============================================================
+def _lock(f, blocking: bool = True) -> bool:
+    try:
+        if fcntl is not None:
+            flags = fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)
+            fcntl.flock(f.fileno(), flags)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(f):
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    except OSError:
+        pass
+
+
+class FileLock:
+    """Blocking exclusive lock on a file, usable as a context manager."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._f = open(self.path, "a+")
+        _lock(self._f)
+        return self
+
+    def __exit__(self, *exc):
+        _unlock(self._f)
+        self._f.close()
+        self._f = None
+
+
+# ============================================================
+# 🔹 VERSION FILE
+# ============================================================
+class IndexVersion:
+    """
+    VERSION = {"version": n, "generation": "<gen dir>"}.
+    Rewritten with write-then-rename, so a stat() signature change is a
+    reliable, syscall-cheap "something changed" signal.
+    """
+
+    def __init__(self, root: str):
+        self.path = os.path.join(root, VERSION_FILE)
+        self._lock_path = self.path + ".lock"
+
+    def read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"version": 0, "generation": None}
+
+    def signature(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def bump(self, generation: str) -> int:
+        with FileLock(self._lock_path):
+            version = self.read().get("version", 0) + 1
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": version, "generation": generation, "ts": time.time()}, f)
+            os.replace(tmp, self.path)
+        return version
+
+
+class IndexWatcher:
+    """
+    Per-process view of IndexVersion. `changed()` costs one stat().
+    """
+
+    def __init__(self, version: IndexVersion):
+        self.version = version
+        self._seen = version.signature()
+
+    def changed(self) -> bool:
+        sig = self.version.signature()
+        if sig != self._seen:
+            self._seen = sig
+            return True
+        return False
+
+
+# ============================================================
+# 🔹 SINGLE-OWNER WRITE QUEUE
+# ============================================================
+class WriteQueue:
+    """
+    File-spooled write queue with one consumer per index root.
+
+    The process that holds owner.lock runs every write; others submit a
+    job file and poll for `<id>.result.json`. If the owner dies the OS
+    releases its lock and another worker takes over on its next poll.
+    """
+
+    def __init__(self, root: str, poll_interval: float = 0.1):
+        self.spool = os.path.join(root, SPOOL_DIR)
+        self.poll_interval = poll_interval
+        self.handlers = {}
+        self._shared = set()
+        self._owner_file = None
+        self._local = threading.Lock()
+        self._thread = None
+        os.makedirs(self.spool, exist_ok=True)
+
+    # ---------- ownership ----------
+    @property
+    def is_owner(self) -> bool:
+        return self._owner_file is not None
+
+    def try_become_owner(self) -> bool:
+        if self._owner_file is not None:
+            return True
+        f = open(os.path.join(self.spool, OWNER_LOCK), "a+")
+        if _lock(f, blocking=False):
+            self._owner_file = f
+            print(f"👑 Worker {os.getpid()} is the ingest owner.")
+            return True
+        f.close()
+        return False
+
+    def register(self, op: str, handler, exclusive: bool = True):
+        """
+        exclusive=False: the op only reads owner-local state (e.g. counters)
+        and must not wait behind a long-running write.
+        """
+        self.handlers[op] = handler
+        if not exclusive:
+            self._shared.add(op)
+
+    # ---------- execution ----------
+    def exclusive(self):
+        """
+        In-process write lock. Long writers started by a handler (bulk jobs)
+        take it per batch rather than for their whole run.
+        """
+        return self._local
+
+    def _run(self, op: str, args: dict):
+        if op in self._shared:
+            return self.handlers[op](**args)
+
+        # Serializes writes inside the owner (requests + spooled jobs)
+        with self._local:
+            return self.handlers[op](**args)
+
+    def _job_path(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.spool, f"{job_id}{suffix}")
+
+    def _write_json(self, path: str, data: dict):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def drain(self):
+        """
+        Owner only: runs every spooled job, oldest first.
+        """
+        jobs = sorted(n for n in os.listdir(self.spool) if n.endswith(".job.json"))
+        for name in jobs:
+            job_path = os.path.join(self.spool, name)
+            job_id = name[:-len(".job.json")]
+            try:
+                with open(job_path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+            try:
+                result = {"ok": True, "result": self._run(job["op"], job["args"])}
+            except Exception as e:
+                result = {"ok": False, "error": str(e)}
+
+            self._write_json(self._job_path(job_id, ".result.json"), result)
+            try:
+                os.remove(job_path)
+            except OSError:
+                pass
+
+    def _ensure_spool(self) -> bool:
+        """
+        Recreates a spool directory that vanished under us (moved or wiped).
+        The owner lock lived in it, so ownership is given up and re-elected
+        on a fresh lock file — otherwise two workers could both own.
+        """
+        if os.path.isdir(self.spool):
+            return False
+        os.makedirs(self.spool, exist_ok=True)
+        if self._owner_file is not None:
+            self._owner_file.close()
+            self._owner_file = None
+        print(f"♻️ Write spool recreated: {self.spool}")
+        return True
+
+    def _loop(self):
+        last_error = None
+        while True:
+            self._ensure_spool()
+            if self.try_become_owner():
+                try:
+                    self.drain()
+                    last_error = None
+                except Exception as e:
+                    # Report once, not on every poll
+                    if str(e) != last_error:
+                        print(f"⚠️ Write queue error: {e}")
+                        last_error = str(e)
+                time.sleep(self.poll_interval)
+            else:
+                # Not the owner: check again later in case it died
+                time.sleep(2.0)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="write-queue", daemon=True)
+            self._thread.start()
+
+    # ---------- submission ----------
+    async def submit(self, op: str, wait: bool = True, timeout: float = 3600, **args):
+        """
+        Runs `op` on the ingest owner. Returns the handler's result
+        (None when wait=False).
+        """
+        if self.try_become_owner():
+            if not wait:
+                threading.Thread(target=self._run, args=(op, args), daemon=True).start()
+                return None
+            return await asyncio.to_thread(self._run, op, args)
+
+        job_id = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        self._ensure_spool()
+        self._write_json(self._job_path(job_id, ".job.json"), {"op": op, "args": args})
+        if not wait:
+            return None
+
+        result_path = self._job_path(job_id, ".result.json")
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if os.path.exists(result_path):
+                with open(result_path, "r", encoding="utf-8") as f:
+                    result = json.load(f)
+                os.remove(result_path)
+                if not result["ok"]:
+                    raise RuntimeError(result["error"])
+                return result["result"]
+            await asyncio.sleep(self.poll_interval)
+
+        raise TimeoutError(f"Ingest owner did not answer job {job_id} in {timeout}s.")
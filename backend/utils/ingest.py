@@ -0,0 +1,99 @@
+import os
+from bisect import bisect_right
+from dotenv import load_dotenv
+
+from utils.document_loader import iter_csv_chunks, parse_columns, pages_to_text, page_starts
+from utils.extraction_cache import load_pages
+from utils.vector_store import split_into_chunks, build_chunk_records
+
+load_dotenv()
+
+
+# Chunks handed to the embedder / vector store per batch
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 512))
+
+
+def is_csv(file_path: str) -> bool:
+    return file_path.lower().endswith(".csv")
+
+
+def chunk_pages(text: str, chunks, starts):
+    """
+    Page number for every chunk. Chunks are in document order, so each one
+    is searched for from where the previous one started.
+    """
+    if not starts:
+        return None
+
+    offsets = [offset for offset, _ in starts]
+    pages = []
+    pos = 0
+    for chunk in chunks:
+        found = text.find(chunk[:64], pos)
+        if found >= 0:
+            pos = found
+        pages.append({"page": starts[max(0, bisect_right(offsets, pos) - 1)][1]})
+    return pages
+
+
+def iter_chunk_batches(file_path: str, sha256: str, text: str = None, columns=None, pages=None, source: str = None):
+    """
+    Turns one file into batches of ready-to-store chunks.
+
+    CSVs stream as row groups (header repeated, no row split in half), so
+    even multi-GB tables are never held in memory at once. Everything else
+    is extracted (unless `pages` or `text` is given; through the extraction
+    cache, so the same bytes are parsed once) and run through the splitter.
+    PDF chunks are tagged with the page they start on. `source` is the
+    name shown in citations (defaults to the file's own name).
+
+    Yields:
+        (list, list, list): chunk texts, ids, metadatas.
+    """
+    source = source or os.path.basename(file_path)
+
+    if is_csv(file_path):
+        texts, extra = [], []
+        start = 0
+
+        for chunk, meta in iter_csv_chunks(file_path, columns=columns):
+            texts.append(chunk)
+            extra.append(meta)
+
+            if len(texts) >= INGEST_BATCH_SIZE:
+                ids, metadatas = build_chunk_records(texts, sha256, source, start, extra)
+                yield texts, ids, metadatas
+                start += len(texts)
+                texts, extra = [], []
+
+        if texts:
+            ids, metadatas = build_chunk_records(texts, sha256, source, start, extra)
+            yield texts, ids, metadatas
+        return
+
+    if text is None:
+        if pages is None:
+            pages = load_pages(file_path, sha256)
+        text = pages_to_text(pages, file_path)
+
+    if not text or not text.strip():
+        return
+
+    chunks = split_into_chunks(text)
+    extra = chunk_pages(text, chunks, page_starts(pages, file_path)) if pages else None
+
+    for start in range(0, len(chunks), INGEST_BATCH_SIZE):
+        batch = chunks[start:start + INGEST_BATCH_SIZE]
+        batch_extra = extra[start:start + INGEST_BATCH_SIZE] if extra else None
+        ids, metadatas = build_chunk_records(batch, sha256, source, start, batch_extra)
+        yield batch, ids, metadatas
+
+
+def dedup_key(file_path: str, sha256: str, columns=None) -> str:
+    """
+    Same bytes + same CSV column selection → same embeddings.
+    """
+    columns = parse_columns(columns) if is_csv(file_path) else None
+    if columns:
+        return f"{sha256}:{','.join(columns)}"
+    return sha256
@@ -0,0 +1,140 @@
+import os
+import threading
+from dataclasses import dataclass, asdict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+# ============================================================
+# 🔹 POLICY
+# ============================================================
+@dataclass(frozen=True)
+class RelevancePolicy:
+    """
+    Decides which retrieved chunks are relevant enough to send to the LLM.
+
+    mode:
+      "threshold"  keep chunks with similarity >= min_score
+      "adaptive"   threshold, then keep only chunks within max_drop of the
+                   best one (adaptive k: a clear winner travels alone)
+      "off"        keep all k (legacy behaviour)
+
+    Scores are cosine similarities (embeddings are normalized), so
+    min_score is comparable across collections and distance spaces.
+    """
+    mode: str = "adaptive"
+    min_score: float = 0.55
+    max_drop: float = 0.12
+
+    def select(self, scored):
+        """
+        scored: [(doc, score)] best first → the subset worth answering from.
+        """
+        if self.mode == "off" or not scored:
+            return list(scored)
+
+        kept = [(doc, score) for doc, score in scored if score >= self.min_score]
+        if self.mode == "adaptive" and kept:
+            best = kept[0][1]
+            kept = [(doc, score) for doc, score in kept if best - score <= self.max_drop]
+        return kept
+
+
+def get_relevance_policy() -> RelevancePolicy:
+    """
+    Reads RELEVANCE_MODE / RELEVANCE_MIN_SCORE / RELEVANCE_MAX_DROP.
+    """
+    defaults = RelevancePolicy()
+    mode = os.getenv("RELEVANCE_MODE", defaults.mode).lower()
+    if mode not in ("threshold", "adaptive", "off"):
+        raise ValueError(f"RELEVANCE_MODE must be threshold, adaptive or off (got {mode!r}).")
+
+    return RelevancePolicy(
+        mode=mode,
+        min_score=float(os.getenv("RELEVANCE_MIN_SCORE", defaults.min_score)),
+        max_drop=float(os.getenv("RELEVANCE_MAX_DROP", defaults.max_drop)),
+    )
+
+
+# ============================================================
+# 🔹 SCORE-AWARE SEARCH
+# ============================================================
+def distance_to_similarity(distance: float, space: str) -> float:
+    """
+    Chroma returns distances; for unit vectors all three spaces map to
+    cosine similarity (l2 is *squared* L2 = 2 - 2·cos).
+    """
+    if space == "l2":
+        return 1.0 - distance / 2.0
+    # "cosine" → 1 - cos, "ip" → 1 - dot
+    return 1.0 - distance
+
+
+def collection_space(vectordb) -> str:
+    try:
+        return (vectordb._collection.metadata or {}).get("hnsw:space", "l2")
+    except Exception:
+        return "l2"
+
+
+def scored_search(vectordb, question: str, k: int):
+    """
+    Top-k chunks with cosine similarity, best first: [(Document, score)].
+    """
+    space = collection_space(vectordb)
+    results = vectordb.similarity_search_with_score(question, k=k)
+    scored = [(doc, round(distance_to_similarity(dist, space), 4)) for doc, dist in results]
+    scored.sort(key=lambda pair: -pair[1])
+    return scored
+
+
+# ============================================================
+# 🔹 METRICS
+# ============================================================
+class RelevanceMetrics:
+    """
+    Per-process counters of gated questions and LLM calls avoided.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.questions = 0
+        self.llm_calls = 0
+        self.llm_calls_avoided = 0
+        self.chunks_retrieved = 0
+        self.chunks_sent = 0
+        self._top_score_sum = 0.0
+        self._scored = 0
+
+    def record(self, retrieved: int, sent: int, top_score: float = None):
+        with self._lock:
+            self.questions += 1
+            self.chunks_retrieved += retrieved
+            self.chunks_sent += sent
+            if sent:
+                self.llm_calls += 1
+            else:
+                self.llm_calls_avoided += 1
+            if top_score is not None:
+                self._top_score_sum += top_score
+                self._scored += 1
+
+    def to_dict(self, policy: RelevancePolicy = None) -> dict:
+        with self._lock:
+            q = self.questions
+            return {
+                "pid": os.getpid(),
+                "policy": asdict(policy or get_relevance_policy()),
+                "questions": q,
+                "llm_calls": self.llm_calls,
+                "llm_calls_avoided": self.llm_calls_avoided,
+                "avoided_rate": round(self.llm_calls_avoided / q, 4) if q else None,
+                "chunks_retrieved": self.chunks_retrieved,
+                "chunks_sent": self.chunks_sent,
+                "avg_chunks_sent": round(self.chunks_sent / self.llm_calls, 2) if self.llm_calls else None,
+                "avg_top_score": round(self._top_score_sum / self._scored, 4) if self._scored else None,
+            }
+
+
+relevance_metrics = RelevanceMetrics()
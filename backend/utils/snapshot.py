@@ -0,0 +1,308 @@
+import os
+import io
+import json
+import mmap
+import time
+import zlib
+import struct
+import hashlib
+from dataclasses import asdict
+from dotenv import load_dotenv
+
+from utils.text_chunker import get_chunking_config
+from utils.vector_store import open_vectordb, add_embedded_batch
+
+load_dotenv()
+
+
+# ============================================================
+# 🔹 FILE FORMAT
+# ============================================================
+#   MAGIC (8 bytes)
+#   vectors   float32 [count × dim], little endian, 64-byte aligned
+#   records   zlib-compressed JSON lines: [id, text, metadata]
+#   header    JSON (fingerprint, counts, offsets, per-section SHA-256)
+#   footer    uint64 header length + MAGIC
+#
+# The header goes last so export can stream everything in one pass.
+# Vectors are stored raw so import can memory-map them instead of parsing.
+MAGIC = b"SDSNAP1\0"
+FOOTER = struct.Struct("<Q8s")
+ALIGN = 64
+FORMAT_VERSION = 1
+EXPORT_PAGE_SIZE = 5000
+
+SNAPSHOT_EXTENSION = ".sdsnap"
+
+
+class SnapshotError(ValueError):
+    """Raised for corrupt, incompatible or unreadable snapshots."""
+
+
+def embedding_fingerprint(dim: int = None, collection=None) -> dict:
+    """
+    Everything that must match for stored vectors to be comparable with
+    vectors this backend computes for new queries.
+    """
+    fingerprint = {
+        "embedding_model": os.getenv("EMBEDDING_MODEL", "BAAI/bge-large-en-v1.5"),
+        "normalize_embeddings": True,
+        "dim": dim,
+        "chunking": asdict(get_chunking_config()),
+    }
+    if collection is not None:
+        fingerprint["collection_metadata"] = collection.metadata or {}
+    return fingerprint
+
+
+def _pad(f):
+    pad = (-f.tell()) % ALIGN
+    if pad:
+        f.write(b"\0" * pad)
+
+
+# ============================================================
+# 🔹 EXPORT
+# ============================================================
+def export_snapshot(vectordb, out_path: str, documents: dict = None) -> dict:
+    """
+    Streams every chunk of the collection (vectors, text, metadata) into
+    one checksummed snapshot file. Returns the header.
+    """
+    import numpy as np
+
+    collection = vectordb._collection
+    total = collection.count()
+    tmp_path = out_path + ".tmp"
+
+    vec_digest = hashlib.sha256()
+    rec_digest = hashlib.sha256()
+    compressor = zlib.compressobj(6)
+    records = io.BytesIO()
+    dim = None
+    count = 0
+
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        _pad(f)
+        vectors_offset = f.tell()
+
+        # Vectors stream straight to disk; records are compressed in memory
+        for offset in range(0, total, EXPORT_PAGE_SIZE):
+            page = collection.get(
+                include=["embeddings", "documents", "metadatas"],
+                limit=EXPORT_PAGE_SIZE,
+                offset=offset,
+            )
+            if not page["ids"]:
+                break
+
+            block = np.asarray(page["embeddings"], dtype="<f4")
+            if dim is None:
+                dim = int(block.shape[1])
+            elif block.shape[1] != dim:
+                raise SnapshotError("Collection contains vectors of mixed dimensions.")
+
+            raw = block.tobytes()
+            vec_digest.update(raw)
+            f.write(raw)
+
+            for cid, text, meta in zip(page["ids"], page["documents"], page["metadatas"]):
+                line = json.dumps([cid, text, meta or {}], ensure_ascii=False).encode("utf-8") + b"\n"
+                records.write(compressor.compress(line))
+            count += len(page["ids"])
+
+        records.write(compressor.flush())
+        vectors_bytes = f.tell() - vectors_offset
+
+        _pad(f)
+        records_offset = f.tell()
+        payload = records.getvalue()
+        rec_digest.update(payload)
+        f.write(payload)
+
+        header = {
+            "format": FORMAT_VERSION,
+            "created_at": time.time(),
+            "count": count,
+            "dim": dim or 0,
+            "dtype": "float32",
+            "fingerprint": embedding_fingerprint(dim, collection),
+            "vectors": {"offset": vectors_offset, "bytes": vectors_bytes, "sha256": vec_digest.hexdigest()},
+            "records": {"offset": records_offset, "bytes": len(payload), "codec": "zlib", "sha256": rec_digest.hexdigest()},
+            "documents": documents or {},
+        }
+        raw_header = json.dumps(header).encode("utf-8")
+        f.write(raw_header)
+        f.write(FOOTER.pack(len(raw_header), MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, out_path)
+    print(f"📦 Snapshot exported: {out_path} ({count} chunks, dim={dim})")
+    return header
+
+
+# ============================================================
+# 🔹 READ / VERIFY
+# ============================================================
+def read_header(path: str) -> dict:
+    if os.path.getsize(path) < len(MAGIC) + FOOTER.size:
+        raise SnapshotError("Truncated snapshot (file too small).")
+
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise SnapshotError("Not a SmartDoc snapshot (bad magic).")
+
+        f.seek(-FOOTER.size, os.SEEK_END)
+        header_len, magic = FOOTER.unpack(f.read(FOOTER.size))
+        if magic != MAGIC:
+            raise SnapshotError("Truncated snapshot (bad footer).")
+        if header_len > os.path.getsize(path) - len(MAGIC) - FOOTER.size:
+            raise SnapshotError("Corrupt snapshot footer (header length out of range).")
+
+        f.seek(-(FOOTER.size + header_len), os.SEEK_END)
+        try:
+            return json.loads(f.read(header_len))
+        except ValueError:
+            raise SnapshotError("Corrupt snapshot header.")
+
+
+def _section_digest(mm, section: dict) -> str:
+    digest = hashlib.sha256()
+    start, end = section["offset"], section["offset"] + section["bytes"]
+    step = 8 * 1024 * 1024
+    for pos in range(start, end, step):
+        digest.update(mm[pos:min(pos + step, end)])
+    return digest.hexdigest()
+
+
+def verify_snapshot(path: str) -> dict:
+    """
+    Checks structure, sizes and both SHA-256 checksums.
+    Returns a report; raises SnapshotError on the first problem.
+    """
+    header = read_header(path)
+    expected_vec_bytes = header["count"] * header["dim"] * 4
+    if header["vectors"]["bytes"] != expected_vec_bytes:
+        raise SnapshotError("Vector section size does not match count × dim.")
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for name in ("vectors", "records"):
+            if _section_digest(mm, header[name]) != header[name]["sha256"]:
+                raise SnapshotError(f"Checksum mismatch in {name} section.")
+
+    return {
+        "path": path,
+        "ok": True,
+        "count": header["count"],
+        "dim": header["dim"],
+        "documents": len(header.get("documents", {})),
+        "fingerprint": header["fingerprint"],
+        "size_bytes": os.path.getsize(path),
+    }
+
+
+def check_compatible(header: dict):
+    """
+    The snapshot must come from the same embedding model, or new query
+    vectors would be compared against a foreign vector space.
+    """
+    ours = embedding_fingerprint()
+    theirs = header["fingerprint"]
+    if theirs.get("embedding_model") != ours["embedding_model"]:
+        raise SnapshotError(
+            f"Snapshot was built with {theirs.get('embedding_model')}, "
+            f"this backend uses {ours['embedding_model']}."
+        )
+
+
+# ============================================================
+# 🔹 IMPORT
+# ============================================================
+def iter_snapshot(path: str, batch_size: int = 4096):
+    """
+    Yields (ids, vectors, texts, metadatas) batches. Vectors are sliced from
+    a read-only memory map of the file, so pages are read lazily and only
+    one batch is materialized (as plain lists, ready for Chroma) at a time.
+    """
+    import numpy as np
+
+    header = read_header(path)
+    count, dim = header["count"], header["dim"]
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        vectors = np.frombuffer(mm, dtype="<f4", count=count * dim, offset=header["vectors"]["offset"])
+        vectors = vectors.reshape(count, dim) if count else vectors.reshape(0, max(dim, 1))
+
+        sec = header["records"]
+        decompressor = zlib.decompressobj()
+        pending = b""
+        ids, texts, metas = [], [], []
+        row = 0
+
+        for pos in range(sec["offset"], sec["offset"] + sec["bytes"], 1024 * 1024):
+            end = min(pos + 1024 * 1024, sec["offset"] + sec["bytes"])
+            pending += decompressor.decompress(mm[pos:end])
+            *lines, pending = pending.split(b"\n")
+
+            for line in lines:
+                cid, text, meta = json.loads(line)
+                ids.append(cid)
+                texts.append(text)
+                metas.append(meta or None)
+
+                if len(ids) >= batch_size:
+                    yield ids, vectors[row:row + len(ids)].tolist(), texts, metas
+                    row += len(ids)
+                    ids, texts, metas = [], [], []
+
+        pending += decompressor.flush()
+        for line in pending.split(b"\n"):
+            if line:
+                cid, text, meta = json.loads(line)
+                ids.append(cid)
+                texts.append(text)
+                metas.append(meta or None)
+
+        if ids:
+            yield ids, vectors[row:row + len(ids)].tolist(), texts, metas
+
+        # Release the numpy view before the mmap closes
+        del vectors
+
+
+def import_snapshot(path: str, generation_path: str, verify: bool = True, force: bool = False):
+    """
+    Loads a snapshot into an (inactive) generation directory. Vectors are
+    written in large batches straight from the memory map — no re-embedding.
+
+    Returns:
+        (vectordb, header)
+    """
+    if verify:
+        verify_snapshot(path)
+    header = read_header(path)
+    if not force:
+        check_compatible(header)
+
+    collection_metadata = header["fingerprint"].get("collection_metadata") or None
+    vectordb = open_vectordb(generation_path, collection_metadata=collection_metadata)
+
+    loaded = 0
+    for ids, vectors, texts, metas in iter_snapshot(path):
+        # Chroma rejects empty metadata — legacy chunks without any get a marker
+        if any(metas):
+            metas = [m or {"imported": True} for m in metas]
+        else:
+            metas = None
+        add_embedded_batch(vectordb, ids, vectors, texts, metas)
+        loaded += len(ids)
+
+    try:
+        vectordb.persist()
+    except:
+        pass
+
+    print(f"📥 Snapshot imported: {loaded} chunks → {generation_path}")
+    return vectordb, header
@@ -0,0 +1,172 @@
+"""
+Startup warm-up and readiness tracking.
+
+Heavy dependencies are imported lazily by the modules that use them; this
+module imports them once in the background right after the server starts,
+times each import, and loads the embedding model, vector DB and LLM so the
+first user request doesn't pay for any of it.
+
+Run directly for an import-time breakdown:
+    python -m utils.startup
+"""
+
+import sys
+import time
+import importlib
+import threading
+
+
+# Heavy modules in the order the request path first needs them
+HEAVY_MODULES = [
+    "chromadb",
+    "langchain_community.vectorstores",
+    "langchain_community.embeddings",
+    "sentence_transformers",
+    "pandas",
+    "pdfplumber",
+    "google.generativeai",
+]
+
+
+class StartupState:
+    """
+    Thread-safe record of what has been warmed up so far.
+
+    Statuses: pending → ready / empty / failed. "lazy" means warm-up is
+    disabled and the component loads on first use — that still counts as
+    ready to serve, as do components a request loaded lazily.
+    """
+
+    COMPONENTS = ("imports", "embeddings", "index", "llm")
+    READY_STATES = ("ready", "empty", "lazy")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.components = {name: "pending" for name in self.COMPONENTS}
+        self.errors = {}
+        self.import_times_ms = {}
+        self.timings_ms = {}
+
+    def set(self, component: str, status: str, error: Exception = None, elapsed: float = None):
+        with self._lock:
+            self.components[component] = status
+            if error is not None:
+                self.errors[component] = str(error)
+            elif status in self.READY_STATES:
+                self.errors.pop(component, None)
+            if elapsed is not None:
+                self.timings_ms[component] = round(elapsed * 1000, 1)
+
+    def defer(self):
+        """
+        WARM_UP=0: nothing will be preloaded, so don't wait for it.
+        """
+        with self._lock:
+            for name, status in self.components.items():
+                if status == "pending":
+                    self.components[name] = "lazy"
+
+    def record_import(self, module: str, elapsed: float):
+        with self._lock:
+            self.import_times_ms[module] = round(elapsed * 1000, 1)
+
+    @property
+    def ready(self) -> bool:
+        # "index" may legitimately be empty (nothing uploaded yet)
+        with self._lock:
+            return all(
+                self.components[c] in self.READY_STATES
+                for c in self.COMPONENTS
+            )
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "ready": all(s in self.READY_STATES for s in self.components.values()),
+                "components": dict(self.components),
+                "errors": dict(self.errors),
+                "timings_ms": dict(self.timings_ms),
+                "import_times_ms": dict(self.import_times_ms),
+                "uptime_s": round(time.time() - self.started_at, 1),
+            }
+
+
+def timed_import(module: str):
+    """
+    Imports a module and returns (module, seconds). Already-imported modules
+    report ~0, so the numbers show what is still left on the cold path.
+    """
+    start = time.perf_counter()
+    mod = importlib.import_module(module)
+    return mod, time.perf_counter() - start
+
+
+def import_heavy_modules(state: StartupState = None):
+    for name in HEAVY_MODULES:
+        if name == "google.generativeai":
+            import disable_telemetry
+            disable_telemetry.disable()
+        try:
+            _, elapsed = timed_import(name)
+        except Exception as e:
+            print(f"⚠️ [WARM-UP] Import failed: {name} → {e}")
+            continue
+        if state is not None:
+            state.record_import(name, elapsed)
+        print(f"📦 [WARM-UP] {name}: {elapsed * 1000:.0f} ms")
+
+
+def warm_up(state: StartupState, vector_db_path: str):
+    """
+    Imports heavy modules, loads the embedding model, opens the index and
+    loads the LLM. Returns (vectordb, llm); either may be None.
+    """
+    from utils.vector_store import get_embedding_model, load_existing_embeddings
+    from rag_pipeline import load_llm_pipeline
+
+    vectordb = None
+    llm = None
+
+    start = time.perf_counter()
+    import_heavy_modules(state)
+    state.set("imports", "ready", elapsed=time.perf_counter() - start)
+
+    start = time.perf_counter()
+    try:
+        get_embedding_model()
+        state.set("embeddings", "ready", elapsed=time.perf_counter() - start)
+    except Exception as e:
+        state.set("embeddings", "failed", error=e)
+
+    start = time.perf_counter()
+    try:
+        vectordb = load_existing_embeddings(vector_db_path)
+        state.set("index", "ready" if vectordb is not None else "empty", elapsed=time.perf_counter() - start)
+    except Exception as e:
+        state.set("index", "failed", error=e)
+
+    start = time.perf_counter()
+    try:
+        llm = load_llm_pipeline()
+        if llm is None:
+            state.set("llm", "failed", error=RuntimeError("LLM could not be initialized."))
+        else:
+            state.set("llm", "ready", elapsed=time.perf_counter() - start)
+    except Exception as e:
+        state.set("llm", "failed", error=e)
+
+    print(f"🚀 [WARM-UP] Done → {state.to_dict()['components']}")
+    return vectordb, llm
+
+
+if __name__ == "__main__":
+    state = StartupState()
+    total = time.perf_counter()
+    import_heavy_modules(state)
+    total = time.perf_counter() - total
+
+    print("\n--- IMPORT-TIME BREAKDOWN ---")
+    for name, ms in sorted(state.import_times_ms.items(), key=lambda kv: -kv[1]):
+        print(f"{ms:10.1f} ms  {name}")
+    print(f"{total * 1000:10.1f} ms  TOTAL ({len(sys.modules)} modules loaded)")
@@ -0,0 +1,328 @@
+import os
+import json
+import uuid
+import hashlib
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+# ============================================================
+# 🔹 CONFIG
+# ============================================================
+# Bytes read from the request per iteration (bounded memory per upload)
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Suggested chunk size for resumable uploads (client side)
+RESUMABLE_CHUNK_SIZE = 8 * 1024 * 1024
+
+PARTIAL_DIR_NAME = ".partial"
+HASH_REGISTRY_NAME = ".hashes.json"
+
+
+def max_upload_bytes() -> int:
+    """
+    Maximum accepted upload size, from MAX_UPLOAD_MB (default 512 MB).
+    """
+    return int(os.getenv("MAX_UPLOAD_MB", 512)) * 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds MAX_UPLOAD_MB."""
+
+
+class UploadOffsetMismatch(ValueError):
+    """Raised when a resumable chunk does not start at the stored offset."""
+
+    def __init__(self, expected: int):
+        super().__init__(f"Expected offset {expected}")
+        self.expected = expected
+
+
+def safe_filename(filename: str) -> str:
+    """
+    Strips any directory components a client may have sent.
+    """
+    name = os.path.basename((filename or "").replace("\\", "/")).strip()
+    if not name or name in (".", ".."):
+        raise ValueError("Invalid file name.")
+    return name
+
+
+def stored_name(sha256: str, filename: str) -> str:
+    """
+    Content-addressed name for a stored upload: "<doc_id><ext>". Two
+    documents that merely share a file name never share (or overwrite)
+    a stored file; the original name is kept in the manifest.
+    """
+    return sha256[:16] + os.path.splitext(filename)[1].lower()
+
+
+# ============================================================
+# 🔹 STREAMING SAVE (single request)
+# ============================================================
+async def save_upload_stream(upload, dest_path: str, max_bytes: int = None):
+    """
+    Streams an UploadFile to disk in STREAM_CHUNK_SIZE pieces.
+
+    The SHA-256 is computed while writing, so the file is never held
+    in memory and never re-read. Data goes to a ".part" file first and
+    is moved into place only when complete.
+
+    Returns:
+        (int, str): size in bytes and hex SHA-256 digest.
+    """
+    max_bytes = max_bytes or max_upload_bytes()
+    part_path = dest_path + ".part"
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(part_path, "wb") as f:
+            while True:
+                block = await upload.read(STREAM_CHUNK_SIZE)
+                if not block:
+                    break
+
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLarge(
+                        f"File exceeds the {max_bytes // (1024 * 1024)} MB limit."
+                    )
+
+                digest.update(block)
+                f.write(block)
+
+        os.replace(part_path, dest_path)
+
+    except BaseException:
+        if os.path.exists(part_path):
+            try:
+                os.remove(part_path)
+            except OSError:
+                pass
+        raise
+
+    return size, digest.hexdigest()
+
+
+def hash_file(file_path: str) -> str:
+    """
+    SHA-256 of a file on disk, read in STREAM_CHUNK_SIZE pieces.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(STREAM_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ============================================================
+# 🔹 HASH REGISTRY (dedup of already-ingested files)
+# ============================================================
+class HashRegistry:
+    """
+    Small JSON map of sha256 → filename for files already embedded.
+    Lives inside the upload dir, so /reset clears it together with the files.
+    """
+
+    def __init__(self, upload_dir: str):
+        self.path = os.path.join(upload_dir, HASH_REGISTRY_NAME)
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, sha256: str):
+        with self._lock:
+            return self._read().get(sha256)
+
+    def _write(self, data: dict):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def add(self, sha256: str, filename: str):
+        with self._lock:
+            data = self._read()
+            data[sha256] = filename
+            self._write(data)
+
+    def remove(self, sha256: str):
+        with self._lock:
+            data = self._read()
+            if data.pop(sha256, None) is not None:
+                self._write(data)
+
+    def replace_all(self, data: dict):
+        with self._lock:
+            self._write(dict(data))
+
+    @staticmethod
+    def from_documents(documents: dict) -> dict:
+        """
+        Registry contents for a document manifest (dedup_key → source).
+        """
+        return {entry.get("dedup_key", entry["sha256"]): entry["source"] for entry in documents.values()}
+
+
+# ============================================================
+# 🔹 RESUMABLE UPLOAD SESSIONS
+# ============================================================
+class ResumableUploads:
+    """
+    Chunked uploads that survive timeouts and reconnects.
+
+    Each session is a ".part" file plus a small JSON descriptor under
+    <upload_dir>/.partial/. The size of the ".part" file is the source of
+    truth for the received offset, so a client can always ask where to
+    resume from — even after a backend restart.
+
+    The SHA-256 is updated as chunks arrive (chunks are accepted strictly
+    in order), so completing an upload never re-reads the file. Bytes this
+    process did not receive itself — another worker's chunks, or chunks
+    from before a restart — are read once from the ".part" file to catch up.
+    """
+
+    def __init__(self, upload_dir: str):
+        self.upload_dir = upload_dir
+        self.partial_dir = os.path.join(upload_dir, PARTIAL_DIR_NAME)
+        self._digests = {}  # upload_id → (offset, running sha256)
+
+    # ---------- paths ----------
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.partial_dir, f"{upload_id}.json")
+
+    def _part_path(self, upload_id: str) -> str:
+        return os.path.join(self.partial_dir, f"{upload_id}.part")
+
+    @staticmethod
+    def _check_id(upload_id: str):
+        # upload ids are uuid4 hex — reject anything else (no path tricks)
+        try:
+            uuid.UUID(hex=upload_id)
+        except ValueError:
+            raise KeyError(upload_id)
+
+    def _load(self, upload_id: str) -> dict:
+        self._check_id(upload_id)
+        try:
+            with open(self._meta_path(upload_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except OSError:
+            raise KeyError(upload_id)
+
+    def _digest(self, upload_id: str, offset: int):
+        """
+        SHA-256 object over the first `offset` bytes of the upload (a copy,
+        so a failed chunk never leaks into the stored state).
+        """
+        seen, digest = self._digests.get(upload_id, (0, None))
+        if digest is None or seen > offset:
+            seen, digest = 0, hashlib.sha256()
+        else:
+            digest = digest.copy()
+
+        if seen < offset:
+            with open(self._part_path(upload_id), "rb") as f:
+                f.seek(seen)
+                remaining = offset - seen
+                while remaining > 0:
+                    block = f.read(min(STREAM_CHUNK_SIZE, remaining))
+                    if not block:
+                        break
+                    digest.update(block)
+                    remaining -= len(block)
+        return digest
+
+    # ---------- API ----------
+    def create(self, filename: str, total_size: int) -> dict:
+        filename = safe_filename(filename)
+        max_bytes = max_upload_bytes()
+        if total_size < 0 or total_size > max_bytes:
+            raise UploadTooLarge(
+                f"File exceeds the {max_bytes // (1024 * 1024)} MB limit."
+            )
+
+        os.makedirs(self.partial_dir, exist_ok=True)
+        upload_id = uuid.uuid4().hex
+        meta = {"upload_id": upload_id, "filename": filename, "size": total_size}
+
+        with open(self._meta_path(upload_id), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        open(self._part_path(upload_id), "wb").close()
+
+        return {**meta, "offset": 0, "chunk_size": RESUMABLE_CHUNK_SIZE}
+
+    def status(self, upload_id: str) -> dict:
+        meta = self._load(upload_id)
+        meta["offset"] = os.path.getsize(self._part_path(upload_id))
+        return meta
+
+    async def append(self, upload_id: str, offset: int, stream) -> int:
+        """
+        Appends an async byte stream at `offset`.
+        Returns the new offset.
+        """
+        meta = self._load(upload_id)
+        part_path = self._part_path(upload_id)
+
+        current = os.path.getsize(part_path)
+        if offset != current:
+            raise UploadOffsetMismatch(current)
+
+        digest = self._digest(upload_id, current)
+        written = current
+        with open(part_path, "ab") as f:
+            async for block in stream:
+                if not block:
+                    continue
+                written += len(block)
+                if written > meta["size"]:
+                    f.truncate(current)
+                    raise UploadTooLarge("Chunk goes past the declared file size.")
+                digest.update(block)
+                f.write(block)
+
+        self._digests[upload_id] = (written, digest)
+        return written
+
+    def complete(self, upload_id: str):
+        """
+        Moves a fully received upload into the upload dir.
+
+        Returns:
+            (str, int, str, str): final path, size, hex SHA-256, original name.
+        """
+        meta = self.status(upload_id)
+        if meta["offset"] != meta["size"]:
+            raise UploadOffsetMismatch(meta["offset"])
+
+        part_path = self._part_path(upload_id)
+        sha256 = self._digest(upload_id, meta["size"]).hexdigest()
+
+        dest_path = os.path.join(self.upload_dir, stored_name(sha256, meta["filename"]))
+        os.replace(part_path, dest_path)
+        self.abort(upload_id)
+
+        return dest_path, meta["size"], sha256, meta["filename"]
+
+    def abort(self, upload_id: str):
+        self._digests.pop(upload_id, None)
+        try:
+            self._check_id(upload_id)
+        except KeyError:
+            return
+
+        for path in (self._meta_path(upload_id), self._part_path(upload_id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -3,15 +3,24 @@ import shutil
 import gc
 import time
 import stat
+from functools import lru_cache
 from dotenv import load_dotenv
 
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import SentenceTransformerEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from utils.text_chunker import get_chunker
 
 load_dotenv()
 
 
+# ============================================================
+# 🔹 DEFERRED HEAVY IMPORTS
+# ============================================================
+# langchain_community + chromadb take seconds to import; pull them in on
+# first use (or during startup warm-up) instead of at module load.
+def _chroma():
+    from langchain_community.vectorstores import Chroma
+    return Chroma
+
+
 # ============================================================
 # 🔹 LOAD EMBEDDING MODEL  (UPDATED FOR BGE-LARGE)
 # ============================================================
@@ -19,8 +28,16 @@ def get_embedding_model():
     """
     Loads the embedding model defined in .env.
     Defaults to BGE-Large if nothing is set.
+    The model is loaded once per process and shared afterwards.
     """
     model_name = os.getenv("EMBEDDING_MODEL", "BAAI/bge-large-en-v1.5")
+    return _load_embedding_model(model_name)
+
+
+@lru_cache(maxsize=2)
+def _load_embedding_model(model_name: str):
+    from langchain_community.embeddings import SentenceTransformerEmbeddings
+
     print(f"🔧 Loading Embedding Model: {model_name}")
 
     return SentenceTransformerEmbeddings(
@@ -30,16 +47,12 @@ def get_embedding_model():
 
 
 # ============================================================
-# 🔹 CHUNKING (NO CHANGE)
+# 🔹 CHUNKING (delegates to the shared engine in utils.text_chunker)
 # ============================================================
-def split_into_chunks(full_text: str, chunk_size: int = 500, overlap: int = 100):
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=overlap,
-        separators=["\n\n", "\n", ".", " ", ""]
-    )
+def split_into_chunks(full_text: str, chunk_size: int = None, overlap: int = None, collection: str = None):
+    chunker = get_chunker(collection, chunk_size=chunk_size, chunk_overlap=overlap)
 
-    chunks = splitter.split_text(full_text)
+    chunks = chunker.split(full_text)
     if not chunks:
         chunks = [full_text]
 
@@ -47,6 +60,39 @@ def split_into_chunks(full_text: str, chunk_size: int = 500, overlap: int = 100)
     return chunks
 
 
+# ============================================================
+# 🔹 CHUNK IDS + METADATA
+# ============================================================
+# Consecutive chunks per section of the coarse index (utils.hierarchy)
+SECTION_CHUNKS = int(os.getenv("SECTION_CHUNKS", 16))
+
+
+def section_id(doc_id: str, chunk: int) -> str:
+    return f"{doc_id}-s{chunk // SECTION_CHUNKS}"
+
+
+def build_chunk_records(chunks, sha256: str, source: str, start: int = 0, extra=None):
+    """
+    Deterministic ids (same file → same ids) so re-ingesting a file is an
+    idempotent upsert rather than a duplicate insert.
+
+    `start` offsets the chunk numbering for files ingested in batches;
+    `extra` is an optional per-chunk list of additional metadata.
+    """
+    doc_id = sha256[:16]
+    ids = [f"{doc_id}-{start + i}" for i in range(len(chunks))]
+    metadatas = [
+        {"doc_id": doc_id, "source": source, "chunk": start + i, "section_id": section_id(doc_id, start + i)}
+        for i in range(len(chunks))
+    ]
+
+    if extra:
+        for meta, more in zip(metadatas, extra):
+            meta.update(more)
+
+    return ids, metadatas
+
+
 # ============================================================
 # 🔹 SAFE CLOSE OF CHROMA
 # ============================================================
@@ -122,6 +168,57 @@ def force_remove_dir(path: str, retries=6):
         return False
 
 
+# ============================================================
+# 🔹 RELEASE CHROMA'S CACHED CLIENT FOR ONE DIRECTORY (no sleeps)
+# ============================================================
+def release_chroma_system(persist_dir: str, stop: bool = True):
+    """
+    chromadb keeps one shared System (sqlite + HNSW handles) per persist
+    directory for the life of the process. Stop the one for `persist_dir`
+    so its files can be deleted, without touching other directories.
+    With stop=False it is only evicted from the cache: requests still using
+    it finish normally, and the next open reloads from disk.
+    Best effort: returns False if chromadb internals differ.
+    """
+    try:
+        from chromadb.api.client import SharedSystemClient
+    except Exception:
+        return False
+
+    cache = getattr(SharedSystemClient, "_identifer_to_system", None)
+    if cache is None:
+        return False
+
+    target = os.path.abspath(persist_dir)
+    released = False
+    for identifier in list(cache.keys()):
+        if identifier and os.path.abspath(identifier) == target:
+            system = cache.pop(identifier)
+            if stop:
+                try:
+                    system.stop()
+                except Exception:
+                    pass
+            released = True
+
+    return released
+
+
+# ============================================================
+# 🔹 DELETE CHUNKS BY ID
+# ============================================================
+def delete_chunks(vectordb, ids):
+    if not ids:
+        return 0
+
+    collection = vectordb._collection
+    step = _max_batch_size(vectordb)
+    for start in range(0, len(ids), step):
+        collection.delete(ids=ids[start:start + step])
+
+    return len(ids)
+
+
 # ============================================================
 # 🔹 HYBRID CLOSE → SAFE THEN FORCE REMOVE DIRECTORY
 # ============================================================
@@ -147,7 +244,7 @@ def load_existing_embeddings(persist_dir: str):
         print(f"📂 Loading vector DB → {persist_dir}")
 
         embedding_model = get_embedding_model()
-        vectordb = Chroma(
+        vectordb = _chroma()(
             persist_directory=persist_dir,
             embedding_function=embedding_model
         )
@@ -160,10 +257,64 @@ def load_existing_embeddings(persist_dir: str):
         return None
 
 
+# ============================================================
+# 🔹 OPEN (OR CREATE) CHROMA WITHOUT ADDING TEXTS
+# ============================================================
+def open_vectordb(persist_dir: str, embedding_model=None, collection_metadata=None, collection_name: str = None):
+    os.makedirs(persist_dir, exist_ok=True)
+
+    kwargs = {"collection_name": collection_name} if collection_name else {}
+    return _chroma()(
+        persist_directory=persist_dir,
+        embedding_function=embedding_model or get_embedding_model(),
+        collection_metadata=collection_metadata,
+        **kwargs,
+    )
+
+
+# ============================================================
+# 🔹 WRITE PRE-COMPUTED EMBEDDINGS IN LARGE BATCHES
+# ============================================================
+def _max_batch_size(vectordb, default=5000):
+    client = getattr(vectordb, "_client", None)
+    try:
+        return int(client.get_max_batch_size())
+    except Exception:
+        pass
+    try:
+        return int(client.max_batch_size)
+    except Exception:
+        return default
+
+
+def add_embedded_batch(vectordb, ids, embeddings, texts, metadatas=None):
+    """
+    Upserts already-embedded chunks straight into the Chroma collection.
+    Skips LangChain's add_texts (which would embed again) and splits the
+    write only as far as Chroma's own max batch size requires.
+    """
+    if not ids:
+        return 0
+
+    collection = vectordb._collection
+    step = _max_batch_size(vectordb)
+
+    for start in range(0, len(ids), step):
+        end = start + step
+        collection.upsert(
+            ids=ids[start:end],
+            embeddings=embeddings[start:end],
+            documents=texts[start:end],
+            metadatas=metadatas[start:end] if metadatas else None,
+        )
+
+    return len(ids)
+
+
 # ============================================================
 # 🔹 CREATE / UPDATE CHROMA VECTORSTORE (UPDATED FOR BGE)
 # ============================================================
-def store_embeddings(chunks, persist_dir: str):
+def store_embeddings(chunks, persist_dir: str, metadatas=None, ids=None):
     if not chunks:
         raise ValueError("❌ No text chunks provided.")
 
@@ -175,12 +326,12 @@ def store_embeddings(chunks, persist_dir: str):
         print("🔍 Existing DB found → updating...")
 
         try:
-            vectordb = Chroma(
+            vectordb = _chroma()(
                 persist_directory=persist_dir,
                 embedding_function=embedding_model
             )
 
-            vectordb.add_texts(chunks)
+            vectordb.add_texts(chunks, metadatas=metadatas, ids=ids)
 
             try:
                 vectordb.persist()
@@ -205,9 +356,11 @@ def store_embeddings(chunks, persist_dir: str):
     # CREATE NEW DB
     print("📁 Creating NEW vector DB...")
 
-    vectordb = Chroma.from_texts(
+    vectordb = _chroma().from_texts(
         texts=chunks,
         embedding=embedding_model,
+        metadatas=metadatas,
+        ids=ids,
         persist_directory=persist_dir
     )
 
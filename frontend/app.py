@@ -1,11 +1,21 @@
+import os
+import re
+import time
+import uuid
 import streamlit as st
 import requests
-import base64
+from requests.adapters import HTTPAdapter
 
 # ---------------------------------------
 # CONFIG
 # ---------------------------------------
-BACKEND_URL = "http://127.0.0.1:8000"
+BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
+# Backend URL as seen from the user's *browser*: PDF previews are streamed
+# straight from the backend with range requests. Defaults to BACKEND_URL;
+# set it when the browser reaches the backend under another address.
+PUBLIC_BACKEND_URL = (os.getenv("PUBLIC_BACKEND_URL") or BACKEND_URL).rstrip("/")
+UPLOAD_RETRIES = 5
+HTTP_POOL_SIZE = 10
 st.set_page_config(page_title="SmartDoc", layout="wide")
 
 # ---------------------------------------
@@ -64,6 +74,21 @@ def load_css():
 
 load_css()
 
+# ---------------------------------------
+# HTTP (one pooled session per server process)
+# ---------------------------------------
+@st.cache_resource
+def http() -> requests.Session:
+    """
+    Keep-alive connection pool shared by every rerun and user session,
+    instead of a fresh TCP connection per request.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 # ---------------------------------------
 # SESSION INIT
 # ---------------------------------------
@@ -73,22 +98,154 @@ if "doc_uploaded" not in st.session_state:
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 
-if "file_base64" not in st.session_state:
-    st.session_state.file_base64 = None
+if "doc_id" not in st.session_state:
+    st.session_state.doc_id = None
+
+if "is_pdf" not in st.session_state:
+    st.session_state.is_pdf = False
+
+if "preview_page" not in st.session_state:
+    st.session_state.preview_page = 1
 
 if "file_name" not in st.session_state:
     st.session_state.file_name = ""
 
+# Every browser session reaches the backend from this one server's IP, so
+# identify sessions explicitly for the backend's per-client limits
+if "client_id" not in st.session_state:
+    st.session_state.client_id = uuid.uuid4().hex
+
+def client_headers() -> dict:
+    return {"X-Client-Id": st.session_state.client_id}
+
+def retry_after(res) -> int:
+    try:
+        return int(res.headers.get("Retry-After", 1))
+    except ValueError:
+        return 1
+
 # ---------------------------------------
-# PDF DISPLAY
+# PDF DISPLAY (streamed by the backend with range requests)
 # ---------------------------------------
-def show_pdf(base64_pdf: str):
+def show_pdf(doc_id: str, page: int = 1):
+    # The browser fetches only the byte ranges the viewer needs
+    src = f"{PUBLIC_BACKEND_URL}/documents/{doc_id}/file#page={page}"
+
     pdf_display = f"""
     <iframe class="pdf-frame"
-    src="data:application/pdf;base64,{base64_pdf}" width="100%" height="100%"></iframe>
+    src="{src}" width="100%" height="100%"></iframe>
     """
     st.markdown(pdf_display, unsafe_allow_html=True)
 
+# ---------------------------------------
+# CHAT
+# ---------------------------------------
+# st.fragment reruns only the chat panel (not the PDF preview) on each question
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
+
+def cited_pages(answer: str):
+    return sorted({int(p) for p in re.findall(r"- Page (\d+)", answer)})
+
+def ask_backend(question: str, doc_id: str = None) -> str:
+    payload = {"question": question}
+    if doc_id:
+        payload["filters"] = {"doc_ids": [doc_id]}
+    try:
+        res = http().post(f"{BACKEND_URL}/ask", json=payload, headers=client_headers(), timeout=120)
+        if res.status_code == 429:
+            return f"⏳ SmartDoc is busy right now — please retry in {retry_after(res)} s."
+        return res.json().get("answer", "Error.")
+    except (requests.RequestException, ValueError) as e:
+        return f"❌ Backend unreachable: {e}"
+
+def render_answer(index: int, answer: str):
+    st.markdown(f"<div class='bot-msg'>{answer}</div>", unsafe_allow_html=True)
+
+    pages = cited_pages(answer) if st.session_state.is_pdf else []
+    if pages:
+        cols = st.columns(min(len(pages), 6))
+        for i, page in enumerate(pages[:6]):
+            if cols[i].button(f"📄 p.{page}", key=f"cite-{index}-{page}"):
+                st.session_state.preview_page = page
+                st.rerun()
+
+@fragment
+def chat_panel():
+    st.markdown("<h3>💬 Chat with SmartDoc</h3>", unsafe_allow_html=True)
+
+    messages = st.container()
+    with messages:
+        for i, (q, a) in enumerate(st.session_state.chat_history):
+            st.markdown(f"<div class='user-msg'>{q}</div>", unsafe_allow_html=True)
+            render_answer(i, a)
+
+    only_this = st.session_state.doc_id and st.toggle(
+        f"Only search {st.session_state.file_name or 'this document'}", value=True, key="only_this_doc"
+    )
+
+    question = st.chat_input("Ask something...")
+    if question:
+        # Append the new exchange in place — no "Thinking..." placeholder + double rerun
+        with messages:
+            st.markdown(f"<div class='user-msg'>{question}</div>", unsafe_allow_html=True)
+            with st.spinner("Thinking..."):
+                answer = ask_backend(question, st.session_state.doc_id if only_this else None)
+            st.session_state.chat_history.append((question, answer))
+            render_answer(len(st.session_state.chat_history) - 1, answer)
+
+# ---------------------------------------
+# RESUMABLE UPLOAD
+# ---------------------------------------
+def upload_resumable(uploaded_file):
+    """
+    Sends the file in chunks via /upload/sessions.
+    A failed chunk is retried from the offset the backend reports,
+    so a timeout never forces re-sending the whole file.
+    """
+    size = uploaded_file.size
+    res = http().post(
+        f"{BACKEND_URL}/upload/sessions",
+        json={"filename": uploaded_file.name, "size": size},
+        timeout=30,
+    )
+    res.raise_for_status()
+    session = res.json()
+    upload_id = session["upload_id"]
+    chunk_size = session["chunk_size"]
+    session_url = f"{BACKEND_URL}/upload/sessions/{upload_id}"
+
+    offset = 0
+    failures = 0
+    progress = st.progress(0.0)
+
+    while offset < size:
+        uploaded_file.seek(offset)
+        chunk = uploaded_file.read(chunk_size)
+        try:
+            res = http().put(session_url, params={"offset": offset}, data=chunk, headers=client_headers(), timeout=120)
+            if res.status_code == 429:
+                time.sleep(retry_after(res))
+                continue
+            if res.status_code == 409:
+                offset = res.json()["offset"]
+                continue
+            res.raise_for_status()
+            offset = res.json()["offset"]
+            failures = 0
+        except requests.RequestException:
+            failures += 1
+            if failures > UPLOAD_RETRIES:
+                raise
+            offset = http().get(session_url, timeout=30).json()["offset"]
+
+        progress.progress(min(offset / max(size, 1), 1.0))
+
+    while True:
+        res = http().post(f"{session_url}/complete", headers=client_headers(), timeout=600)
+        if res.status_code != 429:
+            return res
+        time.sleep(retry_after(res))
+
 # ---------------------------------------
 # MAIN UI
 # ---------------------------------------
@@ -101,19 +258,18 @@ if not st.session_state.doc_uploaded:
 
     if uploaded_file is not None:
         with st.spinner("Processing your document..."):
-            file_bytes = uploaded_file.getvalue()
-
-            if uploaded_file.type == "application/pdf":
-                st.session_state.file_base64 = base64.b64encode(file_bytes).decode("utf-8")
-            else:
-                st.session_state.file_base64 = None
-
+            st.session_state.is_pdf = uploaded_file.type == "application/pdf"
+            st.session_state.preview_page = 1
             st.session_state.file_name = uploaded_file.name
 
-            files = {"file": (uploaded_file.name, file_bytes, uploaded_file.type)}
-            res = requests.post(f"{BACKEND_URL}/upload", files=files, timeout=600)
+            try:
+                res = upload_resumable(uploaded_file)
+            except requests.RequestException as e:
+                st.error(f"Upload failed: {e}")
+                st.stop()
 
             if res.status_code == 200:
+                st.session_state.doc_id = res.json().get("doc_id")
                 st.session_state.doc_uploaded = True
                 st.rerun()
             else:
@@ -126,34 +282,17 @@ else:
     with col1:
         st.markdown(f"<h4>📄 Document: {st.session_state.file_name}</h4>", unsafe_allow_html=True)
 
-        if st.session_state.file_base64:
-            show_pdf(st.session_state.file_base64)
+        if st.session_state.is_pdf and st.session_state.doc_id:
+            show_pdf(st.session_state.doc_id, st.session_state.preview_page)
         else:
             st.info("No PDF preview available.")
 
         if st.button("🗑️ Upload New Document"):
-            requests.post(f"{BACKEND_URL}/reset")
+            http().post(f"{BACKEND_URL}/reset", timeout=60)
             st.session_state.doc_uploaded = False
+            st.session_state.doc_id = None
             st.session_state.chat_history = []
             st.rerun()
 
     with col2:
-        st.markdown("<h3>💬 Chat with SmartDoc</h3>", unsafe_allow_html=True)
-
-        # Render chat
-        for q, a in st.session_state.chat_history:
-            st.markdown(f"<div class='user-msg'>{q}</div>", unsafe_allow_html=True)
-            st.markdown(f"<div class='bot-msg'>{a}</div>", unsafe_allow_html=True)
-
-        question = st.chat_input("Ask something...")
-        if question:
-            st.session_state.chat_history.append((question, "Thinking..."))
-            st.rerun()
-
-        # Fetch answer if last response is "Thinking..."
-        if st.session_state.chat_history and st.session_state.chat_history[-1][1] == "Thinking...":
-            q = st.session_state.chat_history[-1][0]
-            res = requests.post(f"{BACKEND_URL}/ask", json={"question": q})
-            ans = res.json().get("answer", "Error.")
-            st.session_state.chat_history[-1] = (q, ans)
-            st.rerun()
+        chat_panel()